@@ -11,11 +11,20 @@
 """
 from .database import *
 from .decorators import *
+from .cache import *
 from .core import *
 from .exceptions import *
 from .identifier import *
 from .inventory import *
+from .lazy import *
+from .pool import *
+from .prune import *
+from .response import *
+from .shared import *
+from .sqlite import *
+from .tables import *
 from .util import *
+from .writer import *
 
 # version in two places - here and .VERSION file
 __version__ = "0.1.5"
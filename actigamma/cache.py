@@ -0,0 +1,339 @@
+"""
+    Caching of precomputed binning structures
+
+    Response matrices depend only on the database, the energy grid,
+    the spectral type and the kind of aggregator, so long running
+    processes can build them once and reuse them between calls.
+    Optionally they are also kept on disk, so they survive restarts.
+"""
+import collections
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+import zipfile
+import numpy as np
+from typing import Callable
+
+from .response import ResponseMatrix, fromcsr
+
+# bump if the layout of the files in the disk cache changes
+DISK_CACHE_VERSION = 1
+
+# environment variable to opt in to the disk cache for the default cache
+CACHE_DIR_ENV = "ACTIGAMMA_CACHE_DIR"
+
+
+def gridhash(bounds: np.ndarray) -> str:
+    """
+    A content hash of an energy grid, computed from the bounds
+
+    :param bounds: the energy bounds of the grid
+    :returns: a hex digest string
+    """
+    bounds = np.ascontiguousarray(bounds, dtype=np.float64)
+    return hashlib.sha1(bounds.tobytes()).hexdigest()
+
+
+def databasehash(db) -> str:
+    """
+    A content hash of a database, see ReadOnlyDatabase.fingerprint
+
+    :param db: the database to hash
+    :returns: a hex digest string
+    """
+    return db.fingerprint
+
+
+def _gridkey(grid) -> str:
+    # an EnergyGrid knows its fingerprint, plain bounds are hashed
+    fingerprint = getattr(grid, "fingerprint", None)
+    return fingerprint if fingerprint is not None else gridhash(grid)
+
+
+class DiskCache:
+    """
+    A persistent cache of response matrices, as uncompressed .npz files
+    in a directory, so they are not rebuilt when a process restarts.
+
+    Entries are keyed on the fingerprint of the database (not its
+    identity), the fingerprint of the grid, the spectral type and
+    the aggregator kind. Each file is stamped with the cache
+    version and its key, and files not matching are ignored.
+
+    Files are written to a temporary file and renamed into place so
+    concurrent processes never see a partially written entry.
+
+    When the files in the directory exceed maxbytes the least recently
+    used (by modification time, updated on each read) are removed.
+    """
+
+    __slots__ = ["directory", "maxbytes"]
+
+    def __init__(self, directory: str, maxbytes: int = 1024 ** 3):
+        """
+        :param directory: the cache directory, created if it does not exist
+        :param maxbytes: the maximum total size of the files in bytes
+        """
+        self.directory = directory
+        self.maxbytes = int(maxbytes)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.directory, "{}.npz".format(name))
+
+    def _files(self):
+        return [
+            os.path.join(self.directory, f)
+            for f in os.listdir(self.directory)
+            if f.endswith(".npz")
+        ]
+
+    def load(self, key: str) -> ResponseMatrix:
+        """
+        Load a matrix from the cache
+
+        :param key: the full string key of the entry
+        :returns: the response matrix or None if not in the cache, or if
+        the file is unreadable (which is then removed)
+        """
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != DISK_CACHE_VERSION or str(data["key"]) != key:
+                    return None
+                matrix = fromcsr(
+                    data["nuclides"].tolist(),
+                    data["zais"],
+                    int(data["nrofbins"]),
+                    data["indptr"],
+                    data["indices"],
+                    data["data"],
+                )
+            os.utime(path)
+        except (zipfile.BadZipFile, EOFError, KeyError, ValueError):
+            # truncated or corrupt, i.e. by a crash mid write on a
+            # filesystem without atomic renames - rebuild it
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        except OSError:
+            return None
+        return matrix
+
+    def save(self, key: str, matrix: ResponseMatrix):
+        """
+        Save a matrix to the cache, atomically, and evict old entries
+
+        :param key: the full string key of the entry
+        :param matrix: the response matrix
+        """
+        fd, tmppath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmpfile:
+                np.savez(
+                    tmpfile,
+                    version=DISK_CACHE_VERSION,
+                    key=key,
+                    nuclides=np.array(matrix.nuclides, dtype=str),
+                    zais=matrix.zais,
+                    nrofbins=matrix.nrofbins,
+                    indptr=matrix.indptr,
+                    indices=matrix.indices,
+                    data=matrix.data,
+                )
+            os.replace(tmppath, self._path(key))
+        except OSError:
+            if os.path.exists(tmppath):
+                os.remove(tmppath)
+            raise
+        self._evict()
+
+    def clear(self):
+        """
+        Remove all entries
+        """
+        for path in self._files():
+            os.remove(path)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The total size in bytes of all files in the cache
+        """
+        return sum(os.path.getsize(path) for path in self._files())
+
+    def _evict(self):
+        entries = []
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.maxbytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # another process got there first
+                pass
+            total -= size
+
+
+class ResponseCache:
+    """
+    An in-process least recently used (LRU) cache of response matrices.
+
+    Entries are keyed on the identity of the database, the fingerprint
+    of the grid, the spectral type and the aggregator kind.
+    The cache holds a weak reference to each database so an entry can
+    never be returned for a different database that happens to reuse
+    the same id once the original has been garbage collected.
+
+    When the total size of the cached matrices exceeds the memory
+    budget (maxbytes) the least recently used entries are evicted.
+
+    Hit, miss and eviction counters are kept for monitoring.
+
+    Optionally, a DiskCache can be attached which is checked on a miss
+    before building the matrix, and to which built matrices are saved.
+    """
+
+    __slots__ = [
+        "_maxbytes",
+        "_entries",
+        "_nbytes",
+        "_lock",
+        "disk",
+        "hits",
+        "misses",
+        "evictions",
+    ]
+
+    def __init__(self, maxbytes: int = 256 * 1024 ** 2, disk: DiskCache = None):
+        """
+        :param maxbytes: the memory budget in bytes
+        :param disk: an optional persistent cache
+        """
+        self.disk = disk
+        self._maxbytes = int(maxbytes)
+        self._entries = collections.OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The total size in bytes of all cached matrices
+        """
+        return self._nbytes
+
+    @property
+    def maxbytes(self) -> int:
+        """
+        The memory budget in bytes, setting it evicts entries as needed
+        """
+        return self._maxbytes
+
+    @maxbytes.setter
+    def maxbytes(self, value: int):
+        with self._lock:
+            self._maxbytes = int(value)
+            self._evict()
+
+    def get(
+        self,
+        db,
+        grid,
+        spectype: str,
+        kind: str,
+        build: Callable[[], ResponseMatrix],
+    ) -> ResponseMatrix:
+        """
+        Get the response matrix from the cache, building it on a miss
+
+        :param db: the database the matrix is built from
+        :param grid: the energy grid, or its bounds
+        :param spectype: a string representing the type of decay mode
+        :param kind: a string identifying how the lines are binned
+        :param build: a callable taking no arguments that builds the matrix
+        :returns: the response matrix
+        """
+        key = (id(db), _gridkey(grid), spectype, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is db:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        if self.disk is not None:
+            diskkey = "|".join([databasehash(db), key[1], spectype, kind])
+            matrix = self.disk.load(diskkey)
+            if matrix is None:
+                matrix = build()
+                try:
+                    self.disk.save(diskkey, matrix)
+                except OSError:
+                    # i.e. a full or read only cache directory, the
+                    # matrix is still used, just not persisted
+                    pass
+        else:
+            matrix = build()
+
+        with self._lock:
+            self._discard(key)
+            if matrix.nbytes <= self._maxbytes:
+                ref = weakref.ref(db, lambda _, key=key: self._release(key))
+                self._entries[key] = (ref, matrix)
+                self._nbytes += matrix.nbytes
+                self._evict()
+        return matrix
+
+    def clear(self):
+        """
+        Remove all entries, counters are kept
+        """
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._nbytes -= entry[1].nbytes
+
+    def _release(self, key):
+        # called when a database is garbage collected
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0]() is None:
+                self._discard(key)
+
+    def _evict(self):
+        while self._entries and self._nbytes > self._maxbytes:
+            _, (_, matrix) = self._entries.popitem(last=False)
+            self._nbytes -= matrix.nbytes
+            self.evictions += 1
+
+
+# the cache shared by all aggregators unless told otherwise
+# set ACTIGAMMA_CACHE_DIR to also keep the matrices on disk
+DEFAULT_RESPONSE_CACHE = ResponseCache(
+    disk=DiskCache(os.environ[CACHE_DIR_ENV]) if os.environ.get(CACHE_DIR_ENV) else None
+)
@@ -5,6 +5,7 @@
 """
 import math
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple
 
 from .exceptions import (
@@ -13,16 +14,41 @@ from .exceptions import (
     NoDataException,
 )
 from .database import ReadOnlyDatabase
-from .decorators import asarray
 from .inventory import UnstablesInventory
+from .cache import DEFAULT_RESPONSE_CACHE, ResponseCache, gridhash
+from .response import ResponseMatrix
+from .util import chunked, prefetched
 
 
 LOG_TWO_BASE_E = math.log(2)
 
+# the number of inventories aggregated at once when streaming
+# single histograms, see LineAggregator.stream
+STREAM_BLOCKSIZE = 256
+
 linspace = np.linspace
 logspace = np.logspace
 
 
+def binindices(bounds: np.ndarray, lines) -> np.ndarray:
+    """
+    Find the bin index of each line for a grid of ascending bounds.
+
+    Bins are half open, [lb, ub), such that a line exactly on the
+    upper bound of the grid is not binned. Lines outside of the
+    grid are given an index of -1.
+
+    :param bounds: the ascending energy bounds of the grid
+    :param lines: array like of line energies
+    :returns: a numpy array of bin indices (integers), one per line
+    """
+    lines = np.asarray(lines, dtype=float)
+    nrofbins = len(bounds) - 1
+    indices = np.searchsorted(bounds, lines, side="right") - 1
+    indices[(indices < 0) | (indices >= nrofbins)] = -1
+    return indices
+
+
 class EnergyGrid:
     """
     This represents a simple energy grid to define
@@ -30,9 +56,12 @@ class EnergyGrid:
 
     It is basically a numpy array with some units
     and some protection on negative values.
+
+    The grid is immutable - the bounds are a read only copy - so it
+    can be hashed and compared by content, see fingerprint.
     """
 
-    __slots__ = ["bounds"]
+    __slots__ = ["_bounds", "_fingerprint"]
 
     def __init__(self, bounds: np.ndarray = linspace(0.0, 10e6, 10000)):
         """
@@ -42,11 +71,42 @@ class EnergyGrid:
 
         :param bounds: a numpy array defining the binning
         """
-
+        bounds = np.array(bounds, dtype=float)
         if np.any(bounds < 0):
             raise UnphysicalValueException("Energies cannot be negative.")
 
-        self.bounds = bounds
+        bounds.flags.writeable = False
+        self._bounds = bounds
+        self._fingerprint = None
+
+    @property
+    def bounds(self) -> np.ndarray:
+        """
+        The energy bounds in eV, read only
+
+        :returns: a numpy array of the bounds
+        """
+        return self._bounds
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        A content hash of the grid, computed from the bounds.
+        Grids with the same bounds have the same fingerprint.
+
+        :returns: a hex digest string
+        """
+        if self._fingerprint is None:
+            self._fingerprint = gridhash(self._bounds)
+        return self._fingerprint
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, EnergyGrid):
+            return NotImplemented
+        return self.fingerprint == other.fingerprint
+
+    def __hash__(self) -> int:
+        return hash(self.fingerprint)
 
     def __len__(self) -> int:
         """
@@ -96,7 +156,6 @@ class EnergyGrid:
         return "eV"
 
     @property
-    @asarray
     def midpoints(self) -> np.array:
         """
         Return a numpy array of the midpoint values, in eV
@@ -129,75 +188,100 @@ class LineAggregator:
     A simple class for reading lines of a single decay type
     i.e. "gamma" and binning them in appropriate bins
     according to the energy grid definition.
+
+    Aggregators keep no state between calls, the database, grid and
+    cache are only read, so one instance can be shared between threads,
+    see map.
     """
 
-    __slots__ = ["db", "grid", "lines", "values"]
+    __slots__ = ["db", "grid", "cache"]
 
-    def __init__(self, db: ReadOnlyDatabase, grid: EnergyGrid):
+    def __init__(
+        self,
+        db: ReadOnlyDatabase,
+        grid: EnergyGrid,
+        cache: ResponseCache = DEFAULT_RESPONSE_CACHE,
+    ):
+        """
+        :param db: the database to get the lines from
+        :param grid: the energy grid defining the bins
+        :param cache: the cache of response matrices, shared by default
+        between all aggregators. If None, lines are found and binned on
+        every call instead, as they always are for subclasses overriding
+        _findlines or _makehist.
+        """
         self.db = db
 
         self.grid = grid
 
-        # here we just store lines and intensities
-        self.lines = []
+        self.cache = cache
 
-        # NOTE: values are intensities multiplied by the activity of each
-        # nuclide here
-        self.values = []
+    def _checknuclide(self, zai: int, spectype: str) -> str:
+        name = self.db.getname(zai)
+        # check it exists in database
+        if name not in self.db:
+            raise UnknownOrUnstableNuclideException(
+                "{} not in database - maybe too exotic or is it stable?".format(zai)
+            )
+
+        # check that data exists for that decay type
+        if not self.db.hastype(name, spectype=spectype):
+            raise NoDataException(
+                "{} does not have {} decay mode".format(name, spectype)
+            )
+        return name
 
-    def _sortlines(self):
-        # sort the lines in ascending energy to make it easier to bin in a
-        # histogram
-        sorteddata = sorted(zip(self.lines, self.values), key=lambda pair: pair[0])
-        self.lines = [x for x, _ in sorteddata]
-        self.values = [y for _, y in sorteddata]
+    def _checkall(self, zai: int, types: List[str]) -> str:
+        # the nuclide must have data for every type
+        name = self.db.getname(zai)
+        for spectype in types:
+            self._checknuclide(zai, spectype)
+        return name
 
     def _findlines(
         self, inventory: UnstablesInventory, *args, spectype: str = "gamma", **kwargs
     ):
-        lines = []
-        values = []
-
-        for zai, activity in inventory:
-            name = self.db.getname(zai)
-            # check it exists in database
-            if name not in self.db:
-                raise UnknownOrUnstableNuclideException(
-                    "{} not in database - maybe too exotic or is it stable?".format(zai)
-                )
-
-            # check that data exists for that decay type
-            if spectype not in self.db.gettypes(name):
-                raise NoDataException(
-                    "{} does not have {} decay mode".format(name, spectype)
-                )
+        names = [self._checknuclide(zai, spectype) for zai in inventory.zais]
 
-            lines.extend(self.db.getenergies(name, spectype=spectype))
-            values.extend(self.db.getintensities(name, spectype=spectype) * activity)
+        (lines, intensities), offsets = self.db.getmanylines(names, spectype=spectype)
+        values = intensities * np.repeat(inventory.activities, np.diff(offsets))
 
         return lines, values
 
-    def _makehist(self, *args, **kwargs):
+    def _makehist(self, lines, values, *args, **kwargs):
+        # NOTE: values are intensities multiplied by the activity of each
+        # nuclide here
         hist = np.zeros(self.grid.nrofbins)
 
-        if len(self.lines) > 0:
-            # sort the lines in ascending energy to make it easier to bin in a
-            # histogram
-            self._sortlines()
-
-            # loop over lines to find appropriate bin
-            ibin = 0
-            for i, line in enumerate(self.lines):
-                # loop over bounds from the last found bin
-                for j in range(ibin, len(self.grid) - 1):
-                    if line >= self.grid[j] and line < self.grid[j + 1]:
-                        hist[j] += self.values[i]
-                        ibin = j
-                        # once we've found the line break the inner loop
-                        break
+        if len(lines) > 0:
+            # sort the lines in ascending energy so the bin search walks
+            # the grid in order
+            lines = np.asarray(lines, dtype=float)
+            values = np.asarray(values, dtype=float)
+            order = np.argsort(lines, kind="stable")
+            lines, values = lines[order], values[order]
+
+            indices = binindices(self.grid.bounds, lines)
+
+            # lines outside of the grid are flagged with -1 and dropped
+            inrange = indices >= 0
+            lines, indices, values = lines[inrange], indices[inrange], values[inrange]
+
+            hist += np.bincount(
+                indices,
+                weights=self._binvalues(lines, indices, values),
+                minlength=self.grid.nrofbins,
+            )
 
         return hist, self.grid.bounds
 
+    def _binvalues(
+        self, lines: np.ndarray, indices: np.ndarray, values: np.ndarray
+    ) -> np.ndarray:
+        # the value each line contributes to its bin (given by indices),
+        # plain LineAggregator bins the values as they are
+        return values
+
     def __call__(
         self, inventory: UnstablesInventory, *args, spectype: str = "gamma", **kwargs
     ):
@@ -206,11 +290,287 @@ class LineAggregator:
 
         throws an exception if nuclide is stable or is not in database
         """
-        self.lines, self.values = self._findlines(
-            inventory, *args, spectype=spectype, **kwargs
+        if self.cache is not None and self._usesresponse:
+            matrix = self.cachedresponse(spectype=spectype)
+            activities = self._activityvector(matrix, inventory, spectype)
+            return matrix.dot(activities), self.grid.bounds
+
+        lines, values = self._findlines(inventory, *args, spectype=spectype, **kwargs)
+
+        return self._makehist(lines, values, *args, **kwargs)
+
+    def map(self, inventories, *args, workers: int = None, **kwargs) -> list:
+        """
+        Aggregate many inventories on a pool of threads, all other
+        arguments are passed to every call.
+
+        ```
+            for hist, bounds in aggregator.map(inventories, workers=8):
+                ...
+        ```
+
+        :param inventories: an iterable of inventories
+        :param workers: the number of threads, None for the
+        ThreadPoolExecutor default
+        :returns: a list of the (hist, bounds) of each inventory, in order
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(
+                executor.map(lambda inventory: self(inventory, *args, **kwargs), inventories)
+            )
+
+    def batch(
+        self,
+        inventories,
+        *args,
+        out: np.ndarray = None,
+        maxbytes: int = 64 * 1024 ** 2,
+        **kwargs
+    ) -> np.ndarray:
+        """
+        Aggregate many inventories at once, as a (N x bins) array with
+        one histogram per row. All other arguments are as for a call,
+        i.e. spectype.
+
+        The histograms are products of the response matrix with the
+        activities, see cachedresponse, so this is always done with the
+        matrix, even without a cache (it is then built once per batch).
+        Subclasses overriding _findlines or _makehist are instead called
+        for each inventory in turn.
+
+        Inventories are processed in chunks, sized such that the
+        temporary arrays of a chunk take about maxbytes of memory.
+
+        ```
+            hists = aggregator.batch(inventories, spectype="gamma")
+
+            # or straight into a memory mapped file
+            out = np.lib.format.open_memmap("hists.npy", mode="w+",
+                                            shape=(len(inventories), grid.nrofbins))
+            aggregator.batch(inventories, spectype="gamma", out=out)
+        ```
+
+        :param inventories: a sequence of N inventories, or a 2-D
+        (N x nuclides) activity matrix with columns in the row order of
+        the response matrix (its zais)
+        :param out: an optional (N x bins) array to write the histograms to
+        :param maxbytes: the memory budget of the temporary arrays in bytes
+        :returns: the (N x bins) histograms, out if given
+        """
+        if not self._usesresponse:
+            return self._batchcalls(inventories, *args, out=out, **kwargs)
+
+        matrix, types, stacked = self._batchresponse(*args, **kwargs)
+        nrofbins = self.grid.nrofbins
+        shape = (len(types), nrofbins) if stacked else (nrofbins,)
+
+        isactivities = isinstance(inventories, np.ndarray)
+        if isactivities:
+            if inventories.ndim != 2 or inventories.shape[1] != matrix.shape[0]:
+                raise ValueError(
+                    "Activities must be of shape (N, {}), not {}".format(
+                        matrix.shape[0], inventories.shape
+                    )
+                )
+        elif not hasattr(inventories, "__len__"):
+            inventories = list(inventories)
+
+        n = len(inventories)
+        if out is None:
+            out = np.zeros((n,) + shape)
+        elif out.shape != (n,) + shape:
+            raise ValueError(
+                "Output must be of shape {}, not {}".format((n,) + shape, out.shape)
+            )
+
+        if not types:
+            out[...] = 0.0
+            return out
+
+        # the dense activities, the gathered entries and the histograms of a row
+        rowbytes = 8 * (matrix.shape[0] + 2 * matrix.nnz + matrix.shape[1])
+        chunksize = max(1, int(maxbytes) // max(rowbytes, 1))
+        for start in range(0, n, chunksize):
+            stop = min(start + chunksize, n)
+            if isactivities:
+                activities = inventories[start:stop]
+            else:
+                activities = self._activitymatrix(matrix, inventories[start:stop], types)
+            hists = matrix.dot(activities).reshape((stop - start, len(types), nrofbins))
+            out[start:stop] = hists if stacked else hists.sum(axis=1)
+        return out
+
+    def stream(
+        self,
+        inventories,
+        *args,
+        blocksize: int = None,
+        prefetch: int = 0,
+        **kwargs
+    ):
+        """
+        Lazily aggregate an iterable of inventories, i.e. a generator
+        reading them from FISPACT-II outputs, at constant memory.
+        All other arguments are as for batch, i.e. spectype.
+
+        Inventories are read in blocks, each aggregated with batch, so
+        at most one block (plus those prefetched) is held at a time.
+
+        ```
+            for hist in aggregator.stream(readinventories(), spectype="gamma"):
+                ...
+
+            # or (blocksize x bins) arrays, reading ahead on a thread
+            for block in aggregator.stream(inventories, blocksize=1000, prefetch=2):
+                ...
+        ```
+
+        :param inventories: an iterable of inventories, or a 2-D activity
+        matrix, see batch
+        :param blocksize: if given, yield (blocksize x bins) arrays of
+        histograms (the last block may be shorter), otherwise yield each
+        histogram in turn
+        :param prefetch: the number of blocks of inventories to read
+        ahead on a background thread, 0 for none
+        :returns: a generator of histograms, or blocks of histograms
+        """
+        blocks = chunked(inventories, blocksize or STREAM_BLOCKSIZE)
+        if prefetch > 0:
+            blocks = prefetched(blocks, prefetch)
+
+        for block in blocks:
+            hists = self.batch(block, *args, **kwargs)
+            if blocksize is None:
+                yield from hists
+            else:
+                yield hists
+
+    def _batchcalls(self, inventories, *args, out: np.ndarray = None, **kwargs) -> np.ndarray:
+        # the batch of aggregators that find and bin lines themselves,
+        # an activity matrix is turned back into inventories
+        if isinstance(inventories, np.ndarray):
+            zais = self._batchresponse(*args, **kwargs)[0].zais
+            inventories = [
+                UnstablesInventory(data=[(zai, a) for zai, a in zip(zais.tolist(), row) if a > 0])
+                for row in inventories
+            ]
+
+        hists = [self(inventory, *args, **kwargs)[0] for inventory in inventories]
+        shape = (len(hists),) + (hists[0].shape if hists else (self.grid.nrofbins,))
+        if out is None:
+            out = np.zeros(shape)
+        elif out.shape != shape:
+            raise ValueError("Output must be of shape {}, not {}".format(shape, out.shape))
+        if hists:
+            out[...] = hists
+        return out
+
+    @property
+    def _usesresponse(self) -> bool:
+        # response matrices give the histograms of lines found and binned
+        # as LineAggregator does, subclasses changing either can not use them
+        # (nor can lazy databases, as building them looks up every nuclide)
+        cls = type(self)
+        return (
+            cls._findlines is LineAggregator._findlines
+            and cls._makehist is LineAggregator._makehist
+            and not self.db.LAZY
+        )
+
+    def _batchresponse(self, *args, spectype: str = "gamma", **kwargs):
+        # the response matrix for a batch, the types it is made of, in
+        # the order of its bins, and whether types are kept separate
+        return self.cachedresponse(spectype=spectype), [spectype], False
+
+    @property
+    def _kind(self) -> str:
+        # aggregators binning values in the same way share response matrices
+        binvalues = type(self)._binvalues
+        return "{}.{}".format(binvalues.__module__, binvalues.__qualname__)
+
+    def cachedresponse(self, spectype: str = "gamma") -> ResponseMatrix:
+        """
+        Get the response matrix from the cache, building it if needed.
+        If the aggregator has no cache the matrix is always built.
+
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: the response matrix
+        """
+        if self.cache is None:
+            return self.response(spectype=spectype)
+        return self.cache.get(
+            self.db,
+            self.grid,
+            spectype,
+            self._kind,
+            lambda: self.response(spectype=spectype),
+        )
+
+    def response(self, spectype: str = "gamma") -> ResponseMatrix:
+        """
+        Build the (nuclides x bins) response matrix for this aggregator's
+        database and grid, for a single spectral type.
+
+        Row i is the histogram this aggregator produces for 1 Bq of
+        nuclide i, so the histogram of any inventory is the product
+        of the matrix with its activity vector, see ResponseMatrix.dot.
+
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: the response matrix
+        """
+        nuclides = self.db.allnuclidesoftype(spectype=spectype)
+
+        (lines, values), offsets = self.db.getmanylines(nuclides, spectype=spectype)
+        rows = np.repeat(np.arange(len(nuclides)), np.diff(offsets))
+
+        indices = binindices(self.grid.bounds, lines)
+        inrange = indices >= 0
+        lines, indices = lines[inrange], indices[inrange]
+        rows, values = rows[inrange], values[inrange]
+
+        return ResponseMatrix(
+            nuclides,
+            self.db.getzais(nuclides),
+            self.grid.nrofbins,
+            rows,
+            indices,
+            self._binvalues(lines, indices, values),
         )
 
-        return self._makehist(*args, **kwargs)
+    def _activityvector(
+        self, matrix: ResponseMatrix, inventory: UnstablesInventory, spectype: str
+    ) -> np.ndarray:
+        # map an inventory onto the rows of a response matrix
+        activities = np.zeros(matrix.shape[0])
+        rows = self._inventoryrows(matrix, inventory, [spectype])
+        np.add.at(activities, rows, inventory.activities)
+        return activities
+
+    def _inventoryrows(
+        self, matrix: ResponseMatrix, inventory: UnstablesInventory, types: List[str]
+    ) -> np.ndarray:
+        # the row of each nuclide of an inventory in a response matrix
+        zais = inventory.zais
+        rows = matrix.rowsof(zais)
+        for i in np.flatnonzero(rows < 0):
+            # raises the appropriate exception
+            self._checkall(zais[i], types)
+            matrix.rowof(zais[i])
+        return rows
+
+    def _activitymatrix(
+        self, matrix: ResponseMatrix, inventories, types: List[str]
+    ) -> np.ndarray:
+        # map inventories onto the rows of a response matrix of the types
+        activities = np.zeros((len(inventories), matrix.shape[0]))
+        rows = [self._inventoryrows(matrix, inventory, types) for inventory in inventories]
+        if rows:
+            index = np.repeat(np.arange(len(rows)), [len(r) for r in rows])
+            values = np.concatenate([inventory.activities for inventory in inventories])
+            np.add.at(activities, (index, np.concatenate(rows)), values)
+        return activities
 
 
 class LineAverageEnergyAggregator(LineAggregator):
@@ -226,28 +586,21 @@ class LineAverageEnergyAggregator(LineAggregator):
     LineAggregator
     """
 
-    def _makehist(self, *args, **kwargs):
-        hist = np.zeros(self.grid.nrofbins)
-
-        if len(self.lines) > 0:
-            self._sortlines()
+    def _binvalues(
+        self, lines: np.ndarray, indices: np.ndarray, values: np.ndarray
+    ) -> np.ndarray:
+        # we scale the values by the line energy/average bin energy
+        # in order to conserve energy for dose calculations
+        # only the midpoints of the bins hit are needed, not the full grid
+        bounds = self.grid.bounds
+        midpoints = (bounds[indices] + bounds[indices + 1]) / 2
 
-            average_energies = self.grid.midpoints
-
-            # loop over lines to find appropriate bin
-            ibin = 0
-            for i, line in enumerate(self.lines):
-                # loop over bounds from the last found bin
-                for j in range(ibin, len(self.grid) - 1):
-                    if line >= self.grid[j] and line < self.grid[j + 1]:
-                        # how to handle zero average energy?
-                        # we scale the values by the line energy/average bin energy
-                        # in order to conserve energy for dose calculations
-                        hist[j] += self.values[i] * line / average_energies[j]
-                        ibin = j
-                        break
-
-        return hist, self.grid.bounds
+        # a zero midpoint can only come from a zero width bin at 0 eV,
+        # which no line can fall in, but guard against it anyway by
+        # leaving such values unscaled
+        scale = np.ones_like(lines)
+        np.divide(lines, midpoints, out=scale, where=midpoints > 0)
+        return values * scale
 
 
 class MultiTypeLineAggregator(LineAggregator):
@@ -258,28 +611,166 @@ class MultiTypeLineAggregator(LineAggregator):
 
     Same as LineAggregator but supports multiple types
     of spectra - gamma + x-ray +beta for example.
+
+    Each type can be scaled by a weighting factor, i.e. a detector
+    efficiency, and the histograms of the types either summed or
+    returned stacked as a (types x bins) array.
+
+    With a cache the lines of all types are merged into a single
+    response matrix, built once for each combination of grid, types
+    and weights, see mergedresponse.
     """
 
+    def _typeweights(self, types: List[str], weights: Dict[str, float]) -> np.ndarray:
+        # the factor for each type, types not given are not scaled
+        weights = weights or {}
+        return np.array([weights.get(spectype, 1.0) for spectype in types], dtype=float)
+
+    def cachedmergedresponse(
+        self, types: List[str], weights: Dict[str, float] = None
+    ) -> ResponseMatrix:
+        """
+        Get the merged response matrix from the cache, building it if
+        needed. If the aggregator has no cache the matrix is always built.
+
+        :param types: the spectral types, in the order of the stacked bins
+        :param weights: the weighting factor of each type, 1 if not given
+        :returns: the merged response matrix
+        """
+        factors = self._typeweights(types, weights)
+        if len(types) == 1 and factors[0] == 1.0:
+            # the same as the response matrix of that type, so share it
+            return self.cachedresponse(spectype=types[0])
+        if self.cache is None:
+            return self.mergedresponse(types, weights=weights)
+        return self.cache.get(
+            self.db,
+            self.grid,
+            "+".join(types),
+            "{}*{}".format(self._kind, factors.tolist()),
+            lambda: self.mergedresponse(types, weights=weights),
+        )
+
+    def mergedresponse(
+        self, types: List[str], weights: Dict[str, float] = None
+    ) -> ResponseMatrix:
+        """
+        Build the (nuclides x (types x bins)) response matrix for
+        this aggregator's database and grid, over multiple types.
+
+        Rows are the nuclides having every type. The columns are the
+        bins of each type in turn, so the product with an activity
+        vector reshaped to (types, bins) is the stacked histogram,
+        with the weights already applied.
+
+        :param types: the spectral types, in the order of the stacked bins
+        :param weights: the weighting factor of each type, 1 if not given
+        :returns: the merged response matrix
+        """
+        factors = self._typeweights(types, weights)
+        nrofbins = self.grid.nrofbins
+
+        nuclides = []
+        if types:
+            nuclides = [
+                nuclide
+                for nuclide in self.db.allnuclidesoftype(spectype=types[0])
+                if all(self.db.hastype(nuclide, spectype=t) for t in types[1:])
+            ]
+
+        rows = [np.zeros(0, dtype=np.int64)]
+        indices = [np.zeros(0, dtype=np.int64)]
+        values = [np.zeros(0)]
+        for t, spectype in enumerate(types):
+            (lines, intensities), offsets = self.db.getmanylines(nuclides, spectype=spectype)
+            typerows = np.repeat(np.arange(len(nuclides)), np.diff(offsets))
+
+            typeindices = binindices(self.grid.bounds, lines)
+            inrange = typeindices >= 0
+            lines, typeindices = lines[inrange], typeindices[inrange]
+
+            rows.append(typerows[inrange])
+            indices.append(typeindices + t * nrofbins)
+            values.append(
+                factors[t] * self._binvalues(lines, typeindices, intensities[inrange])
+            )
+
+        return ResponseMatrix(
+            nuclides,
+            self.db.getzais(nuclides),
+            len(types) * nrofbins,
+            np.concatenate(rows),
+            np.concatenate(indices),
+            np.concatenate(values),
+        )
+
+    def _batchresponse(
+        self,
+        *args,
+        types: List[str] = ["gamma", "x-ray"],
+        weights: Dict[str, float] = None,
+        stacked: bool = False,
+        **kwargs
+    ):
+        return self.cachedmergedresponse(types, weights=weights), list(types), stacked
+
     def __call__(
         self,
         inventory: UnstablesInventory,
         *args,
         types: List[str] = ["gamma", "x-ray"],
+        weights: Dict[str, float] = None,
+        stacked: bool = False,
         **kwargs
     ):
         """
         Gets the lines from the full inventory
 
         throws an exception if nuclide is stable or is not in database
-        """
-        for spectype in types:
-            lines, values = self._findlines(
-                inventory, *args, spectype=spectype, **kwargs
-            )
-            self.lines.extend(lines)
-            self.values.extend(values)
 
-        return self._makehist(*args, **kwargs)
+        :param types: the spectral types to include
+        :param weights: the weighting factor of each type, 1 if not given
+        :param stacked: if True the histogram is a (types x bins) array
+        of each type, otherwise the sum over types
+        """
+        if not types:
+            shape = (0, self.grid.nrofbins) if stacked else self.grid.nrofbins
+            return np.zeros(shape), self.grid.bounds
+
+        if self.cache is not None and self._usesresponse:
+            matrix = self.cachedmergedresponse(types, weights=weights)
+            activities = np.zeros(matrix.shape[0])
+            rows = self._inventoryrows(matrix, inventory, types)
+            np.add.at(activities, rows, inventory.activities)
+            hists = matrix.dot(activities).reshape(len(types), self.grid.nrofbins)
+            return (hists if stacked else hists.sum(axis=0)), self.grid.bounds
+
+        factors = self._typeweights(types, weights)
+        lines, values = [np.zeros(0)], [np.zeros(0)]
+        if type(self)._findlines is not LineAggregator._findlines:
+            for t, spectype in enumerate(types):
+                typelines, typevalues = self._findlines(
+                    inventory, *args, spectype=spectype, **kwargs
+                )
+                lines.append(np.asarray(typelines, dtype=float))
+                values.append(factors[t] * np.asarray(typevalues, dtype=float))
+        else:
+            # nuclides are resolved once for all types
+            names = [self._checkall(zai, types) for zai in inventory.zais]
+            for t, spectype in enumerate(types):
+                (typelines, intensities), offsets = self.db.getmanylines(names, spectype=spectype)
+                activities = factors[t] * np.asarray(inventory.activities, dtype=float)
+                lines.append(typelines)
+                values.append(intensities * np.repeat(activities, np.diff(offsets)))
+
+        if stacked:
+            hists = [
+                self._makehist(typelines, typevalues, *args, **kwargs)[0]
+                for typelines, typevalues in zip(lines[1:], values[1:])
+            ]
+            return np.reshape(hists, (len(types), self.grid.nrofbins)), self.grid.bounds
+
+        return self._makehist(np.concatenate(lines), np.concatenate(values), *args, **kwargs)
 
 
 def get_zai_props(db: ReadOnlyDatabase, nuc: str) -> Tuple[int, int, int]:
@@ -337,6 +828,10 @@ def make_inventory_from_atoms(
     Each tuple should be a ZAI and atoms.
     i.e. [(10030, 4.5e8), (20040, 2.2321e4), ...]
     """
+    names = db.getnames(list(atoms_inv.keys()))
     return UnstablesInventory(
-        [(k, atoms_from_activity(db, db.getname(k), v)) for k, v in atoms_inv.items()]
+        [
+            (k, atoms_from_activity(db, name, v))
+            for name, (k, v) in zip(names, atoms_inv.items())
+        ]
     )
@@ -6,10 +6,22 @@
 """
 import os
 import json
+import threading
+import numpy as np
 from typing import List, Tuple
 
-from .decorators import asarray, constant, sortresult
+from .decorators import asarray, constant
 from .exceptions import AbstractClassException
+from .tables import (
+    TABLES_MANIFEST,
+    DecayTables,
+    contenthash,
+    loadtables,
+    makelinetable,
+    makenuclidetable,
+    tablesfromdict,
+    tablesmatch,
+)
 
 # hacky but will do, the database is one large JSON file with line data
 # we load it into a static data structure which is our database
@@ -17,6 +29,11 @@ __RAW_DATABASE_DECAY_2012_FILE__ = os.path.join(
     os.path.dirname(os.path.abspath(__file__)), "data", "lines_decay_2012.min.json"
 )
 
+# the same data in the binary format, made by scripts/makebinary.py
+__BINARY_DATABASE_DECAY_2012_DIR__ = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "lines_decay_2012"
+)
+
 
 class DatabaseJSONFileLoader:
     """
@@ -76,6 +93,65 @@ class DatabaseJSONFileLoader:
         """
 
 
+class DatabaseBinaryLoader:
+    """
+    Context manager to handle the binary (memory mapped) database format
+
+    Reads a directory written by savetables (see scripts/makebinary.py)
+    and returns DecayTables. Arrays are memory mapped by default, so
+    there is no parse step and processes share the same pages.
+    """
+
+    __slots__ = ["directory", "mmap"]
+
+    def __init__(
+        self, directory: str = __BINARY_DATABASE_DECAY_2012_DIR__, mmap: bool = True
+    ):
+        """
+        :param directory: The path to the binary database directory
+        :param mmap: memory map the arrays, or read them into memory
+        """
+        self.directory = directory
+        self.mmap = mmap
+
+    def __enter__(self):
+        """
+        Opens the directory and returns the data as DecayTables
+        """
+        return loadtables(self.directory, mmap=self.mmap)
+
+    def __exit__(self, *args):
+        """
+        Does nothing
+        """
+
+
+class DatabaseTablesLoader:
+    """
+    Context manager to use DecayTables already in memory as the data
+    source, i.e. tables made by prunetables.
+    """
+
+    __slots__ = ["tables"]
+
+    def __init__(self, tables: DecayTables):
+        """
+        :param tables: the tables
+        """
+        self.tables = tables
+
+    def __enter__(self):
+        """
+        Returns the tables
+        """
+        return self.tables
+
+    def __exit__(self, *args):
+        """
+        Does nothing
+        """
+
+
 ABSTRACT_STR_ERROR = "ReadOnlyDatabase should not be instantiated - please extend with your own database."
 
 
@@ -93,7 +169,11 @@ class ReadOnlyDatabase:
     ```
     """
 
-    __slots__ = ["__raw"]
+    __slots__ = ["__raw", "__linetables", "__nuclidetable", "__fingerprint", "__weakref__"]
+
+    # True for databases loading nuclides on demand, for which whole
+    # library lookups (i.e. building response matrices) should be avoided
+    LAZY = False
 
     def __init__(self, datasource=DatabaseJSONFileLoader()):
         """
@@ -108,6 +188,9 @@ class ReadOnlyDatabase:
         :param datasource: context manager to load data into database
         """
         self.__raw = {}
+        self.__linetables = {}
+        self.__nuclidetable = None
+        self.__fingerprint = None
         if datasource:
             with datasource as db:
                 self.__raw = db
@@ -255,6 +338,324 @@ class ReadOnlyDatabase:
         """
         raise AbstractClassException(ABSTRACT_STR_ERROR)
 
+    def linetable(self, spectype: str = "gamma") -> np.ndarray:
+        """
+        The lines of all nuclides for a spectral type as one flat table,
+        sorted by ascending energy, with fields:
+            energy, intensity, energy_unc, intensity_unc, nuclide
+
+        where nuclide is the index of the nuclide in allnuclides.
+        Intensities are normalised, as from getintensities.
+
+        The table is built on first use and kept.
+        Built using getenergies, getenergiesunc and getintensities for
+        each nuclide, extend for something faster. Intensity
+        uncertainties are NaN as there is no accessor for them.
+
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a read only structured numpy array
+        """
+        if spectype not in self.__linetables:
+            index = {nuc: i for i, nuc in enumerate(self.allnuclides)}
+            nuclides = self.allnuclidesoftype(spectype=spectype)
+            energies = [self.getenergies(nuc, spectype=spectype) for nuc in nuclides]
+            intensities = [self.getintensities(nuc, spectype=spectype) for nuc in nuclides]
+            energiesunc = [self.getenergiesunc(nuc, spectype=spectype) for nuc in nuclides]
+            counts = [len(e) for e in energies]
+            self.__linetables[spectype] = makelinetable(
+                np.concatenate(energies) if nuclides else [],
+                np.concatenate(intensities) if nuclides else [],
+                np.concatenate(energiesunc) if nuclides else [],
+                np.full(sum(counts), np.nan),
+                np.repeat([index[nuc] for nuc in nuclides], counts).astype(np.int64),
+            )
+        return self.__linetables[spectype]
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        A content hash of the database, computed from the nuclides, ZAIs,
+        halflives and line data (energies and intensities) of all types,
+        see contenthash. Databases with the same content have the same
+        fingerprint, whatever their backend, except LazyDatabase which
+        uses the hash of its datafile.
+
+        Computed on first use and kept for the lifetime of the database.
+
+        :returns: a hex digest string
+        """
+        if self.__fingerprint is None:
+            self.__fingerprint = self._contenthash()
+        return self.__fingerprint
+
+    def _contenthash(self) -> str:
+        # gathers the lines one nuclide at a time, backends holding
+        # columnar tables override this
+        names = sorted(self.allnuclides)
+        spectra = {}
+        for spectype in self.alltypes:
+            present, haslines, counts, energies, intensities = [], [], [], [], []
+            for nuclide in names:
+                present.append(spectype in self.gettypes(nuclide))
+                haslines.append(present[-1] and self.haslines(nuclide, spectype=spectype))
+                if haslines[-1]:
+                    energies.append(self.getenergies(nuclide, spectype=spectype))
+                    intensities.append(self.getintensities(nuclide, spectype=spectype))
+                    counts.append(len(energies[-1]))
+                else:
+                    counts.append(0)
+            spectra[spectype] = (
+                present,
+                haslines,
+                counts,
+                np.concatenate(energies) if energies else [],
+                np.concatenate(intensities) if intensities else [],
+            )
+        return contenthash(
+            names,
+            [self.getzai(nuclide) for nuclide in names],
+            [self.gethalflife(nuclide) for nuclide in names],
+            spectra,
+        )
+
+    def nuclidetable(self) -> np.ndarray:
+        """
+        The ZAI, Z, A, I and halflife of all nuclides as one table,
+        indexed as allnuclides, with fields:
+            zai, z, a, i, halflife
+
+        The table is built on first use and kept.
+        Built using getzai and gethalflife for each nuclide, extend
+        for something faster.
+
+        :returns: a read only structured numpy array
+        """
+        if self.__nuclidetable is None:
+            nuclides = self.allnuclides
+            self.__nuclidetable = makenuclidetable(
+                [self.getzai(nuc) for nuc in nuclides],
+                [self.gethalflife(nuc) for nuc in nuclides],
+            )
+        return self.__nuclidetable
+
+    def query(
+        self,
+        spectype: str = "gamma",
+        energy: Tuple[float, float] = None,
+        min_intensity: float = 0.0,
+        halflife: Tuple[float, float] = None,
+        z: Tuple[int, int] = None,
+        a: Tuple[int, int] = None,
+    ) -> np.ndarray:
+        """
+        Find all lines of a spectral type matching all of the given criteria.
+
+        Ranges are (lower, upper) tuples, with the lower bound inclusive
+        and the upper bound exclusive, like range(). Either bound can be
+        None for no limit, and a range of None means no criteria.
+
+        ```
+            # gamma lines above 1% of 1-2 MeV from nuclides with halflives
+            # between a minute and a day and Z in 20-30
+            lines = db.query(spectype="gamma", energy=(1e6, 2e6),
+                             min_intensity=0.01, halflife=(60, 86400), z=(20, 31))
+            names = [db.allnuclides[i] for i in np.unique(lines["nuclide"])]
+        ```
+
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :param energy: the range of line energy (eV)
+        :param min_intensity: the minimum (normalised) line intensity,
+        inclusive - 0 keeps all lines, including those of zero intensity
+        :param halflife: the range of nuclide halflife (s)
+        :param z: the range of nuclide charge Z
+        :param a: the range of nuclide mass number A
+        :returns: rows of the line table (see linetable), in ascending energy
+        """
+        lines = self.linetable(spectype=spectype)
+        if energy is not None:
+            lower = -np.inf if energy[0] is None else energy[0]
+            upper = np.inf if energy[1] is None else energy[1]
+            lines = self.linesinrange(lower, upper, spectype=spectype)
+
+        mask = np.ones(len(lines), dtype=bool)
+        if min_intensity > 0:
+            mask &= lines["intensity"] >= min_intensity
+
+        nuclides = self._nuclidemask(halflife=halflife, z=z, a=a)
+        if nuclides is not None:
+            mask &= nuclides[lines["nuclide"]]
+
+        return lines if mask.all() else lines[mask]
+
+    def querynuclides(
+        self,
+        spectype: str = None,
+        energy: Tuple[float, float] = None,
+        min_intensity: float = 0.0,
+        halflife: Tuple[float, float] = None,
+        z: Tuple[int, int] = None,
+        a: Tuple[int, int] = None,
+    ) -> np.ndarray:
+        """
+        Find all nuclides matching all of the given criteria, see query.
+
+        If a spectral type is given only nuclides with that type are
+        included, and if line criteria (energy, min_intensity) are also
+        given only nuclides with at least one matching line.
+
+        :param spectype: a string representing the type of decay mode,
+        or None for any type (line criteria are then ignored)
+        :param energy: the range of line energy (eV)
+        :param min_intensity: the minimum (normalised) line intensity
+        :param halflife: the range of nuclide halflife (s)
+        :param z: the range of nuclide charge Z
+        :param a: the range of nuclide mass number A
+        :returns: a numpy array of the (ascending) indices of the
+        nuclides in allnuclides
+        """
+        mask = self._nuclidemask(halflife=halflife, z=z, a=a)
+        if mask is None:
+            mask = np.ones(len(self.nuclidetable()), dtype=bool)
+
+        if spectype is not None:
+            if energy is not None or min_intensity > 0:
+                lines = self.query(spectype=spectype, energy=energy, min_intensity=min_intensity)
+                hastype = np.zeros(len(mask), dtype=bool)
+                hastype[lines["nuclide"]] = True
+            else:
+                hastype = np.isin(
+                    np.arange(len(mask)),
+                    self.getnuclideindices(self.allnuclidesoftype(spectype=spectype)),
+                )
+            mask &= hastype
+
+        return np.flatnonzero(mask)
+
+    def getnuclideindices(self, nuclides) -> np.ndarray:
+        """
+        Get the indices in allnuclides of many nuclides at once
+
+        :param nuclides: a list or array of nuclide names
+        :returns: a numpy (integer) array of indices
+        :raises KeyError: raises an exception if a nuclide is not in database
+        """
+        index = {nuc: i for i, nuc in enumerate(self.allnuclides)}
+        return np.array([index[str(nuc)] for nuc in nuclides], dtype=np.int64)
+
+    def _nuclidemask(self, **ranges) -> np.ndarray:
+        # boolean mask over all nuclides for ranges of nuclide table fields,
+        # None if there are no criteria
+        table = None
+        mask = None
+        for field, bounds in ranges.items():
+            if bounds is None:
+                continue
+            if table is None:
+                table = self.nuclidetable()
+                mask = np.ones(len(table), dtype=bool)
+            if bounds[0] is not None:
+                mask &= table[field] >= bounds[0]
+            if bounds[1] is not None:
+                mask &= table[field] < bounds[1]
+        return mask
+
+    def linesinrange(
+        self,
+        emin: float,
+        emax: float,
+        spectype: str = "gamma",
+        min_intensity: float = 0.0,
+    ) -> np.ndarray:
+        """
+        Get all lines of a spectral type with energies in [emin, emax),
+        using a binary search over the sorted line table.
+
+        ```
+            lines = db.linesinrange(500e3, 520e3, spectype="gamma")
+            names = [db.allnuclides[i] for i in lines["nuclide"]]
+        ```
+
+        :param emin: the lower energy (eV), inclusive
+        :param emax: the upper energy (eV), exclusive
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :param min_intensity: only include lines with at least this
+        (normalised) intensity
+        :returns: rows of the line table (see linetable), in ascending energy.
+        Without an intensity threshold this is a read only view.
+        """
+        table = self.linetable(spectype=spectype)
+        start, end = np.searchsorted(table["energy"], [emin, emax], side="left")
+        lines = table[start:max(start, end)]
+        if min_intensity > 0:
+            lines = lines[lines["intensity"] >= min_intensity]
+        return lines
+
+    def linesinranges(
+        self,
+        emins,
+        emaxs,
+        spectype: str = "gamma",
+        min_intensity: float = 0.0,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batched version of linesinrange, for many energy windows at once.
+
+        The lines for window i are lines[offsets[i]:offsets[i+1]].
+
+        :param emins: array like of lower energies (eV), inclusive
+        :param emaxs: array like of upper energies (eV), exclusive
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :param min_intensity: only include lines with at least this
+        (normalised) intensity
+        :returns: a tuple of the rows of the line table for all windows,
+        concatenated, and the (windows + 1) offsets into them
+        """
+        table = self.linetable(spectype=spectype)
+        energies = table["energy"]
+        starts = np.searchsorted(energies, np.asarray(emins, dtype=float), side="left")
+        ends = np.searchsorted(energies, np.asarray(emaxs, dtype=float), side="left")
+        counts = np.maximum(ends - starts, 0)
+
+        # index of every line of every window, without a python loop
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        indices = np.arange(offsets[-1]) - np.repeat(offsets[:-1] - starts, counts)
+        lines = table[indices]
+
+        if min_intensity > 0:
+            keep = lines["intensity"] >= min_intensity
+            windows = np.repeat(np.arange(len(counts)), counts)
+            counts = np.bincount(windows[keep], minlength=len(counts))
+            offsets = np.concatenate([[0], np.cumsum(counts)])
+            lines = lines[keep]
+        return lines, offsets
+
+    def getnames(self, zais) -> np.ndarray:
+        """
+        Get the names of many nuclides at once, given their ZAIs.
+        Unknown ZAIs give None.
+
+        Uses getname for each ZAI, extend for something faster.
+
+        :param zais: a list or array of ZAI numbers (integers)
+        :returns: a numpy (object) array of nuclide names
+        """
+        return np.array([self.getname(int(zai)) for zai in zais], dtype=object)
+
+    def getzais(self, nuclides) -> np.ndarray:
+        """
+        Get the ZAIs of many nuclides at once, given their names.
+
+        Uses getzai for each nuclide, extend for something faster.
+
+        :param nuclides: a list or array of nuclide names
+        :returns: a numpy (integer) array of ZAIs
+        """
+        return np.array([self.getzai(str(nuc)) for nuc in nuclides], dtype=np.int64)
+
     def gethalflife(self, nuclide: str) -> float:
         """
         Get the halflife of a given nuclide in seconds
@@ -310,6 +711,143 @@ class ReadOnlyDatabase:
         """
         raise AbstractClassException(ABSTRACT_STR_ERROR)
 
+    @asarray
+    def getenergiesunc(self, nuclide: str, spectype: str = "gamma") -> List[float]:
+        """
+        Get the line energy uncertainties of a given nuclide in eV.
+        Default spectral type is "gamma"
+        If nuclide has no spectral data then returns an empty array.
+        Abstract method - must be extended.
+
+        This array will be of the same size as getenergies
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a numpy array of energy uncertainties (eV) for the given
+        nuclide and decay type.
+        :raises AbstractClassException: raises an exception if called
+        """
+        raise AbstractClassException(ABSTRACT_STR_ERROR)
+
+    def getmanyenergies(self, nuclides, spectype: str = "gamma") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the line energies of many nuclides at once, in eV, as one
+        flat array with offsets (like compressed sparse rows): the lines
+        of nuclide i are values[offsets[i]:offsets[i+1]].
+
+        ```
+            energies, offsets = db.getmanyenergies(["H3", "Co60"], spectype="gamma")
+            co60 = energies[offsets[1]:offsets[2]]
+        ```
+
+        :param nuclides: a list or array of nuclide names, or of ZAIs
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a tuple of the numpy array of energies (eV) and the
+        numpy array of (nuclides + 1) offsets
+        :raises KeyError: raises an exception if a nuclide or spectype not
+        in database
+        """
+        values, offsets = self._manylines(nuclides, spectype, ["energies"])
+        return values[0], offsets
+
+    def getmanyenergiesunc(
+        self, nuclides, spectype: str = "gamma"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the line energy uncertainties of many nuclides at once, in eV.
+        See getmanyenergies.
+
+        :param nuclides: a list or array of nuclide names, or of ZAIs
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a tuple of the numpy array of energy uncertainties (eV)
+        and the numpy array of (nuclides + 1) offsets
+        :raises KeyError: raises an exception if a nuclide or spectype not
+        in database
+        """
+        values, offsets = self._manylines(nuclides, spectype, ["energies_unc"])
+        return values[0], offsets
+
+    def getmanyintensities(
+        self, nuclides, spectype: str = "gamma"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the normalised line intensities of many nuclides at once.
+        See getmanyenergies.
+
+        :param nuclides: a list or array of nuclide names, or of ZAIs
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a tuple of the numpy array of normalised intensities
+        and the numpy array of (nuclides + 1) offsets
+        :raises KeyError: raises an exception if a nuclide or spectype not
+        in database
+        """
+        values, offsets = self._manylines(nuclides, spectype, ["normintensities"])
+        return values[0], offsets
+
+    def getmanylines(
+        self,
+        nuclides,
+        spectype: str = "gamma",
+        columns: List[str] = ["energies", "normintensities"],
+    ) -> Tuple[List[np.ndarray], np.ndarray]:
+        """
+        Get several line quantities of many nuclides at once, sharing
+        the offsets, with a single lookup of each nuclide.
+        See getmanyenergies.
+
+        ```
+            (energies, intensities), offsets = db.getmanylines(["H3", "Co60"])
+        ```
+
+        :param nuclides: a list or array of nuclide names, or of ZAIs
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :param columns: the quantities, any of "energies", "energies_unc"
+        and "normintensities"
+        :returns: a tuple of the list of numpy arrays, one per column,
+        and the numpy array of (nuclides + 1) offsets
+        :raises KeyError: raises an exception if a nuclide or spectype not
+        in database
+        """
+        return self._manylines(nuclides, spectype, list(columns))
+
+    def _manynames(self, nuclides) -> List[str]:
+        # nuclides are given either by name or by ZAI
+        nuclides = np.asarray(nuclides).ravel()
+        if nuclides.dtype.kind not in "iu":
+            return [str(nuc) for nuc in nuclides]
+        names = self.getnames(nuclides)
+        for zai, name in zip(nuclides.tolist(), names):
+            if name is None:
+                raise KeyError(zai)
+        return names.tolist()
+
+    def _manylines(self, nuclides, spectype: str, columns: List[str]):
+        # one getter call per nuclide and column, all columns of a
+        # nuclide in turn, extend for something faster
+        getters = {
+            "energies": self.getenergies,
+            "energies_unc": self.getenergiesunc,
+            "normintensities": self.getintensities,
+        }
+        getters = [getters[column] for column in columns]
+        arrays = [
+            [np.asarray(getter(nuc, spectype=spectype), dtype=float) for getter in getters]
+            for nuc in self._manynames(nuclides)
+        ]
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(values[0]) if values else 0 for values in arrays])
+        values = [
+            np.concatenate([nuc[i] for nuc in arrays]) if arrays else np.zeros(0)
+            for i in range(len(columns))
+        ]
+        return values, offsets
+
 
 # a facade layer to interact with database
 class DefaultDatabase(ReadOnlyDatabase):
@@ -317,7 +855,11 @@ class DefaultDatabase(ReadOnlyDatabase):
     A simple read only database for interacting with data
 
     This assumes the datasource is a JSON file loader, conforming
-    to the correct schema
+    to the correct schema, or returns already packed DecayTables.
+
+    On load the data is packed into compact columnar tables (see
+    DecayTables), line accessors return read only views into them
+    and the raw dictionary is only rebuilt if asked for.
 
     ```
     {
@@ -346,7 +888,7 @@ class DefaultDatabase(ReadOnlyDatabase):
 
     IGNORE_KEYS = ["zai", "halflife"]
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, datasource=DatabaseJSONFileLoader()):
         """
         Construct the database given a datasource
 
@@ -358,7 +900,52 @@ class DefaultDatabase(ReadOnlyDatabase):
 
         :param datasource: context manager to load data into database
         """
-        ReadOnlyDatabase.__init__(self, *args, **kwargs)
+        ReadOnlyDatabase.__init__(self, datasource=None)
+
+        self._raw = None
+        self._tables = tablesfromdict({})
+        if datasource:
+            with datasource as data:
+                if isinstance(data, DecayTables):
+                    self._tables = data
+                else:
+                    self._tables = tablesfromdict(data, ignorekeys=self.IGNORE_KEYS)
+
+        # index the nuclides and ZAIs once, both ways, the first nuclide
+        # wins if a ZAI appears more than once
+        names, zais = self._tables.names, self._tables.zais.tolist()
+        self._index = {name: i for i, name in enumerate(names)}
+        self._names = {}
+        for name, zai in zip(names, zais):
+            self._names.setdefault(zai, name)
+        self._zais = dict(zip(names, zais))
+
+        # sorted copy of the index for bulk lookups with a binary search
+        self._sortedzais = np.array(sorted(self._names), dtype=np.int64)
+        self._sortednames = np.array(
+            [self._names[zai] for zai in self._sortedzais], dtype=object
+        )
+
+        # nuclide x type membership, with the sorted types of each
+        # nuclide and the nuclides of each type, so the type queries
+        # never have to scan the tables
+        self._types = sorted(self._tables.spectra)
+        self._typeindex = {spectype: j for j, spectype in enumerate(self._types)}
+        self._membership = np.zeros((len(names), len(self._types)), dtype=bool)
+        for j, spectype in enumerate(self._types):
+            self._membership[:, j] = self._tables.spectra[spectype].present
+        self._membership.flags.writeable = False
+
+        # nuclides with the same types share one list
+        typesets = {}
+        self._nuclidetypes = [
+            typesets.setdefault(row.tobytes(), [self._types[j] for j in np.flatnonzero(row)])
+            for row in self._membership
+        ]
+        self._nuclidesoftype = {
+            spectype: [names[i] for i in np.flatnonzero(self._membership[:, j])]
+            for j, spectype in enumerate(self._types)
+        }
 
     def __contains__(self, nuclide: str) -> bool:
         """
@@ -368,10 +955,106 @@ class DefaultDatabase(ReadOnlyDatabase):
         No spaces and case sensitive!
         :returns: boolean - true if in database, false otherwise
         """
-        return nuclide in self.raw
+        return nuclide in self._index
+
+    @constant
+    def raw(self):
+        """
+        Get the underlying datastructure - read only.
+        Allows users to perform own custom queries, but protected to be read only.
+        No setting permitted.
+
+        The data is stored in columnar tables so the dictionary is rebuilt
+        from them on first access.
+
+        :returns: a dictionary object representing the underlying data
+        """
+        if self._raw is None:
+            self._raw = self._tables.todict()
+        return self._raw
+
+    @constant
+    def tables(self) -> DecayTables:
+        """
+        Get the columnar tables holding the data - read only.
+
+        :returns: the DecayTables object
+        """
+        return self._tables
+
+    @constant
+    def metadata(self) -> dict:
+        """
+        Information about the data - read only.
+        For a pruned library its provenance, under "pruned".
+
+        :returns: a dictionary, empty if there is no information
+        """
+        return self._tables.metadata
+
+    def _contenthash(self) -> str:
+        return self._tables.fingerprint()
+
+    def linetable(self, spectype: str = "gamma") -> np.ndarray:
+        """
+        The lines of all nuclides for a spectral type as one flat table,
+        sorted by ascending energy, with fields:
+            energy, intensity, energy_unc, intensity_unc, nuclide
+
+        where nuclide is the index of the nuclide in allnuclides.
+        Intensities and their uncertainties are normalised.
+
+        The table is built once, on first use.
+
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a read only structured numpy array
+        """
+        return self._tables.linetable(spectype)
+
+    def nuclidetable(self) -> np.ndarray:
+        """
+        The ZAI, Z, A, I and halflife of all nuclides as one table,
+        indexed as allnuclides, with fields:
+            zai, z, a, i, halflife
+
+        The table is built once, on first use.
+
+        :returns: a read only structured numpy array
+        """
+        return self._tables.nuclidetable()
+
+    def getnuclideindices(self, nuclides) -> np.ndarray:
+        """
+        Get the indices in allnuclides of many nuclides at once
+
+        :param nuclides: a list or array of nuclide names
+        :returns: a numpy (integer) array of indices
+        :raises KeyError: raises an exception if a nuclide is not in database
+        """
+        index = self._index
+        return np.array([index[str(nuc)] for nuc in nuclides], dtype=np.int64)
+
+    def _spectrum(self, nuclide: str, spectype: str):
+        # the index of the nuclide and the table for the type,
+        # raising KeyError if the nuclide does not have that type
+        index = self._index[nuclide]
+        table = self._tables.spectra[spectype]
+        if not table.present[index]:
+            raise KeyError(spectype)
+        return index, table
+
+    @constant
+    def membership(self) -> np.ndarray:
+        """
+        Which nuclides have which decay types - read only.
+        Rows are indexed as allnuclides and columns as alltypes.
+
+        :returns: a boolean (nuclides x types) numpy array
+        """
+        return self._membership
 
     @property
-    @sortresult
     def alltypes(self) -> List[str]:
         """
         Return all possible unique decay mode types for the whole database
@@ -379,12 +1062,7 @@ class DefaultDatabase(ReadOnlyDatabase):
         :returns: a list of strings representing the list of decay types
         in the database
         """
-        spectypes = []
-        for _, v in self.raw.items():
-            for key in v.keys():
-                if key not in self.IGNORE_KEYS and key not in spectypes:
-                    spectypes.append(key)
-        return spectypes
+        return list(self._types)
 
     def haslines(self, nuclide: str, spectype: str = "gamma") -> bool:
         """
@@ -398,7 +1076,8 @@ class DefaultDatabase(ReadOnlyDatabase):
         has data in database
         :raises KeyError: raises an exception if nuclide and spectype not in database
         """
-        return "lines" in self.raw[nuclide][spectype]
+        index, table = self._spectrum(nuclide, spectype)
+        return bool(table.haslines[index])
 
     @property
     def allnuclides(self) -> List[str]:
@@ -409,7 +1088,7 @@ class DefaultDatabase(ReadOnlyDatabase):
         :returns: a list of strings representing the list of unique nuclides
         in the database
         """
-        return [k for k, _ in self.raw.items()]
+        return list(self._tables.names)
 
     def allnuclidesoftype(self, spectype: str = "gamma") -> List[str]:
         """
@@ -423,9 +1102,8 @@ class DefaultDatabase(ReadOnlyDatabase):
         in the database
         :raises KeyError: raises an exception if spectype not in database
         """
-        return [k for k, _ in self.raw.items() if spectype in self.raw[k].keys()]
+        return list(self._nuclidesoftype.get(spectype, []))
 
-    @sortresult
     def gettypes(self, nuclide: str) -> List[str]:
         """
         Return all unique spectral types for a given radionuclide in the database.
@@ -436,9 +1114,7 @@ class DefaultDatabase(ReadOnlyDatabase):
         types for that nuclide
         :raises KeyError: raises an exception if nuclide not in database
         """
-        return sorted(
-            [k for k, _ in self.raw[nuclide].items() if k not in self.IGNORE_KEYS]
-        )
+        return list(self._nuclidetypes[self._index[nuclide]])
 
     def hastype(self, nuclide: str, spectype: str = "gamma") -> bool:
         """
@@ -452,7 +1128,9 @@ class DefaultDatabase(ReadOnlyDatabase):
         :returns: boolean - true if in database, false otherwise
         :raises KeyError: raises an exception if nuclide not in database
         """
-        return spectype in self.raw[nuclide]
+        index = self._index[nuclide]
+        column = self._typeindex.get(spectype)
+        return column is not None and bool(self._membership[index, column])
 
     def getname(self, zai: int) -> str:
         """
@@ -469,10 +1147,35 @@ class DefaultDatabase(ReadOnlyDatabase):
         :returns: the radionuclide as a string i.e 'H3' or 'U235m'.
         No spaces and case sensitive!
         """
-        for k, v in self.raw.items():
-            if v["zai"] == zai:
-                return k
-        return None
+        return self._names.get(zai)
+
+    def getnames(self, zais) -> np.ndarray:
+        """
+        Get the names of many nuclides at once, given their ZAIs.
+        Unknown ZAIs give None.
+
+        :param zais: a list or array of ZAI numbers (integers)
+        :returns: a numpy (object) array of nuclide names
+        """
+        zais = np.asarray(zais, dtype=np.int64).ravel()
+        names = np.full(len(zais), None, dtype=object)
+        if len(self._sortedzais) > 0:
+            indices = np.searchsorted(self._sortedzais, zais)
+            indices[indices == len(self._sortedzais)] = 0
+            found = self._sortedzais[indices] == zais
+            names[found] = self._sortednames[indices[found]]
+        return names
+
+    def getzais(self, nuclides) -> np.ndarray:
+        """
+        Get the ZAIs of many nuclides at once, given their names.
+
+        :param nuclides: a list or array of nuclide names
+        :returns: a numpy (integer) array of ZAIs
+        :raises KeyError: raises an exception if a nuclide is not in database
+        """
+        zais = self._zais
+        return np.array([zais[str(nuc)] for nuc in nuclides], dtype=np.int64)
 
     def getzai(self, nuclide: str) -> int:
         """
@@ -491,7 +1194,7 @@ class DefaultDatabase(ReadOnlyDatabase):
         :returns: the ZAI number (integer) for the nuclide
         :raises KeyError: raises an exception if nuclide key not in database
         """
-        return self.raw[nuclide]["zai"]
+        return self._zais[nuclide]
 
     def gethalflife(self, nuclide: str) -> float:
         """
@@ -503,16 +1206,16 @@ class DefaultDatabase(ReadOnlyDatabase):
         :returns: the half life in seconds
         :raises KeyError: raises an exception if nuclide key not in database
         """
-        return self.raw[nuclide]["halflife"]
+        return float(self._tables.halflives[self._index[nuclide]])
 
-    @asarray
-    def getenergies(self, nuclide: str, spectype: str = "gamma") -> List[float]:
+    def getenergies(self, nuclide: str, spectype: str = "gamma") -> np.ndarray:
         """
         Get the line energies of a given nuclide in eV.
         Default spectral type is "gamma"
         Only provides discrete lines.
 
         If nuclide has no spectral data then returns an empty array.
+        The array is a read only view of the database.
 
         :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
         No spaces and case sensitive!
@@ -523,18 +1226,16 @@ class DefaultDatabase(ReadOnlyDatabase):
         :raises KeyError: raises an exception if nuclide and spectype not
         in database
         """
-        if self.haslines(nuclide, spectype=spectype):
-            return self.raw[nuclide][spectype]["lines"]["energies"]
-        return []
+        return self._lines(nuclide, spectype, "energies")
 
-    @asarray
-    def getenergiesunc(self, nuclide: str, spectype: str = "gamma") -> List[float]:
+    def getenergiesunc(self, nuclide: str, spectype: str = "gamma") -> np.ndarray:
         """
         Get the line energies uncertainties of a given nuclide in eV.
         Default spectral type is "gamma"
         Only provides discrete lines.
 
         If nuclide has no spectral data then returns an empty array.
+        The array is a read only view of the database.
 
         :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
         No spaces and case sensitive!
@@ -545,12 +1246,9 @@ class DefaultDatabase(ReadOnlyDatabase):
         :raises KeyError: raises an exception if nuclide and spectype not
         in database
         """
-        if self.haslines(nuclide, spectype=spectype):
-            return self.raw[nuclide][spectype]["lines"]["energies_unc"]
-        return []
+        return self._lines(nuclide, spectype, "energies_unc")
 
-    @asarray
-    def getintensities(self, nuclide: str, spectype: str = "gamma") -> List[float]:
+    def getintensities(self, nuclide: str, spectype: str = "gamma") -> np.ndarray:
         """
         Get the corresponding intensity values for each line energy of a
         given nuclide.
@@ -560,6 +1258,7 @@ class DefaultDatabase(ReadOnlyDatabase):
         Also multiplies by normalisation constant.
 
         If nuclide has no spectral data then returns an empty array.
+        The array is a read only view of the database.
 
         This array will be of the same size as getenergies
 
@@ -572,26 +1271,117 @@ class DefaultDatabase(ReadOnlyDatabase):
         :raises KeyError: raises an exception if nuclide and spectype
         not in database
         """
-        if self.haslines(nuclide, spectype=spectype):
-            return [
-                intensity * self.raw[nuclide][spectype]["lines"]["norms"][i]
-                for i, intensity in enumerate(
-                    self.raw[nuclide][spectype]["lines"]["intensities"]
-                )
-            ]
-        return []
+        return self._lines(nuclide, spectype, "normintensities")
+
+    def _lines(self, nuclide: str, spectype: str, column: str) -> np.ndarray:
+        index, table = self._spectrum(nuclide, spectype)
+        return table.lines(index, column)
+
+    def _manylines(self, nuclides, spectype: str, columns: List[str]):
+        # gather the slices of all nuclides from the flat line arrays
+        # in one go, without a call per nuclide
+        indices = self.getnuclideindices(self._manynames(nuclides))
+        table = self._tables.spectra.get(spectype)
+        if table is None or not table.present[indices].all():
+            if table is None and len(indices) == 0:
+                return [np.zeros(0) for _ in columns], np.zeros(1, dtype=np.int64)
+            raise KeyError(spectype)
+
+        starts = table.offsets[indices]
+        counts = table.offsets[indices + 1] - starts
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        positions = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], counts)
+        return [getattr(table, column)[positions] for column in columns], offsets
+
+
+# databases made by the factories, keyed on the datafile path, its
+# modification time and size, so a changed file is read again
+__DATABASE_INSTANCES__ = {}
+__DATABASE_INSTANCES_LOCK__ = threading.Lock()
+
+# whether the binary data was made from the JSON datafile as it is,
+# keyed on the modification times and sizes of both
+__BINARY_CHECKS__ = {}
+
+
+def _shareddatabase(path: str, statpath: str, makeloader, fresh: bool):
+    if fresh:
+        return DefaultDatabase(datasource=makeloader(path))
+
+    stat = os.stat(statpath)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with __DATABASE_INSTANCES_LOCK__:
+        if key not in __DATABASE_INSTANCES__:
+            # drop any instance of an older version of the file
+            for oldkey in [k for k in __DATABASE_INSTANCES__ if k[0] == key[0]]:
+                del __DATABASE_INSTANCES__[oldkey]
+            __DATABASE_INSTANCES__[key] = DefaultDatabase(datasource=makeloader(path))
+        return __DATABASE_INSTANCES__[key]
+
+
+def _binaryiscurrent(directory: str, datafile: str) -> bool:
+    if not os.path.exists(datafile):
+        # i.e. only the binary data is installed
+        return True
+    try:
+        manifest = os.stat(os.path.join(directory, TABLES_MANIFEST))
+        data = os.stat(datafile)
+    except OSError:
+        return False
+    key = (directory, manifest.st_mtime_ns, manifest.st_size, data.st_mtime_ns, data.st_size)
+    with __DATABASE_INSTANCES_LOCK__:
+        if key not in __BINARY_CHECKS__:
+            __BINARY_CHECKS__[key] = tablesmatch(directory, datafile)
+        return __BINARY_CHECKS__[key]
 
 
 # some aliases for decay data
-def Decay2012Database():
+def Decay2012Database(fresh: bool = False):
     """
     Alias/factory for decay 2012 data
+
+    Uses the binary format if it has been made from the JSON file as it
+    is now (see savetables), otherwise the JSON file.
+
+    The data is only read once per process, all calls share the same
+    (read only) database instance unless the file has changed since.
+
+    :param fresh: if True always read the data into a new instance,
+    which is not shared
+    :returns: the database
     """
-    return DefaultDatabase(
-        datasource=DatabaseJSONFileLoader(datafile=__RAW_DATABASE_DECAY_2012_FILE__)
+    if os.path.isdir(__BINARY_DATABASE_DECAY_2012_DIR__) and _binaryiscurrent(
+        __BINARY_DATABASE_DECAY_2012_DIR__, __RAW_DATABASE_DECAY_2012_FILE__
+    ):
+        return _shareddatabase(
+            __BINARY_DATABASE_DECAY_2012_DIR__,
+            os.path.join(__BINARY_DATABASE_DECAY_2012_DIR__, TABLES_MANIFEST),
+            lambda path: DatabaseBinaryLoader(directory=path),
+            fresh,
+        )
+    return _shareddatabase(
+        __RAW_DATABASE_DECAY_2012_FILE__,
+        __RAW_DATABASE_DECAY_2012_FILE__,
+        lambda path: DatabaseJSONFileLoader(datafile=path),
+        fresh,
     )
 
 
+def clear_database_cache():
+    """
+    Forget all shared databases made by the factories, i.e.
+    Decay2012Database, the next call will read the data again.
+    Existing instances are not affected.
+    """
+    with __DATABASE_INSTANCES_LOCK__:
+        __DATABASE_INSTANCES__.clear()
+        __BINARY_CHECKS__.clear()
+
+
+Decay2012Database.clear_cache = clear_database_cache
+
+
 def sortedlines(
     db: ReadOnlyDatabase, spectype: str = "gamma", byenergy: bool = True
 ) -> List[Tuple[str, float]]:
@@ -617,16 +1407,11 @@ def sortedlines(
     ```
     """
 
-    # get all nuclides of type spectype
-    allnuclides = db.allnuclidesoftype(spectype=spectype)
-
-    # all lines
-    alllines = []
-    for nuc in allnuclides:
-        lines = db.getenergies(nuc, spectype=spectype)
-        nuclides = [nuc] * len(lines)
-        alllines.extend(zip(nuclides, lines))
+    table = db.linetable(spectype=spectype)
+    names = db.allnuclides
+    alllines = list(zip([names[i] for i in table["nuclide"]], table["energy"].tolist()))
 
-    # sort by energy
-    key = 1 if byenergy else 0
-    return sorted(alllines, key=lambda x: x[key])
+    # already sorted by energy
+    if byenergy:
+        return alllines
+    return sorted(alllines, key=lambda x: x[0])
@@ -32,3 +32,9 @@ class NoDataException(ActiGammaException):
     """
         Exception for missing data in the database
     """
+
+
+class DatabaseFormatException(ActiGammaException):
+    """
+        Exception for a database file or directory that cannot be read
+    """
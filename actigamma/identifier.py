@@ -5,7 +5,7 @@
 import numpy as np
 
 
-from .database import ReadOnlyDatabase, sortedlines
+from .database import ReadOnlyDatabase
 from .core import EnergyGrid
 
 
@@ -66,30 +66,29 @@ class BinWiseNuclideIdentifier():
             except:
                 print("Progress not possible without tqdm.")
 
-        # get all lines of that type from the database and sort them in ascending energy
-        sorteddata = sortedlines(self.db, spectype=spectype, byenergy=True)
+        # get all lines of that type from the database, already sorted in
+        # ascending energy, and find the slice of lines in each bin at once
+        table = self.db.linetable(spectype=spectype)
+        energies = table["energy"]
+        names = self.db.allnuclides
+        starts = np.searchsorted(energies, grid.bounds[:-1], side="left")
+        ends = np.searchsorted(energies, grid.bounds[1:], side="left")
+
+        excludes = set(excludes)
 
-        lastindex = 0
-        # get lower and upper energy bounds
         # loop through hist
-        for ihist, (lb, ub) in iterable(enumerate(zip(grid.bounds[:-1], grid.bounds[1:]))):
+        for ihist in iterable(range(grid.nrofbins)):
 
             # the potential nuclides in the current bin
             nucs = []
 
             # only if the value is non zero
             if values[ihist] > 0:
-                # loop over database lines
-                for iline, (nuc, energy) in enumerate(sorteddata[lastindex:]):
-
-                    # if line energy is greater than hist bound - skip to next bin
-                    if energy > ub:
-                        break
-
-                    lastindex = iline
-                    # found a nuclide
-                    if (energy >= lb) and (energy < ub) and (nuc not in excludes):
-                        nucs.append((nuc, energy))
+                # lines with lb <= energy < ub
+                for line in table[starts[ihist]:ends[ihist]]:
+                    nuc = names[line["nuclide"]]
+                    if nuc not in excludes:
+                        nucs.append((nuc, line["energy"]))
 
             self.nuclides.append(nucs)
 
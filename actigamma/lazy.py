@@ -0,0 +1,464 @@
+"""
+    Lazy, per nuclide, loading of the JSON database
+
+    An index file records the byte offset and length of each nuclide's
+    entry in the JSON datafile, along with its ZAI, halflife and decay
+    types. The lazy database reads only the index up front and decodes
+    the spectral data of a nuclide the first time it is asked for,
+    keeping a bounded number of decoded nuclides in memory.
+
+    ```
+    # once, next to the datafile
+    ag.writejsonindex("lines_decay_2012.min.json")
+
+    db = ag.LazyDatabase("lines_decay_2012.min.json", maxentries=64)
+    db.getenergies("Co60", spectype="gamma")
+    ```
+
+    Useful when only a few nuclides are ever needed - for the whole
+    library the binary format (see DatabaseBinaryLoader) is faster.
+"""
+import collections
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+from typing import List
+
+from .database import __RAW_DATABASE_DECAY_2012_FILE__, DefaultDatabase, ReadOnlyDatabase
+from .exceptions import DatabaseFormatException
+from .tables import DecayTables, tablesfromdict
+from .util import filestamp, stampmatches
+
+# bump if the layout of the index file changes
+LAZY_INDEX_VERSION = 2
+
+# the index file, by default, is the datafile with this suffix
+LAZY_INDEX_SUFFIX = ".index.json"
+
+
+def _skipspace(text: str, pos: int) -> int:
+    while text[pos] in " \t\n\r":
+        pos += 1
+    return pos
+
+
+def indexentry(
+    name: str, entry: dict, offset: int, length: int, ignorekeys: List[str] = DefaultDatabase.IGNORE_KEYS
+) -> list:
+    """
+    The index of a single nuclide, see writejsonindex
+
+    :param name: the nuclide name
+    :param entry: the decoded data of the nuclide
+    :param offset: the byte offset of the entry in the datafile
+    :param length: the length in bytes of the entry in the datafile
+    :param ignorekeys: the nuclide keys that are not spectral types
+    :returns: the index entry as a list
+    """
+    types = [key for key in entry if key not in ignorekeys]
+    return [
+        name,
+        int(entry["zai"]),
+        float(entry["halflife"]),
+        offset,
+        length,
+        types,
+        [key for key in types if "lines" in entry[key]],
+    ]
+
+
+def indexjson(datafile: str, ignorekeys: List[str] = DefaultDatabase.IGNORE_KEYS) -> dict:
+    """
+    Scan a JSON datafile and index the entry of every nuclide.
+    Every entry is decoded once, to check it and to find its types.
+
+    :param datafile: the JSON datafile, in the schema of DatabaseJSONFileLoader
+    :param ignorekeys: the nuclide keys that are not spectral types
+    :returns: the index as a dictionary, see writejsonindex
+    """
+    with open(datafile, "rb") as fdata:
+        content = fdata.read()
+    text = content.decode("utf-8")
+    ascii = text.isascii()
+    decoder = json.JSONDecoder()
+
+    nuclides = []
+    lastpos, lastbyte = 0, 0
+
+    def tobyte(pos):
+        # byte offset of a character position, counted incrementally
+        # so positions must be given in increasing order
+        nonlocal lastpos, lastbyte
+        if ascii:
+            return pos
+        lastbyte += len(text[lastpos:pos].encode("utf-8"))
+        lastpos = pos
+        return lastbyte
+
+    try:
+        pos = _skipspace(text, 0)
+        if text[pos] != "{":
+            raise ValueError("expected an object")
+        pos = _skipspace(text, pos + 1)
+        while text[pos] != "}":
+            name, pos = decoder.raw_decode(text, pos)
+            pos = _skipspace(text, pos)
+            if text[pos] != ":":
+                raise ValueError("expected ':' after {}".format(name))
+            start = _skipspace(text, pos + 1)
+            entry, end = decoder.raw_decode(text, start)
+
+            startbyte, endbyte = tobyte(start), tobyte(end)
+            nuclides.append(indexentry(name, entry, startbyte, endbyte - startbyte, ignorekeys))
+
+            pos = _skipspace(text, end)
+            if text[pos] == ",":
+                pos = _skipspace(text, pos + 1)
+    except (ValueError, KeyError, IndexError) as e:
+        raise DatabaseFormatException("Cannot index {}: {}".format(datafile, e))
+
+    return indexdict(datafile, hashlib.sha1(content).hexdigest(), nuclides)
+
+
+def indexdict(datafile: str, sha1: str, nuclides: list) -> dict:
+    """
+    The index of a datafile, stamped with its size, modification time
+    and content hash, see writejsonindex
+
+    :param datafile: the JSON datafile
+    :param sha1: the sha1 hex digest of the datafile content
+    :param nuclides: the index entry of each nuclide, see indexentry
+    :returns: the index as a dictionary
+    """
+    index = {"version": LAZY_INDEX_VERSION}
+    index.update(filestamp(datafile, sha1=sha1))
+    index["nuclides"] = nuclides
+    return index
+
+
+def writejsonindex(datafile: str, indexfile: str = None) -> str:
+    """
+    Index a JSON datafile and write the index file for LazyDatabase.
+
+    The index is a JSON file:
+    {
+        'version': 2,
+        'size': <size of the datafile in bytes>,
+        'mtime_ns': <modification time of the datafile in ns>,
+        'sha1': <sha1 hex digest of the datafile content>,
+        'nuclides': [
+            [name, zai, halflife, offset, length, [types], [types with lines]],
+            ...
+        ]
+    }
+
+    :param datafile: the JSON datafile
+    :param indexfile: the index file to write, by default next to the
+    datafile with LAZY_INDEX_SUFFIX
+    :returns: the path of the index file
+    """
+    if indexfile is None:
+        indexfile = datafile + LAZY_INDEX_SUFFIX
+    index = indexjson(datafile)
+    with open(indexfile, "wt") as findex:
+        json.dump(index, findex)
+    return indexfile
+
+
+class LazyDatabase(ReadOnlyDatabase):
+    """
+    A read only database that decodes each nuclide from the JSON
+    datafile only when first accessed.
+
+    Names, ZAIs, halflives and decay types come from the index and
+    are always available. Line data is decoded per nuclide and kept
+    in a least recently used cache of at most maxentries nuclides.
+
+    If there is no index file the datafile is indexed on construction,
+    which decodes it once - write the index with writejsonindex to
+    avoid this.
+
+    Hit and miss counters of the cache are kept for monitoring.
+    Safe to use from several threads.
+
+    Aggregators do not build response matrices for a lazy database,
+    which would decode every nuclide, but find the lines of each
+    inventory instead.
+    """
+
+    LAZY = True
+
+    def __init__(
+        self,
+        datafile: str = __RAW_DATABASE_DECAY_2012_FILE__,
+        indexfile: str = None,
+        maxentries: int = 128,
+    ):
+        """
+        :param datafile: the JSON datafile
+        :param indexfile: the index file, by default next to the datafile
+        with LAZY_INDEX_SUFFIX
+        :param maxentries: the maximum number of decoded nuclides kept
+        :raises DatabaseFormatException: if the index is of another version
+        or does not match the datafile
+        """
+        ReadOnlyDatabase.__init__(self, datasource=None)
+
+        if indexfile is None:
+            indexfile = datafile + LAZY_INDEX_SUFFIX
+        if os.path.exists(indexfile):
+            with open(indexfile, "rt") as findex:
+                index = json.load(findex)
+        else:
+            index = indexjson(datafile)
+
+        if index.get("version") != LAZY_INDEX_VERSION:
+            raise DatabaseFormatException(
+                "Unsupported index version {} in {}".format(index.get("version"), indexfile)
+            )
+        if not stampmatches(index, datafile):
+            raise DatabaseFormatException(
+                "Index {} does not match {} - please rebuild it".format(indexfile, datafile)
+            )
+
+        self.datafile = datafile
+        self._sha1 = index["sha1"]
+        self.maxentries = int(maxentries)
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        nuclides = index["nuclides"]
+        self._nuclides = [entry[0] for entry in nuclides]
+        self._index = {entry[0]: entry for entry in nuclides}
+        self._names = {}
+        for entry in nuclides:
+            self._names.setdefault(entry[1], entry[0])
+        self._types = sorted({t for entry in nuclides for t in entry[5]})
+
+    def __contains__(self, nuclide: str) -> bool:
+        """
+        Check if nuclide exists in database
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :returns: boolean - true if in database, false otherwise
+        """
+        return nuclide in self._index
+
+    @property
+    def ncached(self) -> int:
+        """
+        The number of decoded nuclides currently kept
+        """
+        return len(self._entries)
+
+    def _contenthash(self) -> str:
+        # the hash of the datafile from the index, decoding every
+        # nuclide to hash the lines would defeat the lazy database
+        return hashlib.sha1("lazy:{}".format(self._sha1).encode()).hexdigest()
+
+    @property
+    def raw(self):
+        """
+        Get the underlying datastructure, decoding the whole datafile.
+        Not cached, defeats the purpose of the lazy database.
+
+        :returns: a dictionary object representing the underlying data
+        """
+        with open(self.datafile, "rt") as fjson:
+            return json.loads(fjson.read())
+
+    @property
+    def alltypes(self) -> List[str]:
+        """
+        Return all possible unique decay mode types for the whole database
+
+        :returns: a list of strings representing the list of decay types
+        in the database
+        """
+        return list(self._types)
+
+    def haslines(self, nuclide: str, spectype: str = "gamma") -> bool:
+        """
+        Return true if nuclide has spectral information, false otherwise
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: boolean based on if spectral data for type exists and
+        has data in database
+        :raises KeyError: raises an exception if nuclide and spectype not in database
+        """
+        entry = self._index[nuclide]
+        if spectype not in entry[5]:
+            raise KeyError(spectype)
+        return spectype in entry[6]
+
+    @property
+    def allnuclides(self) -> List[str]:
+        """
+        Return all unique nuclides for the whole database.
+
+        :returns: a list of strings representing the list of unique nuclides
+        in the database
+        """
+        return list(self._nuclides)
+
+    def allnuclidesoftype(self, spectype: str = "gamma") -> List[str]:
+        """
+        Return all unique nuclides for the whole database matching a specific
+        decay type, default is "gamma".
+
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a list of strings representing the list of unique nuclides
+        in the database
+        """
+        return [name for name in self._nuclides if spectype in self._index[name][5]]
+
+    def gettypes(self, nuclide: str) -> List[str]:
+        """
+        Return all unique spectral types for a given radionuclide in the database.
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :returns: a list of strings representing the list of unique spcetral
+        types for that nuclide
+        :raises KeyError: raises an exception if nuclide not in database
+        """
+        return sorted(self._index[nuclide][5])
+
+    def hastype(self, nuclide: str, spectype: str = "gamma") -> bool:
+        """
+        Check if it has that particular decay type
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: boolean - true if in database, false otherwise
+        :raises KeyError: raises an exception if nuclide not in database
+        """
+        return spectype in self._index[nuclide][5]
+
+    def getname(self, zai: int) -> str:
+        """
+        Get the name of a nuclide, given a ZAI.
+        ZAI = Z (charge), A (mass number), I (isomeric state)
+
+        :param zai: the ZAI number (integer) for the nuclide
+        :returns: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        """
+        return self._names.get(zai)
+
+    def getzai(self, nuclide: str) -> int:
+        """
+        Get the ZAI of a nuclide, given a nuclide name.
+        ZAI = Z (charge), A (mass number), I (isomeric state)
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :returns: the ZAI number (integer) for the nuclide
+        :raises KeyError: raises an exception if nuclide key not in database
+        """
+        return self._index[nuclide][1]
+
+    def gethalflife(self, nuclide: str) -> float:
+        """
+        Get the halflife of a given nuclide in seconds
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :returns: the half life in seconds
+        :raises KeyError: raises an exception if nuclide key not in database
+        """
+        return self._index[nuclide][2]
+
+    def getenergies(self, nuclide: str, spectype: str = "gamma") -> np.ndarray:
+        """
+        Get the line energies of a given nuclide in eV.
+        Default spectral type is "gamma"
+        Only provides discrete lines.
+        If nuclide has no spectral data then returns an empty array.
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a numpy array of energies (eV) for the given nuclide
+        and decay type.
+        :raises KeyError: raises an exception if nuclide and spectype not
+        in database
+        """
+        return self._lines(nuclide, spectype, "energies")
+
+    def getenergiesunc(self, nuclide: str, spectype: str = "gamma") -> np.ndarray:
+        """
+        Get the line energy uncertainties of a given nuclide in eV.
+        Default spectral type is "gamma"
+        If nuclide has no spectral data then returns an empty array.
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a numpy array of energy uncertainties (eV) for the given
+        nuclide and decay type.
+        :raises KeyError: raises an exception if nuclide and spectype not
+        in database
+        """
+        return self._lines(nuclide, spectype, "energies_unc")
+
+    def getintensities(self, nuclide: str, spectype: str = "gamma") -> np.ndarray:
+        """
+        Get the corresponding intensity values for each line energy of a
+        given nuclide.
+        Default spectral type is "gamma".
+        Intensity values will be between 0 and 1.
+        Also multiplies by normalisation constant.
+        If nuclide has no spectral data then returns an empty array.
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a numpy array of normalised intensities for the given
+        nuclide and decay type.
+        :raises KeyError: raises an exception if nuclide and spectype
+        not in database
+        """
+        return self._lines(nuclide, spectype, "normintensities")
+
+    def _lines(self, nuclide: str, spectype: str, column: str) -> np.ndarray:
+        entry = self._index[nuclide]
+        if spectype not in entry[5]:
+            raise KeyError(spectype)
+        return self._decode(entry).spectra[spectype].lines(0, column)
+
+    def _decode(self, entry) -> DecayTables:
+        # the decoded tables of a single nuclide, from the cache if kept
+        name = entry[0]
+        with self._lock:
+            tables = self._entries.get(name)
+            if tables is not None:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return tables
+            self.misses += 1
+
+        with open(self.datafile, "rb") as fdata:
+            fdata.seek(entry[3])
+            data = json.loads(fdata.read(entry[4]).decode("utf-8"))
+        tables = tablesfromdict({name: data}, ignorekeys=DefaultDatabase.IGNORE_KEYS)
+
+        with self._lock:
+            self._entries[name] = tables
+            while len(self._entries) > self.maxentries:
+                self._entries.popitem(last=False)
+        return tables
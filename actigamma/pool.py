@@ -0,0 +1,142 @@
+"""
+    Aggregating large batches on a pool of worker processes
+
+    The database is published once into shared memory (see shared.py)
+    and each worker attaches to it, and builds its aggregator on the
+    same grid, when it starts. Tasks then only carry a chunk of
+    inventories, not the database or grid.
+
+    ```
+    lc = ag.LineAggregator(db, grid)
+    with ag.AggregatorPool(lc, workers=8) as pool:
+        hists = pool.batch(inventories, spectype="gamma")
+    ```
+
+    Each worker keeps its own cache of response matrices, so a matrix
+    is built at most once per worker.
+"""
+import multiprocessing
+import os
+import numpy as np
+
+from .cache import ResponseCache
+from .core import EnergyGrid, LineAggregator
+from .database import DatabaseTablesLoader, DefaultDatabase
+from .shared import attachdatabase, publishdatabase
+from .tables import tablesfromdict
+
+# the aggregator of a worker process, set by the pool initializer
+__WORKER_AGGREGATOR__ = None
+
+
+def _initworker(cls, handle, bounds):
+    global __WORKER_AGGREGATOR__
+    __WORKER_AGGREGATOR__ = cls(
+        attachdatabase(handle), EnergyGrid(bounds=bounds), cache=ResponseCache()
+    )
+
+
+def _workerbatch(task):
+    start, inventories, kwargs = task
+    return start, __WORKER_AGGREGATOR__.batch(inventories, **kwargs)
+
+
+class AggregatorPool:
+    """
+    A pool of worker processes aggregating batches of inventories with
+    copies of an aggregator, see LineAggregator.batch.
+
+    The aggregator class must be importable by the workers, and is
+    constructed with the database and grid only, so subclasses must
+    not need any other state.
+
+    Use as a context manager, or call close, to stop the workers and
+    release the shared database.
+    """
+
+    __slots__ = ["aggregator", "workers", "_shared", "_pool"]
+
+    def __init__(self, aggregator: LineAggregator, workers: int = None, context: str = None):
+        """
+        :param aggregator: the aggregator to copy to the workers
+        :param workers: the number of worker processes, by default the
+        number of CPUs
+        :param context: the multiprocessing start method, i.e. "spawn",
+        None for the default
+        """
+        self.aggregator = aggregator
+        self.workers = workers or os.cpu_count() or 1
+
+        db = aggregator.db
+        if not hasattr(db, "tables"):
+            # i.e. a LazyDatabase, packed into tables once here
+            db = DefaultDatabase(datasource=DatabaseTablesLoader(tablesfromdict(db.raw)))
+
+        self._shared = publishdatabase(db)
+        try:
+            self._pool = multiprocessing.get_context(context).Pool(
+                self.workers,
+                initializer=_initworker,
+                initargs=(type(aggregator), self._shared.handle, aggregator.grid.bounds),
+            )
+        except BaseException:
+            self._shared.close()
+            raise
+
+    def batch(
+        self, inventories, out: np.ndarray = None, chunksize: int = None, **kwargs
+    ) -> np.ndarray:
+        """
+        Aggregate many inventories on the workers, as
+        LineAggregator.batch. All other arguments are passed to it,
+        i.e. spectype.
+
+        The inventories are split into chunks given to the workers as
+        they become free. The histograms are always in the order of
+        the inventories.
+
+        :param inventories: a sequence of N inventories, or a 2-D
+        (N x nuclides) activity matrix, see LineAggregator.batch
+        :param out: an optional (N x bins) array to write the histograms to
+        :param chunksize: the number of inventories in a task, by default
+        such that each worker gets about 4 tasks
+        :returns: the (N x bins) histograms, out if given
+        """
+        if not isinstance(inventories, np.ndarray) and not hasattr(inventories, "__len__"):
+            inventories = list(inventories)
+
+        n = len(inventories)
+        if out is not None and len(out) != n:
+            raise ValueError("Output must have {} rows, not {}".format(n, len(out)))
+        if n == 0:
+            return self.aggregator.batch(inventories, out=out, **kwargs)
+
+        if chunksize is None:
+            chunksize = -(-n // (4 * self.workers))
+        chunksize = max(1, int(chunksize))
+
+        tasks = (
+            (start, inventories[start : start + chunksize], kwargs)
+            for start in range(0, n, chunksize)
+        )
+        for start, hists in self._pool.imap_unordered(_workerbatch, tasks):
+            if out is None:
+                out = np.zeros((n,) + hists.shape[1:])
+            out[start : start + len(hists)] = hists
+        return out
+
+    def close(self):
+        """
+        Stop the workers and release the shared database
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        self._shared.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
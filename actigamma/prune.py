@@ -0,0 +1,156 @@
+"""
+    Pruned sub-libraries of a database
+
+    Many runs only need a few spectral types, in an energy window,
+    above an intensity floor. A pruned library keeps only that part
+    of the data, so it is smaller to load and faster to aggregate,
+    and records where it came from.
+
+    ```
+    spec = ag.PruneSpec(spectypes=["gamma", "x-ray"], energy=(10e3, 3e6),
+                        min_intensity=1e-4)
+    pruned = ag.prunedatabase(ag.Decay2012Database(), spec)
+    ag.savetables(pruned.tables, "lines_gamma_xray")
+
+    # later
+    pruned = ag.DefaultDatabase(datasource=ag.DatabaseBinaryLoader("lines_gamma_xray"))
+    pruned.metadata["pruned"]["parent"]
+    ```
+"""
+import numpy as np
+from typing import List, Tuple
+
+from .database import DatabaseTablesLoader, DefaultDatabase
+from .tables import LINE_COLUMNS, SPECTRUM_COLUMNS, DecayTables
+
+
+class PruneSpec:
+    """
+    What to keep when pruning a database.
+
+    Ranges are (lower, upper) tuples, with the lower bound inclusive
+    and the upper bound exclusive, like range(). Either bound can be
+    None for no limit, and a range of None keeps everything.
+
+    Attributes:
+        spectypes       - the spectral types to keep, None for all
+        energy          - the range of line energy (eV) to keep
+        min_intensity   - the minimum (normalised) line intensity to keep
+        halflife        - the range of nuclide halflife (s) to keep
+    """
+
+    __slots__ = ["spectypes", "energy", "min_intensity", "halflife"]
+
+    def __init__(
+        self,
+        spectypes: List[str] = None,
+        energy: Tuple[float, float] = None,
+        min_intensity: float = 0.0,
+        halflife: Tuple[float, float] = None,
+    ):
+        self.spectypes = list(spectypes) if spectypes is not None else None
+        self.energy = tuple(energy) if energy is not None else None
+        self.min_intensity = float(min_intensity)
+        self.halflife = tuple(halflife) if halflife is not None else None
+
+    def todict(self) -> dict:
+        """
+        The spec as a JSON serialisable dictionary
+        """
+        return {
+            "spectypes": self.spectypes,
+            "energy": list(self.energy) if self.energy is not None else None,
+            "min_intensity": self.min_intensity,
+            "halflife": list(self.halflife) if self.halflife is not None else None,
+        }
+
+    @staticmethod
+    def fromdict(data: dict):
+        """
+        Make the spec from a dictionary given by todict
+        """
+        return PruneSpec(**data)
+
+
+def _inrange(values: np.ndarray, bounds: Tuple[float, float]) -> np.ndarray:
+    mask = np.ones(len(values), dtype=bool)
+    if bounds is not None:
+        if bounds[0] is not None:
+            mask &= values >= bounds[0]
+        if bounds[1] is not None:
+            mask &= values < bounds[1]
+    return mask
+
+
+def prunetables(db: DefaultDatabase, spec: PruneSpec) -> DecayTables:
+    """
+    Make the pruned tables of a database.
+
+    Nuclides outside the halflife range are removed. All other nuclides
+    are kept, with only the selected spectral types, and the lines of
+    those outside the energy range or below the minimum intensity
+    removed - a nuclide with no lines left gives an empty spectrum,
+    as it would with the full library.
+
+    The line count (number) of each spectrum is updated, other
+    spectrum quantities (i.e. mean_energy) are of the parent library.
+
+    The metadata records the spec and the fingerprint of the parent,
+    under "pruned".
+
+    :param db: the parent database
+    :param spec: what to keep
+    :returns: the pruned tables
+    """
+    tables = db.tables
+    keep = np.flatnonzero(_inrange(np.asarray(tables.halflives), spec.halflife))
+
+    arrays = {
+        "names": np.array([tables.names[i] for i in keep], dtype=str),
+        "zais": tables.zais[keep],
+        "halflives": tables.halflives[keep],
+    }
+
+    # the new index of each nuclide, -1 if removed
+    newindex = np.full(len(tables), -1, dtype=np.int64)
+    newindex[keep] = np.arange(len(keep))
+
+    for spectype, table in tables.spectra.items():
+        if spec.spectypes is not None and spectype not in spec.spectypes:
+            continue
+
+        linenuclides = np.repeat(newindex, np.diff(table.offsets))
+
+        lines = (linenuclides >= 0) & _inrange(np.asarray(table.energies), spec.energy)
+        if spec.min_intensity > 0:
+            lines &= table.normintensities >= spec.min_intensity
+        counts = np.bincount(linenuclides[lines], minlength=len(keep))
+
+        prefix = "{}/".format(spectype)
+        arrays[prefix + "present"] = table.present[keep]
+        arrays[prefix + "haslines"] = table.haslines[keep]
+        arrays[prefix + "number"] = np.where(table.number[keep] >= 0, counts, -1)
+        arrays[prefix + "offsets"] = np.concatenate([[0], np.cumsum(counts)])
+        for column in SPECTRUM_COLUMNS:
+            arrays[prefix + column] = getattr(table, column)[keep]
+        for column in LINE_COLUMNS + ["normintensities"]:
+            arrays[prefix + column] = getattr(table, column)[lines]
+
+    provenance = {
+        "parent": db.fingerprint,
+        "parent_metadata": tables.metadata,
+        "spec": spec.todict(),
+    }
+    return DecayTables(arrays, metadata={"pruned": provenance})
+
+
+def prunedatabase(db: DefaultDatabase, spec: PruneSpec) -> DefaultDatabase:
+    """
+    Make a pruned, read only, database, see prunetables.
+    Save its tables with savetables or savesqlite to keep it.
+
+    :param db: the parent database
+    :param spec: what to keep
+    :returns: the pruned database
+    """
+    return DefaultDatabase(datasource=DatabaseTablesLoader(prunetables(db, spec)))
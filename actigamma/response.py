@@ -0,0 +1,192 @@
+"""
+    Precomputed response matrices mapping nuclide activities to binned spectra
+
+    For a fixed database, energy grid and spectral type the binned
+    spectrum is linear in the nuclide activities, so all of the line
+    lookup and binning can be done once and stored as a sparse
+    (nuclides x bins) matrix. A histogram is then a single sparse
+    product with an activity vector, and a batch of histograms a
+    single product with an activity matrix.
+"""
+import numpy as np
+from typing import List
+
+# the maximum number of gathered (vector, entry) values held at once
+# when multiplying with an activity matrix, 32 MB of floats
+DOT_BLOCK_ENTRIES = 4 * 1024 ** 2
+
+
+class ResponseMatrix:
+    """
+    A sparse (nuclides x bins) matrix in compressed sparse row (CSR)
+    format, built with numpy only.
+
+    Each row corresponds to a nuclide and holds the value that one Bq
+    of that nuclide contributes to each bin of the energy grid.
+
+    Rows are defined for every nuclide having the spectral type, even
+    if none of its lines fall within the grid (an empty row).
+    """
+
+    __slots__ = ["nuclides", "zais", "nrofbins", "indptr", "indices", "data", "_rows"]
+
+    def __init__(
+        self,
+        nuclides: List[str],
+        zais,
+        nrofbins: int,
+        rows: np.ndarray,
+        indices: np.ndarray,
+        values: np.ndarray,
+    ):
+        """
+        Construct the matrix from unordered (row, bin, value) entries.
+        Duplicate (row, bin) entries are summed.
+
+        :param nuclides: the nuclide names, one per row
+        :param zais: the nuclide ZAIs, one per row
+        :param nrofbins: the number of bins (columns)
+        :param rows: the row index of each entry
+        :param indices: the bin index of each entry
+        :param values: the value of each entry
+        """
+        self.nuclides = list(nuclides)
+        self.zais = np.asarray(zais, dtype=np.int64)
+        self.nrofbins = int(nrofbins)
+        self._rows = {int(zai): i for i, zai in enumerate(self.zais)}
+
+        rows = np.asarray(rows, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+        values = np.asarray(values, dtype=float)
+
+        # combine entries sharing the same (row, bin) - the keys are
+        # unique and already in row then bin order after np.unique
+        keys, inverse = np.unique(rows * self.nrofbins + indices, return_inverse=True)
+        self.data = np.bincount(inverse, weights=values, minlength=len(keys))
+        self.indices = keys % self.nrofbins if self.nrofbins > 0 else keys
+        self.indptr = np.searchsorted(
+            keys // max(self.nrofbins, 1), np.arange(len(self.nuclides) + 1)
+        )
+
+    @property
+    def shape(self):
+        """
+        The shape of the matrix, (nuclides, bins)
+        """
+        return len(self.nuclides), self.nrofbins
+
+    @property
+    def nnz(self) -> int:
+        """
+        The number of stored (non zero) entries
+        """
+        return len(self.data)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory used by the matrix arrays in bytes
+        """
+        return self.data.nbytes + self.indices.nbytes + self.indptr.nbytes + self.zais.nbytes
+
+    def __contains__(self, zai: int) -> bool:
+        """
+        Check if a nuclide, by ZAI, has a row in the matrix
+        """
+        return zai in self._rows
+
+    def rowof(self, zai: int) -> int:
+        """
+        Get the row index of a nuclide given its ZAI
+
+        :param zai: the ZAI number (integer) for the nuclide
+        :returns: the row index in the matrix
+        :raises KeyError: if the nuclide has no row
+        """
+        return self._rows[zai]
+
+    def rowsof(self, zais) -> np.ndarray:
+        """
+        Get the row indices of many nuclides given their ZAIs
+
+        :param zais: the ZAI numbers (integers) of the nuclides
+        :returns: an array of the row index of each, -1 for nuclides
+        without a row
+        """
+        return np.fromiter(
+            (self._rows.get(int(zai), -1) for zai in zais), dtype=np.int64, count=len(zais)
+        )
+
+    def dot(self, activities: np.ndarray) -> np.ndarray:
+        """
+        Compute the binned spectrum for an activity vector, or the
+        spectra for an activity matrix.
+
+        :param activities: either a 1-D array of activities (Bq) of length
+        equal to the number of rows, or a 2-D (N x rows) array of N
+        activity vectors
+        :returns: a 1-D array of bin values, or a 2-D (N x bins) array
+        """
+        activities = np.asarray(activities, dtype=float)
+        if activities.ndim == 1:
+            weights = self.data * np.repeat(activities, np.diff(self.indptr))
+            return np.bincount(self.indices, weights=weights, minlength=self.nrofbins)
+
+        # matrix case - gather the activity of each entry for every
+        # vector, then sum entries sharing the same bin. The gathered
+        # values are (vectors x entries), so vectors are done in blocks
+        # to bound the memory
+        hists = np.zeros((activities.shape[0], self.nrofbins))
+        if self.nnz > 0:
+            rows = np.repeat(np.arange(len(self.nuclides)), np.diff(self.indptr))
+            order = np.argsort(self.indices, kind="stable")
+            rows, data, cols = rows[order], self.data[order], self.indices[order]
+            starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+            block = max(1, DOT_BLOCK_ENTRIES // self.nnz)
+            for start in range(0, activities.shape[0], block):
+                stop = start + block
+                contributions = activities[start:stop, rows] * data
+                hists[start:stop, cols[starts]] = np.add.reduceat(contributions, starts, axis=1)
+        return hists
+
+    def tocsr(self):
+        """
+        Convert to a scipy.sparse.csr_matrix.
+        Requires scipy, which is an optional dependency.
+
+        :returns: the equivalent scipy CSR matrix
+        """
+        from scipy.sparse import csr_matrix
+
+        return csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+
+def fromcsr(
+    nuclides: List[str],
+    zais,
+    nrofbins: int,
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    data: np.ndarray,
+) -> ResponseMatrix:
+    """
+    Create a response matrix directly from its CSR arrays, as previously
+    taken from another matrix. No checking or reordering is done.
+
+    :param nuclides: the nuclide names, one per row
+    :param zais: the nuclide ZAIs, one per row
+    :param nrofbins: the number of bins (columns)
+    :param indptr: the CSR row pointers
+    :param indices: the CSR column (bin) indices
+    :param data: the CSR values
+    :returns: the response matrix
+    """
+    matrix = ResponseMatrix.__new__(ResponseMatrix)
+    matrix.nuclides = list(nuclides)
+    matrix.zais = np.asarray(zais, dtype=np.int64)
+    matrix.nrofbins = int(nrofbins)
+    matrix._rows = {int(zai): i for i, zai in enumerate(matrix.zais)}
+    matrix.indptr = np.asarray(indptr, dtype=np.int64)
+    matrix.indices = np.asarray(indices, dtype=np.int64)
+    matrix.data = np.asarray(data, dtype=float)
+    return matrix
@@ -0,0 +1,211 @@
+"""
+    Sharing a loaded database between processes
+
+    The columnar tables of a database are copied once into a single
+    block of shared memory by the parent process. Workers attach to
+    it by name and get a read only database whose arrays point straight
+    into the shared block - no parsing and no per worker copy.
+
+    ```
+    db = ag.Decay2012Database()
+    with ag.publishdatabase(db) as shared:
+        with multiprocessing.Pool(initializer=init, initargs=(shared.handle,)) as pool:
+            ...
+
+    # in the worker
+    def init(handle):
+        global db
+        db = ag.attachdatabase(handle)
+    ```
+
+    For the same effect through a memory mapped file instead, write the
+    tables with savetables and open them with DatabaseBinaryLoader.
+
+    Requires python 3.8 or later (multiprocessing.shared_memory), which
+    is only imported when a database is published or attached.
+"""
+import os
+import numpy as np
+from typing import List, Tuple
+
+from .database import DefaultDatabase, ReadOnlyDatabase
+from .tables import DecayTables
+
+# arrays start on a cache line boundary in the shared block
+SHARED_ALIGNMENT = 64
+
+# shared memory blocks attached to by this process, kept open for as
+# long as the process lives as the database arrays point into them
+__ATTACHED_BLOCKS__ = {}
+
+
+class SharedDatabaseHandle:
+    """
+    A small, picklable description of a database in shared memory,
+    to send to worker processes.
+
+    Attributes:
+        name    - the name of the shared memory block
+        layout  - a list of (key, dtype, shape, offset) for each array
+        metadata - the metadata of the tables
+        tracker - identifies the resource tracker of the publisher
+    """
+
+    __slots__ = ["name", "layout", "metadata", "tracker"]
+
+    def __init__(
+        self,
+        name: str,
+        layout: List[Tuple[str, str, tuple, int]],
+        metadata: dict = None,
+        tracker: tuple = None,
+    ):
+        self.name = name
+        self.layout = layout
+        self.metadata = metadata or {}
+        self.tracker = tracker
+
+    def __getstate__(self):
+        return self.name, self.layout, self.metadata, self.tracker
+
+    def __setstate__(self, state):
+        self.name, self.layout, self.metadata, self.tracker = state
+
+
+class SharedDatabase:
+    """
+    Owns the shared memory block holding a published database.
+
+    Only the publishing process should close it, which also removes the
+    block once all workers are done. Use as a context manager to do
+    this automatically.
+    """
+
+    __slots__ = ["handle", "_block"]
+
+    def __init__(self, handle: SharedDatabaseHandle, block):
+        self.handle = handle
+        self._block = block
+
+    def close(self):
+        """
+        Release and remove the shared memory block
+        """
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def publishdatabase(db: ReadOnlyDatabase) -> SharedDatabase:
+    """
+    Copy the tables of a database into a new shared memory block
+
+    :param db: the database to publish, must have columnar tables
+    (i.e. a DefaultDatabase)
+    :returns: the SharedDatabase owning the block, its handle is
+    sent to the workers
+    """
+    arrays = db.tables.arrays()
+
+    layout = []
+    size = 0
+    for key, array in arrays.items():
+        size = -(-size // SHARED_ALIGNMENT) * SHARED_ALIGNMENT
+        layout.append((key, array.dtype.str, array.shape, size))
+        size += array.nbytes
+
+    from multiprocessing import shared_memory
+
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for key, dtype, shape, offset in layout:
+        target = np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset)
+        target[...] = arrays[key]
+        del target
+
+    return SharedDatabase(
+        SharedDatabaseHandle(block.name, layout, db.tables.metadata, _trackerid()), block
+    )
+
+
+def _trackerid() -> tuple:
+    # the resource tracker of this process, identified by its pipe which
+    # child processes inherit - None where there is no tracker (windows)
+    if os.name != "posix":
+        return None
+    from multiprocessing import resource_tracker
+
+    stat = os.fstat(resource_tracker.getfd())
+    return stat.st_dev, stat.st_ino
+
+
+def _attachblock(handle: SharedDatabaseHandle):
+    name = handle.name
+    if name in __ATTACHED_BLOCKS__:
+        return __ATTACHED_BLOCKS__[name]
+
+    from multiprocessing import shared_memory
+
+    try:
+        block = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before python 3.13 attaching registers the block with the
+        # resource tracker, which removes it when the tracker exits -
+        # only the publisher should do that. A tracker shared with the
+        # publisher (i.e. in its pool workers) already has it registered,
+        # any other tracker must forget it again
+        block = shared_memory.SharedMemory(name=name)
+        if _trackerid() != handle.tracker:
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(block._name, "shared_memory")
+
+    __ATTACHED_BLOCKS__[name] = block
+    return block
+
+
+class SharedMemoryLoader:
+    """
+    Context manager to load a database from shared memory.
+    Returns DecayTables whose arrays are views of the shared block.
+    """
+
+    __slots__ = ["handle"]
+
+    def __init__(self, handle: SharedDatabaseHandle):
+        """
+        :param handle: the handle of the published database
+        """
+        self.handle = handle
+
+    def __enter__(self):
+        """
+        Attaches to the shared block and returns the data as DecayTables
+        """
+        block = _attachblock(self.handle)
+        arrays = {
+            key: np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset)
+            for key, dtype, shape, offset in self.handle.layout
+        }
+        return DecayTables(arrays, metadata=self.handle.metadata)
+
+    def __exit__(self, *args):
+        """
+        Does nothing
+        """
+
+
+def attachdatabase(handle: SharedDatabaseHandle) -> DefaultDatabase:
+    """
+    Get a read only database from one published in shared memory
+
+    :param handle: the handle of the published database
+    :returns: the database, backed by the shared memory block
+    """
+    return DefaultDatabase(datasource=SharedMemoryLoader(handle))
@@ -0,0 +1,602 @@
+"""
+    An SQLite backed database, using the standard library sqlite3
+
+    The decay data is kept in a single SQLite file, indexed on nuclide
+    name, ZAI, spectral type and line energy. Only the nuclide names,
+    ZAIs and halflives are held in memory, line data is read on demand,
+    so many processes can open the same library cheaply.
+
+    ```
+    # once, see scripts/makesqlite.py
+    ag.savesqlite(ag.Decay2012Database().tables, "lines_decay_2012.sqlite")
+
+    db = ag.SQLiteDatabase("lines_decay_2012.sqlite")
+    lines = db.linesinrange(1.0e6, 1.1e6, spectype="gamma")
+    ```
+"""
+import json
+import os
+import pathlib
+import sqlite3
+import tempfile
+import threading
+import numpy as np
+from typing import List
+
+from .database import ReadOnlyDatabase
+from .exceptions import DatabaseFormatException
+from .tables import (
+    LINE_COLUMNS,
+    LINE_TABLE_DTYPE,
+    SPECTRUM_COLUMNS,
+    DecayTables,
+    _readonly,
+    makelinetable,
+)
+from .util import umasked
+
+# bump if the schema changes
+SQLITE_FORMAT_VERSION = 1
+
+SQLITE_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE nuclides (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    zai INTEGER NOT NULL,
+    halflife REAL NOT NULL
+);
+CREATE INDEX nuclides_zai ON nuclides (zai);
+CREATE TABLE spectra (
+    nuclide INTEGER NOT NULL,
+    spectype TEXT NOT NULL,
+    haslines INTEGER NOT NULL,
+    number INTEGER NOT NULL,
+    {spectrumcolumns},
+    PRIMARY KEY (nuclide, spectype)
+) WITHOUT ROWID;
+CREATE INDEX spectra_spectype ON spectra (spectype, nuclide);
+CREATE TABLE lines (
+    nuclide INTEGER NOT NULL,
+    spectype TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    {linecolumns},
+    normintensities REAL NOT NULL,
+    PRIMARY KEY (nuclide, spectype, position)
+) WITHOUT ROWID;
+CREATE INDEX lines_energy ON lines (spectype, energies);
+""".format(
+    spectrumcolumns=",\n    ".join("{} REAL".format(c) for c in SPECTRUM_COLUMNS),
+    linecolumns=",\n    ".join("{} REAL NOT NULL".format(c) for c in LINE_COLUMNS),
+)
+
+# the columns of the line table, in the order of LINE_TABLE_DTYPE
+_LINE_TABLE_SELECT = (
+    "SELECT energies, normintensities, energies_unc, intensities_unc * norms, nuclide "
+    "FROM lines WHERE spectype = ?"
+)
+
+
+def savesqlite(tables: DecayTables, filename: str):
+    """
+    Write the tables to an SQLite file. The file is written to a
+    temporary file first, then moved into place, replacing any
+    existing file, with the permissions open would have given it.
+
+    :param tables: the tables to write, i.e. DefaultDatabase.tables
+    :param filename: the path of the SQLite file
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmpfilename = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        connection = sqlite3.connect(tmpfilename)
+        try:
+            with connection:
+                connection.executescript(SQLITE_SCHEMA)
+                connection.executemany(
+                    "INSERT INTO meta VALUES (?, ?)",
+                    [
+                        ("version", str(SQLITE_FORMAT_VERSION)),
+                        ("metadata", json.dumps(tables.metadata)),
+                    ],
+                )
+                connection.executemany(
+                    "INSERT INTO nuclides VALUES (?, ?, ?, ?)",
+                    zip(
+                        range(len(tables)),
+                        tables.names,
+                        tables.zais.tolist(),
+                        tables.halflives.tolist(),
+                    ),
+                )
+                for spectype, table in tables.spectra.items():
+                    indices = np.flatnonzero(table.present)
+                    columns = [getattr(table, c)[indices] for c in SPECTRUM_COLUMNS]
+                    connection.executemany(
+                        "INSERT INTO spectra VALUES ({})".format(
+                            ", ".join(["?"] * (4 + len(SPECTRUM_COLUMNS)))
+                        ),
+                        zip(
+                            indices.tolist(),
+                            [spectype] * len(indices),
+                            table.haslines[indices].astype(int).tolist(),
+                            table.number[indices].tolist(),
+                            # NaN is stored as NULL
+                            *[[None if np.isnan(v) else v for v in c.tolist()] for c in columns]
+                        ),
+                    )
+
+                    counts = np.diff(table.offsets)
+                    nuclides = np.repeat(np.arange(len(counts)), counts)
+                    positions = np.arange(len(nuclides)) - np.repeat(table.offsets[:-1], counts)
+                    connection.executemany(
+                        "INSERT INTO lines VALUES ({})".format(
+                            ", ".join(["?"] * (4 + len(LINE_COLUMNS)))
+                        ),
+                        zip(
+                            nuclides.tolist(),
+                            [spectype] * len(nuclides),
+                            positions.tolist(),
+                            *[
+                                getattr(table, c).tolist()
+                                for c in LINE_COLUMNS + ["normintensities"]
+                            ]
+                        ),
+                    )
+        finally:
+            # closed before the file is moved or removed
+            connection.close()
+        # mkstemp creates it private to the user
+        os.chmod(tmpfilename, umasked(0o644))
+        os.replace(tmpfilename, filename)
+    except BaseException:
+        os.remove(tmpfilename)
+        raise
+
+
+def _connect(filename: str) -> sqlite3.Connection:
+    # read only, and never create the file if it does not exist
+    if not os.path.isfile(filename):
+        raise DatabaseFormatException("No SQLite database at {}".format(filename))
+    uri = pathlib.Path(filename).absolute().as_uri() + "?mode=ro"
+    connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    try:
+        version = connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    except sqlite3.DatabaseError as e:
+        connection.close()
+        raise DatabaseFormatException("Cannot read {}: {}".format(filename, e))
+    if version is None or int(version[0]) != SQLITE_FORMAT_VERSION:
+        connection.close()
+        raise DatabaseFormatException(
+            "Unsupported SQLite format version {} in {}".format(version, filename)
+        )
+    return connection
+
+
+def loadsqlite(filename: str) -> DecayTables:
+    """
+    Read the whole of an SQLite file written by savesqlite into tables
+
+    :param filename: the path of the SQLite file
+    :returns: the tables
+    :raises DatabaseFormatException: if the file is not a database of
+    the supported version
+    """
+    connection = _connect(filename)
+    try:
+        rows = connection.execute("SELECT name, zai, halflife FROM nuclides ORDER BY id").fetchall()
+        nrofnuclides = len(rows)
+        arrays = {
+            "names": np.array([r[0] for r in rows], dtype=str),
+            "zais": np.array([r[1] for r in rows], dtype=np.int64),
+            "halflives": np.array([r[2] for r in rows], dtype=np.float64),
+        }
+
+        spectypes = [
+            r[0] for r in connection.execute("SELECT DISTINCT spectype FROM spectra ORDER BY spectype")
+        ]
+        for spectype in spectypes:
+            prefix = "{}/".format(spectype)
+            present = np.zeros(nrofnuclides, dtype=bool)
+            haslines = np.zeros(nrofnuclides, dtype=bool)
+            number = np.full(nrofnuclides, -1, dtype=np.int64)
+            spectrum = {c: np.full(nrofnuclides, np.nan) for c in SPECTRUM_COLUMNS}
+            for row in connection.execute(
+                "SELECT nuclide, haslines, number, {} FROM spectra WHERE spectype = ?".format(
+                    ", ".join(SPECTRUM_COLUMNS)
+                ),
+                (spectype,),
+            ):
+                i = row[0]
+                present[i] = True
+                haslines[i] = bool(row[1])
+                number[i] = row[2]
+                for column, value in zip(SPECTRUM_COLUMNS, row[3:]):
+                    if value is not None:
+                        spectrum[column][i] = value
+
+            lines = np.array(
+                connection.execute(
+                    "SELECT nuclide, {} FROM lines WHERE spectype = ? "
+                    "ORDER BY nuclide, position".format(", ".join(LINE_COLUMNS)),
+                    (spectype,),
+                ).fetchall(),
+                dtype=np.float64,
+            ).reshape(-1, 1 + len(LINE_COLUMNS))
+            counts = np.bincount(lines[:, 0].astype(np.int64), minlength=nrofnuclides)
+
+            arrays[prefix + "present"] = present
+            arrays[prefix + "haslines"] = haslines
+            arrays[prefix + "number"] = number
+            arrays[prefix + "offsets"] = np.concatenate([[0], np.cumsum(counts)])
+            for column in SPECTRUM_COLUMNS:
+                arrays[prefix + column] = spectrum[column]
+            for j, column in enumerate(LINE_COLUMNS):
+                arrays[prefix + column] = np.ascontiguousarray(lines[:, j + 1])
+        metadata = connection.execute("SELECT value FROM meta WHERE key = 'metadata'").fetchone()
+    finally:
+        connection.close()
+    return DecayTables(arrays, metadata=json.loads(metadata[0]) if metadata else None)
+
+
+class DatabaseSQLiteLoader:
+    """
+    Context manager to load a whole SQLite file, written by savesqlite,
+    into a DefaultDatabase. Returns DecayTables.
+
+    To read the file on demand instead, use SQLiteDatabase.
+    """
+
+    __slots__ = ["filename"]
+
+    def __init__(self, filename: str):
+        """
+        :param filename: the path of the SQLite file
+        """
+        self.filename = filename
+
+    def __enter__(self):
+        """
+        Reads the file and returns the data as DecayTables
+        """
+        return loadsqlite(self.filename)
+
+    def __exit__(self, *args):
+        """
+        Does nothing
+        """
+
+
+class SQLiteDatabase(ReadOnlyDatabase):
+    """
+    A read only database reading from an SQLite file on demand,
+    written by savesqlite (see scripts/makesqlite.py).
+
+    Nuclide names, ZAIs and halflives and which types each nuclide
+    has are read on construction. Line data is queried when asked for,
+    energy range queries use the index on line energy.
+
+    Each thread gets its own connection to the file.
+    """
+
+    def __init__(self, filename: str):
+        """
+        :param filename: the path of the SQLite file
+        :raises DatabaseFormatException: if the file is not a database of
+        the supported version
+        """
+        ReadOnlyDatabase.__init__(self, datasource=None)
+        self.filename = filename
+        self._local = threading.local()
+        self._linetables = {}
+
+        connection = self._connection()
+        rows = connection.execute("SELECT name, zai, halflife FROM nuclides ORDER BY id").fetchall()
+        self._nuclides = [r[0] for r in rows]
+        self._index = {name: i for i, name in enumerate(self._nuclides)}
+        self._zais = {r[0]: r[1] for r in rows}
+        self._halflives = [r[2] for r in rows]
+        self._names = {}
+        for name, zai, _ in rows:
+            self._names.setdefault(zai, name)
+
+        self._types = [
+            r[0] for r in connection.execute("SELECT DISTINCT spectype FROM spectra ORDER BY spectype")
+        ]
+        typeindex = {spectype: j for j, spectype in enumerate(self._types)}
+        self._membership = np.zeros((len(self._nuclides), len(self._types)), dtype=bool)
+        self._haslines = np.zeros((len(self._nuclides), len(self._types)), dtype=bool)
+        for nuclide, spectype, haslines in connection.execute(
+            "SELECT nuclide, spectype, haslines FROM spectra"
+        ):
+            self._membership[nuclide, typeindex[spectype]] = True
+            self._haslines[nuclide, typeindex[spectype]] = bool(haslines)
+        self._membership.flags.writeable = False
+        self._typeindex = typeindex
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = _connect(self.filename)
+            self._local.connection = connection
+        return connection
+
+    def __contains__(self, nuclide: str) -> bool:
+        """
+        Check if nuclide exists in database
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :returns: boolean - true if in database, false otherwise
+        """
+        return nuclide in self._index
+
+    @property
+    def raw(self):
+        """
+        Get the underlying datastructure, reading the whole file.
+        Not cached.
+
+        :returns: a dictionary object representing the underlying data
+        """
+        return self.tables.todict()
+
+    @property
+    def tables(self) -> DecayTables:
+        """
+        Read the whole file into columnar tables. Not cached.
+
+        :returns: the DecayTables object
+        """
+        return loadsqlite(self.filename)
+
+    @property
+    def membership(self) -> np.ndarray:
+        """
+        Which nuclides have which decay types - read only.
+        Rows are indexed as allnuclides and columns as alltypes.
+
+        :returns: a boolean (nuclides x types) numpy array
+        """
+        return self._membership
+
+    @property
+    def alltypes(self) -> List[str]:
+        """
+        Return all possible unique decay mode types for the whole database
+
+        :returns: a list of strings representing the list of decay types
+        in the database
+        """
+        return list(self._types)
+
+    def haslines(self, nuclide: str, spectype: str = "gamma") -> bool:
+        """
+        Return true if nuclide has spectral information, false otherwise
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: boolean based on if spectral data for type exists and
+        has data in database
+        :raises KeyError: raises an exception if nuclide and spectype not in database
+        """
+        index, column = self._spectrum(nuclide, spectype)
+        return bool(self._haslines[index, column])
+
+    @property
+    def allnuclides(self) -> List[str]:
+        """
+        Return all unique nuclides for the whole database.
+
+        :returns: a list of strings representing the list of unique nuclides
+        in the database
+        """
+        return list(self._nuclides)
+
+    def allnuclidesoftype(self, spectype: str = "gamma") -> List[str]:
+        """
+        Return all unique nuclides for the whole database matching a specific
+        decay type, default is "gamma".
+
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a list of strings representing the list of unique nuclides
+        in the database
+        """
+        column = self._typeindex.get(spectype)
+        if column is None:
+            return []
+        return [self._nuclides[i] for i in np.flatnonzero(self._membership[:, column])]
+
+    def gettypes(self, nuclide: str) -> List[str]:
+        """
+        Return all unique spectral types for a given radionuclide in the database.
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :returns: a list of strings representing the list of unique spcetral
+        types for that nuclide
+        :raises KeyError: raises an exception if nuclide not in database
+        """
+        row = self._membership[self._index[nuclide]]
+        return [self._types[j] for j in np.flatnonzero(row)]
+
+    def hastype(self, nuclide: str, spectype: str = "gamma") -> bool:
+        """
+        Check if it has that particular decay type
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: boolean - true if in database, false otherwise
+        :raises KeyError: raises an exception if nuclide not in database
+        """
+        index = self._index[nuclide]
+        column = self._typeindex.get(spectype)
+        return column is not None and bool(self._membership[index, column])
+
+    def getname(self, zai: int) -> str:
+        """
+        Get the name of a nuclide, given a ZAI.
+        ZAI = Z (charge), A (mass number), I (isomeric state)
+
+        :param zai: the ZAI number (integer) for the nuclide
+        :returns: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        """
+        return self._names.get(zai)
+
+    def getzai(self, nuclide: str) -> int:
+        """
+        Get the ZAI of a nuclide, given a nuclide name.
+        ZAI = Z (charge), A (mass number), I (isomeric state)
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :returns: the ZAI number (integer) for the nuclide
+        :raises KeyError: raises an exception if nuclide key not in database
+        """
+        return self._zais[nuclide]
+
+    def gethalflife(self, nuclide: str) -> float:
+        """
+        Get the halflife of a given nuclide in seconds
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :returns: the half life in seconds
+        :raises KeyError: raises an exception if nuclide key not in database
+        """
+        return self._halflives[self._index[nuclide]]
+
+    def getenergies(self, nuclide: str, spectype: str = "gamma") -> np.ndarray:
+        """
+        Get the line energies of a given nuclide in eV.
+        Default spectral type is "gamma"
+        Only provides discrete lines.
+        If nuclide has no spectral data then returns an empty array.
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a read only numpy array of energies (eV) for the given
+        nuclide and decay type.
+        :raises KeyError: raises an exception if nuclide and spectype not
+        in database
+        """
+        return self._lines(nuclide, spectype, "energies")
+
+    def getenergiesunc(self, nuclide: str, spectype: str = "gamma") -> np.ndarray:
+        """
+        Get the line energy uncertainties of a given nuclide in eV.
+        Default spectral type is "gamma"
+        If nuclide has no spectral data then returns an empty array.
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a read only numpy array of energy uncertainties (eV)
+        for the given nuclide and decay type.
+        :raises KeyError: raises an exception if nuclide and spectype not
+        in database
+        """
+        return self._lines(nuclide, spectype, "energies_unc")
+
+    def getintensities(self, nuclide: str, spectype: str = "gamma") -> np.ndarray:
+        """
+        Get the corresponding intensity values for each line energy of a
+        given nuclide.
+        Default spectral type is "gamma".
+        Intensity values will be between 0 and 1.
+        Also multiplies by normalisation constant.
+        If nuclide has no spectral data then returns an empty array.
+
+        :param nuclide: the radionuclide as a string i.e 'H3' or 'U235m'.
+        No spaces and case sensitive!
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a read only numpy array of normalised intensities for
+        the given nuclide and decay type.
+        :raises KeyError: raises an exception if nuclide and spectype
+        not in database
+        """
+        return self._lines(nuclide, spectype, "normintensities")
+
+    def linetable(self, spectype: str = "gamma") -> np.ndarray:
+        """
+        The lines of all nuclides for a spectral type as one flat table,
+        sorted by ascending energy, with fields:
+            energy, intensity, energy_unc, intensity_unc, nuclide
+
+        where nuclide is the index of the nuclide in allnuclides.
+        Intensities and their uncertainties are normalised.
+
+        Read with a single query and kept, use linesinrange to
+        read only a part of the table.
+
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a read only structured numpy array
+        """
+        if spectype not in self._linetables:
+            rows = self._linerows(_LINE_TABLE_SELECT + " ORDER BY nuclide, position", (spectype,))
+            self._linetables[spectype] = makelinetable(
+                rows["energy"], rows["intensity"], rows["energy_unc"],
+                rows["intensity_unc"], rows["nuclide"],
+            )
+        return self._linetables[spectype]
+
+    def linesinrange(
+        self,
+        emin: float,
+        emax: float,
+        spectype: str = "gamma",
+        min_intensity: float = 0.0,
+    ) -> np.ndarray:
+        """
+        Find all lines of a spectral type with energies in [emin, emax),
+        using the index on line energy.
+
+        :param emin: the lower energy bound (eV), inclusive
+        :param emax: the upper energy bound (eV), exclusive
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :param min_intensity: only include lines with (normalised)
+        intensity at least this
+        :returns: rows of the line table (see linetable), in ascending energy
+        """
+        return self._linerows(
+            _LINE_TABLE_SELECT
+            + " AND energies >= ? AND energies < ? AND normintensities >= ?"
+            + " ORDER BY energies, nuclide, position",
+            (spectype, float(emin), float(emax), float(min_intensity)),
+        )
+
+    def _linerows(self, sql: str, parameters: tuple) -> np.ndarray:
+        rows = self._connection().execute(sql, parameters).fetchall()
+        return _readonly(np.array(rows, dtype=LINE_TABLE_DTYPE))
+
+    def _spectrum(self, nuclide: str, spectype: str):
+        # the index of the nuclide and the column of the type,
+        # raising KeyError if the nuclide does not have that type
+        index = self._index[nuclide]
+        column = self._typeindex.get(spectype)
+        if column is None or not self._membership[index, column]:
+            raise KeyError(spectype)
+        return index, column
+
+    def _lines(self, nuclide: str, spectype: str, column: str) -> np.ndarray:
+        index, _ = self._spectrum(nuclide, spectype)
+        rows = self._connection().execute(
+            "SELECT {} FROM lines WHERE nuclide = ? AND spectype = ? ORDER BY position".format(
+                column
+            ),
+            (index, spectype),
+        ).fetchall()
+        return _readonly(np.array([r[0] for r in rows], dtype=np.float64))
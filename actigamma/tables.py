@@ -0,0 +1,595 @@
+"""
+    Compact columnar storage of the decay data
+
+    Rather than nested dictionaries of Python floats, the data is kept
+    as a small number of contiguous typed numpy arrays. Nuclide level
+    data (names, ZAIs, halflives) is one array per quantity, and line
+    data is concatenated for all nuclides per spectral type, with an
+    offsets array giving the slice of lines for each nuclide.
+
+    All arrays are read only, so accessors can safely return views.
+"""
+import array
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from typing import Dict, List
+
+from .exceptions import DatabaseFormatException
+from .util import filestamp, stampmatches, umasked
+
+# bump if the layout of the binary format changes
+TABLES_FORMAT_VERSION = 1
+
+TABLES_MANIFEST = "manifest.json"
+
+
+# per line quantities, as in the raw JSON schema
+LINE_COLUMNS = [
+    "energies",
+    "energies_unc",
+    "intensities",
+    "intensities_unc",
+    "norms",
+    "norms_unc",
+]
+
+# per spectrum (nuclide and type) floating point quantities
+SPECTRUM_COLUMNS = [
+    "mean_energy",
+    "mean_energy_unc",
+    "mean_normalisation",
+    "mean_normalisation_unc",
+]
+
+# a row of the flat, energy sorted, line table of a spectral type,
+# nuclide is the index of the nuclide in the database
+LINE_TABLE_DTYPE = np.dtype(
+    [
+        ("energy", np.float64),
+        ("intensity", np.float64),
+        ("energy_unc", np.float64),
+        ("intensity_unc", np.float64),
+        ("nuclide", np.int64),
+    ]
+)
+
+# a row of the nuclide table, indexed as the nuclides in the database
+NUCLIDE_TABLE_DTYPE = np.dtype(
+    [
+        ("zai", np.int64),
+        ("z", np.int64),
+        ("a", np.int64),
+        ("i", np.int64),
+        ("halflife", np.float64),
+    ]
+)
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class SpectrumTable:
+    """
+    The columnar data for a single spectral type, i.e. "gamma"
+
+    Nuclide level arrays (one entry per nuclide in the database):
+        present         - True if the nuclide has this spectral type
+        haslines        - True if the nuclide has line data for this type
+        offsets         - (nuclides + 1) offsets into the line arrays
+        number          - the number of lines, -1 if not given
+        mean_energy, ... - spectrum quantities, NaN if not given
+
+    Line level arrays (all lines of all nuclides concatenated):
+        energies, energies_unc, intensities, intensities_unc,
+        norms, norms_unc and normintensities (intensities * norms)
+    """
+
+    __slots__ = (
+        ["present", "haslines", "offsets", "number", "normintensities"]
+        + LINE_COLUMNS
+        + SPECTRUM_COLUMNS
+    )
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """
+        :param arrays: a dictionary of all arrays named as the attributes,
+        normintensities is derived if not given
+        """
+        self.present = _readonly(np.asanyarray(arrays["present"], dtype=bool))
+        self.haslines = _readonly(np.asanyarray(arrays["haslines"], dtype=bool))
+        self.offsets = _readonly(np.asanyarray(arrays["offsets"], dtype=np.int64))
+        self.number = _readonly(np.asanyarray(arrays["number"], dtype=np.int64))
+        for column in LINE_COLUMNS + SPECTRUM_COLUMNS:
+            setattr(self, column, _readonly(np.asanyarray(arrays[column], dtype=np.float64)))
+        if "normintensities" in arrays:
+            self.normintensities = _readonly(
+                np.asanyarray(arrays["normintensities"], dtype=np.float64)
+            )
+        else:
+            self.normintensities = _readonly(self.intensities * self.norms)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """
+        All arrays of the table, by name
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def lines(self, index: int, column: str = "energies") -> np.ndarray:
+        """
+        Get a read only view of the line data for a nuclide
+
+        :param index: the index of the nuclide in the database
+        :param column: the line quantity, i.e. "energies"
+        :returns: a numpy array view
+        """
+        return getattr(self, column)[self.offsets[index]:self.offsets[index + 1]]
+
+
+class DecayTables:
+    """
+    All of the decay data in columnar form
+
+    Nuclides are indexed in the order they were given.
+
+    Attributes:
+        names       - a list of nuclide names
+        zais        - a numpy array of nuclide ZAIs
+        halflives   - a numpy array of halflives in seconds
+        spectra     - a dictionary of SpectrumTable, keyed by spectral type
+        metadata    - a dictionary of JSON serialisable information about
+                      the data, i.e. the provenance of a pruned library
+    """
+
+    __slots__ = [
+        "names",
+        "zais",
+        "halflives",
+        "spectra",
+        "metadata",
+        "_linetables",
+        "_nuclidetable",
+        "_fingerprint",
+    ]
+
+    def __init__(self, arrays: Dict[str, np.ndarray], metadata: dict = None):
+        """
+        Construct the tables from a flat dictionary of arrays, as given
+        by DecayTables.arrays().
+
+        :param arrays: the dictionary of named arrays
+        :param metadata: optional information about the data
+        """
+        self.metadata = dict(metadata) if metadata else {}
+        self.names = [str(name) for name in arrays["names"]]
+        self.zais = _readonly(np.asanyarray(arrays["zais"], dtype=np.int64))
+        self.halflives = _readonly(np.asanyarray(arrays["halflives"], dtype=np.float64))
+
+        spectypes = {}
+        for key, array in arrays.items():
+            if "/" in key:
+                spectype, column = key.split("/", 1)
+                spectypes.setdefault(spectype, {})[column] = array
+        self.spectra = {
+            spectype: SpectrumTable(columns) for spectype, columns in spectypes.items()
+        }
+        self._linetables = {}
+        self._nuclidetable = None
+        self._fingerprint = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def nuclidetable(self) -> np.ndarray:
+        """
+        The ZAI, Z, A, I and halflife of all nuclides as one table.
+        Built on first use only.
+
+        :returns: a read only structured numpy array of NUCLIDE_TABLE_DTYPE
+        """
+        if self._nuclidetable is None:
+            self._nuclidetable = makenuclidetable(self.zais, self.halflives)
+        return self._nuclidetable
+
+    def linetable(self, spectype: str = "gamma") -> np.ndarray:
+        """
+        The lines of all nuclides for a spectral type as one flat table,
+        sorted by ascending energy. Built on first use only.
+
+        Intensities are normalised (multiplied by the norms), as are
+        their uncertainties.
+
+        :param spectype: a string representing the type of decay mode.
+        Gamma is default.
+        :returns: a read only structured numpy array of LINE_TABLE_DTYPE,
+        empty if no nuclide has the spectral type
+        """
+        if spectype not in self._linetables:
+            table = self.spectra.get(spectype)
+            if table is None:
+                self._linetables[spectype] = makelinetable([], [], [], [], [])
+            else:
+                self._linetables[spectype] = makelinetable(
+                    table.energies,
+                    table.normintensities,
+                    table.energies_unc,
+                    table.intensities_unc * table.norms,
+                    np.repeat(np.arange(len(self.names)), np.diff(table.offsets)),
+                )
+        return self._linetables[spectype]
+
+    def fingerprint(self) -> str:
+        """
+        A content hash of the tables, see contenthash. The nuclides and
+        their lines are put in order of name with array operations only.
+        Computed on first use only.
+
+        :returns: a hex digest string
+        """
+        if self._fingerprint is None:
+            names = np.array(self.names, dtype=str)
+            order = np.argsort(names, kind="stable")
+            spectra = {}
+            for spectype, table in self.spectra.items():
+                present = table.present[order]
+                haslines = table.haslines[order] & present
+                counts = np.where(haslines, np.diff(table.offsets)[order], 0)
+                # the index of each line, nuclide by nuclide in name order
+                shifts = table.offsets[:-1][order] - (np.cumsum(counts) - counts)
+                starts = np.repeat(shifts, counts)
+                lines = starts + np.arange(len(starts), dtype=np.int64)
+                spectra[spectype] = (
+                    present,
+                    haslines,
+                    counts,
+                    table.energies[lines],
+                    table.normintensities[lines],
+                )
+            self._fingerprint = contenthash(
+                names[order].tolist(), self.zais[order], self.halflives[order], spectra
+            )
+        return self._fingerprint
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Flatten the tables to a dictionary of named arrays.
+        Spectral data is named by type and column, i.e. "gamma/energies".
+
+        :returns: the dictionary of named arrays
+        """
+        arrays = {
+            "names": np.array(self.names, dtype=str),
+            "zais": self.zais,
+            "halflives": self.halflives,
+        }
+        for spectype, table in self.spectra.items():
+            for column, array in table.arrays().items():
+                arrays["{}/{}".format(spectype, column)] = array
+        return arrays
+
+    def todict(self) -> dict:
+        """
+        Rebuild the raw (JSON schema) dictionary from the tables
+
+        :returns: the nested dictionary of data
+        """
+        raw = {}
+        for i, name in enumerate(self.names):
+            entry = {"halflife": float(self.halflives[i]), "zai": int(self.zais[i])}
+            for spectype, table in self.spectra.items():
+                if not table.present[i]:
+                    continue
+                spectrum = {}
+                if table.haslines[i]:
+                    spectrum["lines"] = {
+                        column: table.lines(i, column).tolist() for column in LINE_COLUMNS
+                    }
+                for column in SPECTRUM_COLUMNS:
+                    value = getattr(table, column)[i]
+                    if not np.isnan(value):
+                        spectrum[column] = float(value)
+                if table.number[i] >= 0:
+                    spectrum["number"] = int(table.number[i])
+                entry[spectype] = spectrum
+            raw[name] = entry
+        return raw
+
+
+def contenthash(names: List[str], zais, halflives, spectra: dict) -> str:
+    """
+    A content hash of decay data, given nuclide by nuclide in order
+    of name. Only the data used for aggregation is hashed.
+
+    :param names: the sorted nuclide names
+    :param zais: the ZAI of each nuclide
+    :param halflives: the halflife of each nuclide
+    :param spectra: per spectral type a tuple of the arrays present,
+    haslines and counts (the number of lines) of each nuclide, then the
+    energies and normalised intensities of all lines concatenated
+    :returns: a hex digest string
+    """
+    digest = hashlib.sha1()
+    digest.update("\0".join(names).encode())
+    digest.update(np.ascontiguousarray(zais, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(halflives, dtype=np.float64).tobytes())
+    for spectype in sorted(spectra):
+        present, haslines, counts, energies, intensities = spectra[spectype]
+        digest.update(spectype.encode())
+        digest.update(np.ascontiguousarray(present, dtype=np.uint8).tobytes())
+        digest.update(np.ascontiguousarray(haslines, dtype=np.uint8).tobytes())
+        digest.update(np.ascontiguousarray(counts, dtype=np.int64).tobytes())
+        digest.update(np.ascontiguousarray(energies, dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(intensities, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def makelinetable(energies, intensities, energies_unc, intensities_unc, nuclides) -> np.ndarray:
+    """
+    Make a read only line table, sorted by ascending energy, from
+    per line arrays. Lines of equal energy keep their given order.
+
+    :returns: a structured numpy array of LINE_TABLE_DTYPE
+    """
+    table = np.empty(len(energies), dtype=LINE_TABLE_DTYPE)
+    table["energy"] = energies
+    table["intensity"] = intensities
+    table["energy_unc"] = energies_unc
+    table["intensity_unc"] = intensities_unc
+    table["nuclide"] = nuclides
+    table = table[np.argsort(table["energy"], kind="stable")]
+    return _readonly(table)
+
+
+def makenuclidetable(zais, halflives) -> np.ndarray:
+    """
+    Make a read only nuclide table from ZAIs and halflives,
+    splitting the ZAI into Z, A and I.
+
+    :returns: a structured numpy array of NUCLIDE_TABLE_DTYPE
+    """
+    zais = np.asarray(zais, dtype=np.int64)
+    table = np.empty(len(zais), dtype=NUCLIDE_TABLE_DTYPE)
+    table["zai"] = zais
+    table["z"] = zais // 10000
+    table["a"] = (zais // 10) % 1000
+    table["i"] = zais % 10
+    table["halflife"] = halflives
+    return _readonly(table)
+
+
+class TablesBuilder:
+    """
+    Build columnar tables one nuclide at a time, i.e. while streaming
+    nuclides from a reader, without holding the raw dictionary.
+
+    Line data is accumulated in compact typed buffers (8 bytes per
+    value), not lists of Python floats.
+
+    ```
+    builder = TablesBuilder()
+    for name, entry in reader:
+        builder.add(name, entry)
+    tables = builder.build()
+    ```
+    """
+
+    __slots__ = ["ignorekeys", "names", "zais", "halflives", "_spectra"]
+
+    def __init__(self, ignorekeys: List[str] = ["zai", "halflife"]):
+        """
+        :param ignorekeys: the nuclide keys that are not spectral types
+        """
+        self.ignorekeys = ignorekeys
+        self.names = []
+        self.zais = array.array("q")
+        self.halflives = array.array("d")
+        # per spectral type, in order of first appearance
+        self._spectra = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _spectrum(self, spectype: str) -> dict:
+        if spectype not in self._spectra:
+            # nuclides added before the type first appeared do not have it
+            nrofnuclides = len(self.names)
+            spectrum = {
+                "present": array.array("b", [0] * nrofnuclides),
+                "haslines": array.array("b", [0] * nrofnuclides),
+                "number": array.array("q", [-1] * nrofnuclides),
+                "counts": array.array("q", [0] * nrofnuclides),
+            }
+            for column in SPECTRUM_COLUMNS:
+                spectrum[column] = array.array("d", [np.nan] * nrofnuclides)
+            for column in LINE_COLUMNS:
+                spectrum[column] = array.array("d")
+            self._spectra[spectype] = spectrum
+        return self._spectra[spectype]
+
+    def add(self, name: str, entry: dict):
+        """
+        Add a nuclide
+
+        :param name: the nuclide name, i.e. 'H3'
+        :param entry: the data of the nuclide in the raw (JSON) schema
+        """
+        for spectype in entry:
+            if spectype not in self.ignorekeys:
+                self._spectrum(spectype)
+
+        self.names.append(name)
+        self.zais.append(entry["zai"])
+        self.halflives.append(entry["halflife"])
+
+        for spectype, spectrum in self._spectra.items():
+            data = entry.get(spectype)
+            spectrum["present"].append(data is not None)
+            data = data if data is not None else {}
+            spectrum["haslines"].append("lines" in data)
+            spectrum["number"].append(data.get("number", -1))
+            for column in SPECTRUM_COLUMNS:
+                spectrum[column].append(data.get(column, np.nan))
+            if "lines" in data:
+                spectrum["counts"].append(len(data["lines"]["energies"]))
+                for column in LINE_COLUMNS:
+                    spectrum[column].extend(data["lines"][column])
+            else:
+                spectrum["counts"].append(0)
+
+    def build(self) -> DecayTables:
+        """
+        Make the tables of all nuclides added so far
+
+        :returns: the tables
+        """
+        arrays = {
+            "names": np.array(self.names, dtype=str),
+            "zais": np.array(self.zais, dtype=np.int64),
+            "halflives": np.array(self.halflives, dtype=np.float64),
+        }
+        for spectype, spectrum in self._spectra.items():
+            prefix = "{}/".format(spectype)
+            arrays[prefix + "present"] = np.array(spectrum["present"], dtype=bool)
+            arrays[prefix + "haslines"] = np.array(spectrum["haslines"], dtype=bool)
+            arrays[prefix + "number"] = np.array(spectrum["number"], dtype=np.int64)
+            arrays[prefix + "offsets"] = np.concatenate(
+                [[0], np.cumsum(np.array(spectrum["counts"], dtype=np.int64))]
+            ).astype(np.int64)
+            for column in SPECTRUM_COLUMNS + LINE_COLUMNS:
+                arrays[prefix + column] = np.array(spectrum[column], dtype=np.float64)
+        return DecayTables(arrays)
+
+
+def tablesfromdict(raw: dict, ignorekeys: List[str] = ["zai", "halflife"]) -> DecayTables:
+    """
+    Pack the raw (JSON schema) dictionary into columnar tables
+
+    :param raw: the nested dictionary of data
+    :param ignorekeys: the nuclide keys that are not spectral types
+    :returns: the tables
+    """
+    builder = TablesBuilder(ignorekeys=ignorekeys)
+    for name, entry in raw.items():
+        builder.add(name, entry)
+    return builder.build()
+
+
+def savetables(tables: DecayTables, directory: str, source: str = None):
+    """
+    Write the tables in the binary format: a directory with one .npy
+    file per array and a manifest. Line data of each spectral type is
+    in a subdirectory named by type, i.e. "gamma/energies.npy".
+    The metadata of the tables is kept in the manifest, as is the stamp
+    of the source file, if given, see tablesmatch.
+
+    The directory is written next to the target and moved into place.
+    An existing one is first renamed aside, and only removed once the
+    new one is in place (it is restored if that fails), so processes
+    with its arrays memory mapped keep reading valid data.
+
+    :param tables: the tables to write
+    :param directory: the path of the directory to create
+    :param source: the file the tables were made from, i.e. the JSON
+    datafile, or None
+    """
+    directory = os.path.abspath(directory)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    tmpdir = tempfile.mkdtemp(dir=parent)
+    try:
+        arrays = tables.arrays()
+        for key, array in arrays.items():
+            path = os.path.join(tmpdir, *"{}.npy".format(key).split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            np.save(path, np.ascontiguousarray(array), allow_pickle=False)
+        with open(os.path.join(tmpdir, TABLES_MANIFEST), "wt") as fmanifest:
+            fmanifest.write(
+                json.dumps(
+                    {
+                        "version": TABLES_FORMAT_VERSION,
+                        "nuclides": len(tables),
+                        "arrays": list(arrays.keys()),
+                        "metadata": tables.metadata,
+                        "source": filestamp(source) if source is not None else None,
+                    },
+                    indent=4,
+                )
+            )
+        # mkdtemp creates it private to the user
+        os.chmod(tmpdir, umasked(0o755))
+
+        aside = None
+        if os.path.isdir(directory):
+            aside = tmpdir + ".old"
+            os.replace(directory, aside)
+        try:
+            os.replace(tmpdir, directory)
+        except BaseException:
+            if aside is not None:
+                os.replace(aside, directory)
+            raise
+    except BaseException:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        raise
+    if aside is not None:
+        shutil.rmtree(aside, ignore_errors=True)
+
+
+def tablesmatch(directory: str, source: str) -> bool:
+    """
+    Check if the tables in a directory were saved from a source file
+    as it is now, see savetables.
+
+    :param directory: the path of the directory
+    :param source: the file the tables should have been made from
+    :returns: False if the source has changed since, or was not
+    recorded, or if the directory is not in the binary format
+    """
+    try:
+        with open(os.path.join(directory, TABLES_MANIFEST), "rt") as fmanifest:
+            stamp = json.loads(fmanifest.read()).get("source")
+        return stamp is not None and stampmatches(stamp, source)
+    except (OSError, ValueError, AttributeError, KeyError):
+        return False
+
+
+def loadtables(directory: str, mmap: bool = True) -> DecayTables:
+    """
+    Read tables written by savetables.
+
+    By default the arrays are memory mapped read only, so loading is
+    almost instant and the data is shared between processes through
+    the page cache.
+
+    :param directory: the path of the directory
+    :param mmap: memory map the arrays (True) or read them into memory
+    :returns: the tables
+    :raises DatabaseFormatException: if the directory is not in the
+    expected format or version
+    """
+    try:
+        with open(os.path.join(directory, TABLES_MANIFEST), "rt") as fmanifest:
+            manifest = json.loads(fmanifest.read())
+    except (OSError, ValueError) as err:
+        raise DatabaseFormatException(
+            "{} is not a binary database: {}".format(directory, err)
+        )
+
+    if manifest.get("version") != TABLES_FORMAT_VERSION:
+        raise DatabaseFormatException(
+            "{} has binary format version {}, expected {}".format(
+                directory, manifest.get("version"), TABLES_FORMAT_VERSION
+            )
+        )
+
+    mode = "r" if mmap else None
+    arrays = {}
+    for key in manifest["arrays"]:
+        path = os.path.join(directory, *"{}.npy".format(key).split("/"))
+        arrays[key] = np.load(path, mmap_mode=mode, allow_pickle=False)
+    return DecayTables(arrays, metadata=manifest.get("metadata"))
@@ -1,6 +1,12 @@
 """
     A set of utility functions for ActiGamma
 """
+import hashlib
+import itertools
+import os
+import queue
+import threading
+import numpy as np
 from pprint import pprint
 
 
@@ -27,3 +33,143 @@ def getplotvalues(bounds, binvalues):
         plotvalues.extend([value, value])
 
     return plotbounds, plotvalues
+
+
+def filestamp(filename: str, sha1: str = None) -> dict:
+    """
+        The size, modification time and content hash of a file, to tell
+        later if it has changed, see stampmatches.
+
+        :param filename: the file to stamp
+        :param sha1: the sha1 hex digest of the content if already
+        known, otherwise the file is read to compute it
+        :return: a dictionary with size, mtime_ns and sha1
+    """
+    stat = os.stat(filename)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": sha1 if sha1 is not None else filesha1(filename),
+    }
+
+
+def stampmatches(stamp: dict, filename: str) -> bool:
+    """
+        Check a file against a stamp made by filestamp. A different size
+        never matches, the same modification time is trusted, otherwise
+        (i.e. a copied file) the content hash is compared.
+
+        :param stamp: the stamp of the file
+        :param filename: the file to check
+        :return: True if the file is unchanged
+    """
+    stat = os.stat(filename)
+    if stamp["size"] != stat.st_size:
+        return False
+    if stamp["mtime_ns"] == stat.st_mtime_ns:
+        return True
+    return stamp["sha1"] == filesha1(filename)
+
+
+def filesha1(filename: str) -> str:
+    """
+        The sha1 hex digest of the content of a file, read in blocks
+
+        :param filename: the file to hash
+        :return: a hex digest string
+    """
+    sha1 = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1024 ** 2), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def umasked(mode: int) -> int:
+    """
+        The permissions of a file created with mode under the current
+        umask, i.e. to publish a file written with the private mode of
+        the tempfile module as open would have created it.
+
+        :param mode: the requested permissions, i.e. 0o644
+        :return: the permissions with the umask applied
+    """
+    # the umask can only be read by setting it
+    umask = os.umask(0)
+    os.umask(umask)
+    return mode & ~umask
+
+
+def chunked(iterable, size: int):
+    """
+        Split an iterable into lists of (at most) size items, lazily.
+        A numpy array is split into views of size rows instead.
+
+        :param iterable: the items to split
+        :param size: the number of items in each chunk
+        :return: a generator of the chunks
+    """
+    size = max(1, int(size))
+    if isinstance(iterable, np.ndarray):
+        for start in range(0, len(iterable), size):
+            yield iterable[start:start + size]
+        return
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def prefetched(iterable, size: int = 1):
+    """
+        Iterate over an iterable on a background thread, keeping up to
+        size items ready ahead of the consumer, i.e. to read inventories
+        from disk while the previous ones are aggregated.
+
+        Exceptions raised by the iterable are raised to the consumer.
+        Closing the generator early stops the background thread.
+
+        :param iterable: the items to iterate over
+        :param size: the maximum number of items read ahead
+        :return: a generator of the items, in order
+    """
+    items = queue.Queue(maxsize=max(1, int(size)))
+    stop = threading.Event()
+    done = object()
+
+    def put(entry):
+        # give up if the consumer has stopped
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as error:
+            put((done, error))
+            return
+        put((done, None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,175 @@
+"""
+    Streaming writers for building a database one nuclide at a time
+
+    Nuclides are written as they are read (i.e. from a printlib5 file
+    or the FISPACT-II API, see scripts/makedata.py), so the whole raw
+    dictionary is never held in memory.
+
+    ```
+    with ag.JSONStreamWriter("lines.json", indexfile="lines.json.index.json") as writer:
+        for name, entry in reader:
+            writer.write(name, entry)
+    ```
+
+    All writers work on a temporary file or directory which is only
+    moved into place when the writer closes without an error.
+
+    The JSON writer streams each nuclide straight to the file. The
+    binary and SQLite writers buffer the nuclides as compact columnar
+    tables (see TablesBufferedWriter) and write them when closed.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+from .database import DefaultDatabase
+from .lazy import indexdict, indexentry
+from .sqlite import savesqlite
+from .tables import TablesBuilder, savetables
+from .util import umasked
+
+
+class JSONStreamWriter:
+    """
+    Write nuclides to a minified JSON datafile, in the schema of
+    DatabaseJSONFileLoader, one at a time. Optionally writes the
+    index for LazyDatabase at the same time.
+    """
+
+    __slots__ = ["filename", "indexfile", "ignorekeys", "_file", "_tmpfilename", "_index", "_sha1"]
+
+    def __init__(
+        self,
+        filename: str,
+        indexfile: str = None,
+        ignorekeys=DefaultDatabase.IGNORE_KEYS,
+    ):
+        """
+        :param filename: the JSON datafile to write
+        :param indexfile: the lazy index file to write, or None for no index
+        :param ignorekeys: the nuclide keys that are not spectral types
+        """
+        self.filename = filename
+        self.indexfile = indexfile
+        self.ignorekeys = ignorekeys
+        self._file = None
+        self._tmpfilename = None
+        self._index = []
+        self._sha1 = None
+
+    def __enter__(self):
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        fd, self._tmpfilename = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+        self._index = []
+        self._sha1 = hashlib.sha1()
+        self._write(b"{")
+        return self
+
+    def _write(self, data: bytes):
+        # the index keeps the hash of the content, see lazy.indexdict
+        self._file.write(data)
+        self._sha1.update(data)
+
+    def write(self, name: str, entry: dict):
+        """
+        Write a nuclide
+
+        :param name: the nuclide name, i.e. 'H3'
+        :param entry: the data of the nuclide in the raw (JSON) schema
+        """
+        if self._index:
+            self._write(b",")
+        self._write(json.dumps(name).encode("utf-8") + b":")
+        offset = self._file.tell()
+        data = json.dumps(entry, separators=(",", ":")).encode("utf-8")
+        self._write(data)
+        self._index.append(indexentry(name, entry, offset, len(data), self.ignorekeys))
+
+    def __exit__(self, exc_type, *args):
+        try:
+            if exc_type is None:
+                self._write(b"}")
+            self._file.close()
+            if exc_type is None:
+                # mkstemp creates it private to the user
+                os.chmod(self._tmpfilename, umasked(0o644))
+                os.replace(self._tmpfilename, self.filename)
+                if self.indexfile is not None:
+                    with open(self.indexfile, "wt") as findex:
+                        json.dump(
+                            indexdict(self.filename, self._sha1.hexdigest(), self._index),
+                            findex,
+                        )
+        finally:
+            if os.path.exists(self._tmpfilename):
+                os.remove(self._tmpfilename)
+            self._file = None
+            self._index = []
+            self._sha1 = None
+
+
+class TablesBufferedWriter:
+    """
+    Collect nuclides into columnar tables one at a time, and save them
+    with the given function when closed, i.e. savetables or savesqlite.
+
+    Nothing is written until the writer closes: the tables are buffered
+    in memory, but as compact typed arrays (see TablesBuilder), not the
+    raw dictionary, taking about twice the size of the line data (8
+    bytes a value) when the tables are built.
+    """
+
+    __slots__ = ["path", "save", "ignorekeys", "_builder"]
+
+    def __init__(self, path: str, save, ignorekeys=DefaultDatabase.IGNORE_KEYS):
+        """
+        :param path: the path to save to
+        :param save: a callable taking the tables and the path
+        :param ignorekeys: the nuclide keys that are not spectral types
+        """
+        self.path = path
+        self.save = save
+        self.ignorekeys = ignorekeys
+        self._builder = None
+
+    def __enter__(self):
+        self._builder = TablesBuilder(ignorekeys=self.ignorekeys)
+        return self
+
+    def write(self, name: str, entry: dict):
+        """
+        Write a nuclide
+
+        :param name: the nuclide name, i.e. 'H3'
+        :param entry: the data of the nuclide in the raw (JSON) schema
+        """
+        self._builder.add(name, entry)
+
+    def __exit__(self, exc_type, *args):
+        builder, self._builder = self._builder, None
+        if exc_type is None:
+            self.save(builder.build(), self.path)
+
+
+def BinaryStreamWriter(directory: str) -> TablesBufferedWriter:
+    """
+    Writer for the binary format, buffered until closed, see
+    TablesBufferedWriter and savetables
+
+    :param directory: the path of the directory to write
+    :returns: the writer
+    """
+    return TablesBufferedWriter(directory, savetables)
+
+
+def SQLiteStreamWriter(filename: str) -> TablesBufferedWriter:
+    """
+    Writer for the SQLite format, buffered until closed, see
+    TablesBufferedWriter and savesqlite
+
+    :param filename: the path of the SQLite file to write
+    :returns: the writer
+    """
+    return TablesBufferedWriter(filename, savesqlite)
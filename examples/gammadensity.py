@@ -34,28 +34,30 @@ class BinaryLineAggregator(ag.LineAggregator):
         We just want to know if a line exists or not.
         We don't care about activities.
     """
-    def _makehist(self, *args, **kwargs):
+    def _makehist(self, lines, values, *args, **kwargs):
         hist = np.zeros(self.grid.nrofbins)
 
         include_same_nuclide = False
         if 'include_same_nuclide' in kwargs and kwargs['include_same_nuclide']:
             include_same_nuclide = True
 
-        if len(self.lines) > 0:
-            self._sortlines()
+        if len(lines) > 0:
+            # sort the lines in ascending energy to walk the grid in order
+            order = np.argsort(lines, kind="stable")
+            lines, values = np.asarray(lines)[order], np.asarray(values)[order]
 
             average_energies = self.grid.midpoints
 
             # loop over lines to find appropriate bin
             ibin = 0
-            for i, line in enumerate(self.lines):
+            for i, line in enumerate(lines):
                 # loop over bounds from the last found bin
                 for j in range(ibin, len(self.grid) - 1):
                     if line >= self.grid[j] and line < self.grid[j + 1]:
                         if include_same_nuclide:
-                            hist[j] += (1 if self.values[i] > 0 else 0)
+                            hist[j] += (1 if values[i] > 0 else 0)
                         else:
-                            hist[j] = (1 if self.values[i] > 0 else hist[j])
+                            hist[j] = (1 if values[i] > 0 else hist[j])
                         ibin = j
                         break
 
@@ -18,20 +18,14 @@ MIN_HALFLIFE = 1e-6
 MAX_HALFLIFE = 1e20
 
 db = ag.Decay2012Database()
-allnuclides = db.allnuclidesoftype(spectype=SPECTYPE)
 
 
 def getdata(min_intensity=0.0):
-    x, y = [], []
-    for nuc in allnuclides:
-        energies = db.getenergies(nuc, spectype=SPECTYPE)*1e-6
-        intensites = db.getintensities(nuc, spectype=SPECTYPE)
-
-        filteredenergies = [ e for i, e in enumerate(energies) if intensites[i] > min_intensity ]
-
-        x.extend(list(filteredenergies))
-        y.extend([db.gethalflife(nuc)]*len(filteredenergies))
-    return x, y 
+    lines = db.query(spectype=SPECTYPE)
+    # only lines strictly above the threshold
+    lines = lines[lines["intensity"] > min_intensity]
+    halflives = db.nuclidetable()["halflife"]
+    return lines["energy"]*1e-6, halflives[lines["nuclide"]]
 
 
 # get the data without any intensity threshold
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+"""
+    Converts the JSON database file to the binary format,
+    a directory of .npy arrays which can be memory mapped.
+
+    Usage: makebinary.py [input.json] [outputdir]
+"""
+import actigamma as ag
+
+
+datadir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    '..', 'actigamma', 'data')
+jsonfilename = os.path.join(datadir, 'lines_decay_2012.min.json')
+binarydir = os.path.join(datadir, 'lines_decay_2012')
+
+if len(sys.argv) > 1:
+    jsonfilename = sys.argv[1]
+if len(sys.argv) > 2:
+    binarydir = sys.argv[2]
+
+print("reading {}...".format(jsonfilename))
+db = ag.DefaultDatabase(datasource=ag.DatabaseJSONFileLoader(datafile=jsonfilename))
+
+print("writing {}...".format(binarydir))
+# the JSON file is stamped in the manifest, Decay2012Database only
+# uses the binary data while the JSON file is unchanged
+ag.savetables(db.tables, binarydir, source=jsonfilename)
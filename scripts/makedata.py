@@ -1,25 +1,141 @@
+#!/usr/bin/env python3
+
+import argparse
+import multiprocessing
 import os
-import collections
-import json
+import sys
+"""
+    Builds the database from the FISPACT-II API if available, otherwise
+    from a printlib5 file (read with pypact).
+
+    Nuclides are streamed to the output as they are read, so the whole
+    library is never held in memory as a dictionary. The JSON output is
+    written as it goes, the binary and SQLite outputs are buffered as
+    compact tables and written at the end (see ag.TablesBufferedWriter).
+    With the API, independent nuclides are read in parallel by worker
+    processes.
+
+    Usage: makedata.py [--format json|binary|sqlite] [--jobs N] [--output path]
+
+    The JSON output is minified and written with its lazy index,
+    so minifyjson.py is no longer needed.
+"""
+import actigamma as ag
+
+referencedir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    '..', 'reference')
+
+filename = os.path.join(referencedir, 'printlib5_decay_2012.out')
+
+OUTPUTS = {
+    "json": os.path.join(referencedir, 'lines_decay_2012.json'),
+    "binary": os.path.join(referencedir, 'lines_decay_2012'),
+    "sqlite": os.path.join(referencedir, 'lines_decay_2012.sqlite'),
+}
+
+
+LINEKEYS = ["energies", "energies_unc", "intensities", "intensities_unc",
+            "norms", "norms_unc"]
+
+
+def lineentry(number, mean_energy, mean_energy_unc, norm, norm_unc, lines):
+    # the spectral data of one type in the JSON schema,
+    # lines are (energy, energy_unc, intensity, intensity_unc, norm, norm_unc)
+    # with no lines every key is still there, as empty lists
+    columns = list(zip(*lines)) or [()] * len(LINEKEYS)
+    return {
+        "number": number,
+        "mean_energy": mean_energy,
+        "mean_energy_unc": mean_energy_unc,
+        "mean_normalisation": norm,
+        "mean_normalisation_unc": norm_unc,
+        "lines": {
+            key: list(values) for key, values in zip(LINEKEYS, columns)
+        }
+    }
+
+
+# the path of the FISPACT-II nuclear data for the API
+NUCLEAR_DATA_ENV = 'NUCLEAR_DATA'
+
+# the FISPACT-II nuclear data, loaded once in the parent process and
+# inherited by forked workers
+nd = None
+log = None
+DECAYTYPES = {}
+
+
+def apinuclide(task):
+    """
+        Read a single nuclide, given as (index, zai), from the loaded
+        nuclear data, None for nuclides without spectral data (i.e. stables)
+    """
+    import pyfispact as pf
+
+    i, zai = task
+    nroftypes = nd.getdecaynrofspectrumtypes(i)
+    if nroftypes == 0:
+        return None
 
-# uses pypact to read FISPACT-II printlib5 file
-import pypact as pp
+    halflife = -1
+    if not nd.getdecayisstable(i):
+        halflife = nd.getdecayhalflife(i)
 
-filename = os.path.join(os.path.dirname(os.path.abspath(__file__)),
-    '..', 'reference', 'printlib5_decay_2012.out')
+    name = pf.util.nuclide_from_zai(log, zai)
+    entry = {"zai": zai, "halflife": halflife}
+    for mode in range(nroftypes):
+        typename = DECAYTYPES[nd.getdecayspectrumtype(i, mode)]
+        nroflines = nd.getdecayspectrumnroflines(i, mode)
 
-# full dataset 
-data = collections.defaultdict()
+        # ignore empty data, only the first type of a nuclide is kept
+        if nroflines == 0:
+            if len(entry) == 2:
+                entry[typename] = {}
+            continue
 
-# get halflives 
-halflifedata = collections.defaultdict()
+        norm = nd.getdecayspectrumnorm(i, mode)
+        norm_unc = nd.getdecayspectrumnormunc(i, mode)
+        lines = []
+        for l in range(nroflines):
+            line = nd.getdecayspectrumline(i, mode, l)
+            lines.append((line.energy[0], line.energy[1], line.intensity[0],
+                          line.intensity[1], norm, norm_unc))
 
-# use FISPACT-II API instead if available
-try:
-    import sys
+        entry[typename] = lineentry(
+            nroflines,
+            nd.getdecayspectrummeanenergy(i, mode),
+            nd.getdecayspectrummeanenergyuncert(i, mode),
+            norm, norm_unc, lines)
+    return name, entry
+
+
+def hasapi():
+    """
+        Check if the FISPACT-II API can be used: pyfispact is installed
+        and the nuclear data path is set. Only then is printlib5 used
+        instead, any failure of the API itself is an error, since the
+        printlib5 data has no halflives.
+    """
+    try:
+        import pyfispact
+    except ImportError:
+        print("pyfispact is not installed")
+        return False
+    nd_path = os.getenv(NUCLEAR_DATA_ENV)
+    if not nd_path or not os.path.isdir(nd_path):
+        print("{} is not set to the nuclear data directory".format(NUCLEAR_DATA_ENV))
+        return False
+    return True
+
+
+def fromapi(jobs):
+    """
+        Stream nuclides from the FISPACT-II API, in parallel
+    """
+    global nd, log, DECAYTYPES
     import pyfispact as pf
 
-    nd_path = os.getenv('NUCLEAR_DATA')
+    nd_path = os.getenv(NUCLEAR_DATA_ENV)
 
     log = pf.Monitor()
     pf.initialise(log)
@@ -60,130 +176,95 @@ try:
         pf.SPECTRUM_TYPE_X_RAY(): "x-ray"
     }
 
-    # get half life
-    for i, zai in enumerate(nd.getdecayzais()):
-        halflife = -1
-        if not nd.getdecayisstable(i):
-            halflife = nd.getdecayhalflife(i)
-
-        name = pf.util.nuclide_from_zai(log, zai)
-        nroftypes = nd.getdecaynrofspectrumtypes(i)
-        for mode in range(nroftypes):
-            typeid = nd.getdecayspectrumtype(i, mode)
-            typename = DECAYTYPES[typeid]
-
-            if name not in data:
-                data[name] = {
-                    "zai": zai,
-                    "halflife": halflife,
-                    typename: {}
-                }
-            nroflines = nd.getdecayspectrumnroflines(i, mode)
+    # the ZAIs are fetched once, not by each task
+    tasks = list(enumerate(nd.getdecayzais()))
+    if jobs == 1:
+        nuclides = map(apinuclide, tasks)
+        yield from (nuclide for nuclide in nuclides if nuclide is not None)
+        return
 
-            # ignore empty data
-            if nroflines == 0:
-                continue
+    # workers are forked so they share the loaded nuclear data,
+    # results come back in order
+    with multiprocessing.get_context("fork").Pool(jobs) as pool:
+        nuclides = pool.imap(apinuclide, tasks, chunksize=32)
+        yield from (nuclide for nuclide in nuclides if nuclide is not None)
+
+
+def fromprintlib5(filename):
+    """
+        Stream nuclides from a printlib5 file.
+        Entries of a nuclide are expected to be consecutive.
+    """
+    # uses pypact to read FISPACT-II printlib5 file
+    import pypact as pp
 
-            norm = nd.getdecayspectrumnorm(i, mode)
-            norm_unc = nd.getdecayspectrumnormunc(i, mode)
-
-            # get the line data
-            energies = []
-            energies_unc = []
-            intensities = []
-            intensities_unc = []
-            norms = []
-            norms_unc = []
-            for l in range(nroflines):
-                line = nd.getdecayspectrumline(i, mode, l)
-                energies.append(line.energy[0])
-                energies_unc.append(line.energy[1])
-                intensities.append(line.intensity[0])
-                intensities_unc.append(line.intensity[1])
-                norms.append(norm)
-                norms_unc.append(norm_unc)
-
-            data[name][typename] = {
-                "number": nroflines,
-                "mean_energy": nd.getdecayspectrummeanenergy(i, mode),
-                "mean_energy_unc": nd.getdecayspectrummeanenergyuncert(i, mode),
-                "mean_normalisation": norm,
-                "mean_normalisation_unc": norm_unc,
-                "lines": {
-                    "energies": energies,
-                    "energies_unc": energies_unc,
-                    "intensities": intensities,
-                    "intensities_unc": intensities_unc,
-                    "norms": norms,
-                    "norms_unc": norms_unc,
-                }
-            }
-except:
     print("WARNING: Without the API this does not get the half-lives!")
 
-    # TODO: if have pyfispact then do it the correct way
     # printlib5 does not have halflives - we need this too!
+    halflife = -1
+
+    name, entry = None, None
+    written = set()
     with pp.PrintLib5Reader(filename) as output:
-        for entry in output.spectral_data:
-            if entry.type == "no spectral data":
+        for spectrum in output.spectral_data:
+            if spectrum.type == "no spectral data":
                 continue
 
-            # check if the halflife has been set
-            halflife = -1
-            if entry.zai in halflifedata:
-                halflife = halflifedata[entry.zai]
-
             # remove whitespace
-            typename = "_".join(entry.type.split(" "))
+            typename = "_".join(spectrum.type.split(" "))
+            nuclide = "".join(spectrum.name.split(" "))
 
-            # remove whitespace
-            name = "".join(entry.name.split(" "))
-            if name not in data:
-                data[name] = {
-                    "zai": entry.zai,
-                    "halflife": halflife,
-                    typename: {}
-                }
+            if nuclide != name:
+                if name is not None:
+                    written.add(name)
+                    yield name, entry
+                if nuclide in written:
+                    raise ValueError("Entries of {} are not consecutive".format(nuclide))
+                name = nuclide
+                entry = {"zai": spectrum.zai, "halflife": halflife, typename: {}}
 
             # ignore empty data
-            if entry.lines == 0:
+            if spectrum.lines == 0:
                 continue
 
-            # get the line data
-            energies = []
-            energies_unc = []
-            intensities = []
-            intensities_unc = []
-            norms = []
-            norms_unc = []
-            for l in entry.lines:
-                energies.append(l[0])
-                energies_unc.append(l[1])
-                intensities.append(l[2])
-                intensities_unc.append(l[3])
-                norms.append(l[4])
-                norms_unc.append(l[5])
-
-            data[name][typename] = {
-                "number": entry.number,
-                "mean_energy": entry.mean_energy,
-                "mean_energy_unc": entry.mean_energy_unc,
-                "mean_normalisation": entry.mean_normalisation,
-                "mean_normalisation_unc": entry.mean_normalisation_unc,
-                "lines": {
-                    "energies": energies,#entry.lines.energies,
-                    "energies_unc": energies_unc,#entry.lines.energies_unc,
-                    "intensities": intensities,#entry.lines.intensities,
-                    "intensities_unc": intensities_unc,#entry.lines.intensities_unc,
-                    "norms": norms,#entry.lines.norms,
-                    "norms_unc": norms_unc,#entry.lines.norms_unc
-                }
-            }
-
-
-outputfile = os.path.join(os.path.dirname(os.path.abspath(__file__)),
-    '..', 'reference', 'lines_decay_2012.json')
-
-print("Creating JSON database...")
-with open(outputfile, 'wt') as flines:
-    flines.write(json.dumps(data, indent=4, sort_keys=False))
\ No newline at end of file
+            entry[typename] = lineentry(
+                spectrum.number,
+                spectrum.mean_energy,
+                spectrum.mean_energy_unc,
+                spectrum.mean_normalisation,
+                spectrum.mean_normalisation_unc,
+                spectrum.lines)
+
+    if name is not None:
+        yield name, entry
+
+
+def makewriter(fmt, output):
+    if fmt == "json":
+        return ag.JSONStreamWriter(output, indexfile=output + ag.LAZY_INDEX_SUFFIX)
+    if fmt == "binary":
+        return ag.BinaryStreamWriter(output)
+    return ag.SQLiteStreamWriter(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the decay line database")
+    parser.add_argument("--format", choices=sorted(OUTPUTS), default="json")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    output = args.output or OUTPUTS[args.format]
+
+    # use FISPACT-II API instead if available
+    if hasapi():
+        nuclides = fromapi(max(args.jobs, 1))
+    else:
+        nuclides = fromprintlib5(filename)
+
+    print("Creating {} database {}...".format(args.format, output))
+    with makewriter(args.format, output) as writer:
+        for count, (name, entry) in enumerate(nuclides, 1):
+            writer.write(name, entry)
+            print(" [{}] {}".format(count, name), end="\r")
+    print()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+"""
+    Indexes the JSON database file for the lazy database, writing
+    the byte offset of each nuclide to an index file next to it.
+
+    Usage: makeindex.py [input.json] [output.index.json]
+"""
+import actigamma as ag
+
+
+datadir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    '..', 'actigamma', 'data')
+jsonfilename = os.path.join(datadir, 'lines_decay_2012.min.json')
+indexfilename = None
+
+if len(sys.argv) > 1:
+    jsonfilename = sys.argv[1]
+if len(sys.argv) > 2:
+    indexfilename = sys.argv[2]
+
+print("indexing {}...".format(jsonfilename))
+print("written {}".format(ag.writejsonindex(jsonfilename, indexfilename)))
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+"""
+    Converts the JSON database file to an SQLite file, indexed on
+    nuclide name, ZAI, spectral type and line energy.
+
+    Usage: makesqlite.py [input.json] [output.sqlite]
+"""
+import actigamma as ag
+
+
+datadir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    '..', 'actigamma', 'data')
+jsonfilename = os.path.join(datadir, 'lines_decay_2012.min.json')
+sqlitefilename = os.path.join(datadir, 'lines_decay_2012.sqlite')
+
+if len(sys.argv) > 1:
+    jsonfilename = sys.argv[1]
+if len(sys.argv) > 2:
+    sqlitefilename = sys.argv[2]
+
+print("reading {}...".format(jsonfilename))
+db = ag.DefaultDatabase(datasource=ag.DatabaseJSONFileLoader(datafile=jsonfilename))
+
+print("writing {}...".format(sqlitefilename))
+ag.savesqlite(db.tables, sqlitefilename)
@@ -0,0 +1,167 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import actigamma as ag
+
+from .databasetest import MockLoader
+
+
+class ResponseCacheUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = ag.DefaultDatabase(datasource=MockLoader())
+        self.grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        self.inv = ag.UnstablesInventory(data=[(10030, 2.0), (30080, 3.0)])
+
+    def test_hits(self):
+        cache = ag.ResponseCache()
+        lc = ag.LineAggregator(self.db, self.grid, cache=cache)
+        first, _ = lc(self.inv, spectype="beta")
+        second, _ = lc(self.inv, spectype="beta")
+        self.assertEqual(first.tolist(), second.tolist(), "Assert same hist")
+        self.assertEqual((1, 1, 0), (cache.hits, cache.misses, cache.evictions),
+                         "Assert counters")
+        self.assertEqual(1, len(cache), "Assert one entry")
+
+        # same grid content, different object - still a hit
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        ag.LineAggregator(self.db, grid, cache=cache)(self.inv, spectype="beta")
+        self.assertEqual(2, cache.hits, "Assert hit on same bounds")
+
+    def test_keys(self):
+        cache = ag.ResponseCache()
+        ag.LineAggregator(self.db, self.grid, cache=cache)(self.inv, spectype="beta")
+        ag.MultiTypeLineAggregator(self.db, self.grid, cache=cache)(self.inv, types=["beta"])
+        self.assertEqual((1, 1), (cache.hits, cache.misses),
+                         "Assert aggregators binning the same way share entries")
+
+        ag.LineAverageEnergyAggregator(self.db, self.grid, cache=cache)(self.inv, spectype="beta")
+        ag.LineAggregator(self.db, ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 3)),
+                          cache=cache)(self.inv, spectype="beta")
+        other = ag.DefaultDatabase(datasource=MockLoader())
+        ag.LineAggregator(other, self.grid, cache=cache)(self.inv, spectype="beta")
+        self.assertEqual((1, 4), (cache.hits, cache.misses),
+                         "Assert kind, grid and database are part of the key")
+        self.assertEqual(4, len(cache), "Assert four entries")
+
+        # entries are dropped once their database is gone
+        del other
+        self.assertEqual(3, len(cache), "Assert entries released")
+
+    def test_eviction(self):
+        cache = ag.ResponseCache()
+        lc = ag.LineAggregator(self.db, self.grid, cache=cache)
+        lc(self.inv, spectype="beta")
+        onesize = cache.nbytes
+        cache.maxbytes = onesize
+
+        lc(ag.UnstablesInventory(data=[(30080, 3.0)]), spectype="alpha")
+        self.assertEqual(1, cache.evictions, "Assert least recent evicted")
+        self.assertEqual(1, len(cache), "Assert one entry")
+        self.assertTrue(cache.nbytes <= cache.maxbytes, "Assert within budget")
+
+        cache.maxbytes = 0
+        self.assertEqual(0, len(cache), "Assert all evicted")
+        self.assertEqual(0, cache.nbytes, "Assert no memory used")
+        lc(self.inv, spectype="beta")
+        self.assertEqual(0, len(cache), "Assert too large to cache")
+
+    def test_matches_uncached(self):
+        types = ["beta", "gamma"]
+        inv = ag.UnstablesInventory(data=[(10030, 2.0)])
+        for aggregator in [ag.LineAggregator, ag.LineAverageEnergyAggregator]:
+            cached, _ = aggregator(self.db, self.grid)(inv, spectype="beta")
+            uncached, _ = aggregator(self.db, self.grid, cache=None)(inv, spectype="beta")
+            self.assertTrue(np.allclose(cached, uncached), "Assert same hist")
+
+        cached, _ = ag.MultiTypeLineAggregator(self.db, self.grid)(inv, types=types)
+        uncached, _ = ag.MultiTypeLineAggregator(self.db, self.grid, cache=None)(inv, types=types)
+        self.assertTrue(np.allclose(cached, uncached), "Assert same multi type hist")
+
+
+class NoBuildLineAggregator(ag.LineAggregator):
+    def response(self, *args, **kwargs):
+        raise AssertionError("Response matrix should not be built")
+
+
+class UnwritableDiskCache(ag.DiskCache):
+    def save(self, key, matrix):
+        raise OSError("read only")
+
+
+class DiskCacheUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = ag.DefaultDatabase(datasource=MockLoader())
+        self.grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        self.inv = ag.UnstablesInventory(data=[(10030, 2.0), (30080, 3.0)])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_databasehash(self):
+        other = ag.DefaultDatabase(datasource=MockLoader())
+        self.assertEqual(ag.databasehash(self.db), ag.databasehash(other),
+                         "Assert same content, same hash")
+
+    def test_restart(self):
+        disk = ag.DiskCache(self.tmpdir.name)
+        cache = ag.ResponseCache(disk=disk)
+        expected, _ = ag.LineAggregator(self.db, self.grid, cache=cache)(self.inv, spectype="beta")
+        self.assertEqual(1, len(os.listdir(self.tmpdir.name)), "Assert one file")
+
+        # a new process - new cache and database, nothing should be built
+        cache = ag.ResponseCache(disk=ag.DiskCache(self.tmpdir.name))
+        lc = NoBuildLineAggregator(ag.DefaultDatabase(datasource=MockLoader()), self.grid,
+                                   cache=cache)
+        hist, _ = lc(self.inv, spectype="beta")
+        self.assertEqual(expected.tolist(), hist.tolist(), "Assert same hist from disk")
+
+    def test_eviction(self):
+        disk = ag.DiskCache(self.tmpdir.name)
+        cache = ag.ResponseCache(disk=disk)
+        lc = ag.LineAggregator(self.db, self.grid, cache=cache)
+        lc(self.inv, spectype="beta")
+        disk.maxbytes = disk.nbytes
+
+        lc(ag.UnstablesInventory(data=[(30080, 3.0)]), spectype="alpha")
+        self.assertEqual(1, len(os.listdir(self.tmpdir.name)), "Assert oldest removed")
+
+        disk.clear()
+        self.assertEqual(0, disk.nbytes, "Assert cleared")
+
+    def test_version(self):
+        disk = ag.DiskCache(self.tmpdir.name)
+        matrix = ag.LineAggregator(self.db, self.grid).response(spectype="beta")
+        disk.save("key", matrix)
+        self.assertEqual(matrix.data.tolist(), disk.load("key").data.tolist(), "Assert loaded")
+        self.assertIsNone(disk.load("otherkey"), "Assert missing key")
+
+        ag.cache.DISK_CACHE_VERSION += 1
+        try:
+            self.assertIsNone(disk.load("key"), "Assert stale version ignored")
+        finally:
+            ag.cache.DISK_CACHE_VERSION -= 1
+
+    def test_corrupt(self):
+        disk = ag.DiskCache(self.tmpdir.name)
+        disk.save("key", ag.LineAggregator(self.db, self.grid).response(spectype="beta"))
+        path = os.path.join(self.tmpdir.name, os.listdir(self.tmpdir.name)[0])
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) // 2)
+
+        self.assertIsNone(disk.load("key"), "Assert truncated file is a miss")
+        self.assertEqual([], os.listdir(self.tmpdir.name), "Assert truncated file removed")
+
+        cache = ag.ResponseCache(disk=disk)
+        hist, _ = ag.LineAggregator(self.db, self.grid, cache=cache)(self.inv, spectype="beta")
+        self.assertEqual(1, len(os.listdir(self.tmpdir.name)), "Assert rebuilt and saved")
+
+    def test_save_fails(self):
+        cache = ag.ResponseCache(disk=UnwritableDiskCache(self.tmpdir.name))
+        expected, _ = ag.LineAggregator(self.db, self.grid, cache=None)(self.inv, spectype="beta")
+        hist, _ = ag.LineAggregator(self.db, self.grid, cache=cache)(self.inv, spectype="beta")
+        self.assertEqual(expected.tolist(), hist.tolist(), "Assert hist without persisting")
+        self.assertEqual(1, len(cache), "Assert still cached in memory")
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 import actigamma as ag
 
 
@@ -38,4 +39,290 @@ class EnergyGridUnitTest(unittest.TestCase):
         self.assertEqual([1.125, 1.375, 1.625, 1.875], list(grid.midpoints), "Assert mid points")
         self.assertEqual([1.0, 1.25, 1.5, 1.75, 2.0], list(grid.bounds), "Assert bounds")
 
-    # TODO: need to test exceptions!
\ No newline at end of file
+    def test_immutable(self):
+        bounds = ag.linspace(1, 2, 5)
+        grid = ag.EnergyGrid(bounds=bounds)
+        bounds[0] = 0.0
+        self.assertEqual(1.0, grid[0], "Assert bounds copied")
+        with self.assertRaises(ValueError):
+            grid.bounds[0] = 0.0
+        with self.assertRaises(AttributeError):
+            grid.bounds = ag.linspace(1, 2, 3)
+
+    def test_fingerprint(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(1, 2, 5))
+        same = ag.EnergyGrid(bounds=[1.0, 1.25, 1.5, 1.75, 2.0])
+        other = ag.EnergyGrid(bounds=ag.linspace(1, 2, 6))
+        self.assertEqual(grid.fingerprint, same.fingerprint, "Assert same fingerprint")
+        self.assertEqual(ag.gridhash(grid.bounds), grid.fingerprint, "Assert bounds hash")
+        self.assertNotEqual(grid.fingerprint, other.fingerprint, "Assert different fingerprint")
+        self.assertEqual(grid, same, "Assert equal")
+        self.assertNotEqual(grid, other, "Assert not equal")
+        self.assertEqual(1, len({grid, same}), "Assert hashable")
+
+    def test_negative(self):
+        with self.assertRaises(ag.UnphysicalValueException):
+            ag.EnergyGrid(bounds=ag.linspace(-1, 2, 5))
+
+
+class CountingLineAggregator(ag.LineAggregator):
+    # counts lines instead of summing values
+    def _makehist(self, lines, values, *args, **kwargs):
+        return super()._makehist(lines, [1.0] * len(lines), *args, **kwargs)
+
+
+class HalvingMultiTypeLineAggregator(ag.MultiTypeLineAggregator):
+    # scales the value of every line found
+    def _findlines(self, inventory, *args, **kwargs):
+        lines, values = super()._findlines(inventory, *args, **kwargs)
+        return lines, 0.5 * values
+
+
+class LineAggregatorUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        from .databasetest import MockLoader
+        self.db = ag.DefaultDatabase(datasource=MockLoader())
+
+    def aggregators(self, aggregator, grid):
+        # the same aggregator with and without a response matrix cache
+        return [aggregator(self.db, grid, cache=ag.ResponseCache()),
+                aggregator(self.db, grid, cache=None)]
+
+    def test_binindices(self):
+        bounds = ag.linspace(0.0, 4.0, 5)
+        self.assertEqual([-1, 0, 0, 1, 3, -1, -1],
+                         ag.binindices(bounds, [-1.0, 0.0, 0.5, 1.0, 3.9, 4.0, 5.0]).tolist(),
+                         "Assert half open bins and out of range lines")
+        self.assertEqual([], ag.binindices(bounds, []).tolist(), "Assert no lines")
+
+    def test_single(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        for lc in self.aggregators(ag.LineAggregator, grid):
+            inv = ag.UnstablesInventory(data=[(10030, 2.0), (30080, 3.0)])
+
+            hist, bounds = lc(inv, spectype="beta")
+            self.assertEqual([0.0, 2.0, 3.0, 0.0, 1.6], hist.tolist(), "Assert beta hist")
+            self.assertEqual(grid.bounds.tolist(), bounds.tolist(), "Assert bounds")
+
+    def test_outofrange(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(20e3, 30e3, 3))
+        for lc in self.aggregators(ag.LineAggregator, grid):
+            inv = ag.UnstablesInventory(data=[(10030, 2.0), (30080, 3.0)])
+
+            hist, _ = lc(inv, spectype="beta")
+            self.assertEqual([0.0, 3.0], hist.tolist(), "Assert lines outside grid are ignored")
+
+    def test_bounds_exact(self):
+        # a line on the final upper bound is not binned, on a lower bound it is
+        grid = ag.EnergyGrid(bounds=np.array([18571.0, 28571.0, 45213.2]))
+        for lc in self.aggregators(ag.LineAggregator, grid):
+            inv = ag.UnstablesInventory(data=[(10030, 2.0), (30080, 3.0)])
+
+            hist, _ = lc(inv, spectype="beta")
+            self.assertEqual([2.0, 3.0], hist.tolist(), "Assert half open bins")
+
+    def test_average_energy(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        for lc in self.aggregators(ag.LineAverageEnergyAggregator, grid):
+            inv = ag.UnstablesInventory(data=[(10030, 2.0), (30080, 3.0)])
+
+            hist, _ = lc(inv, spectype="beta")
+            expected = [0.0, 2.0*18571.0/15e3, 3.0*28571.0/25e3, 0.0, 1.6*45213.2/45e3]
+            self.assertTrue(np.allclose(expected, hist), "Assert energy conserving hist")
+
+    def test_average_energy_zero_width(self):
+        # a zero width bin at 0 eV must not produce nans
+        grid = ag.EnergyGrid(bounds=np.array([0.0, 0.0, 20e3, 50e3]))
+        for lc in self.aggregators(ag.LineAverageEnergyAggregator, grid):
+            inv = ag.UnstablesInventory(data=[(10030, 2.0)])
+
+            hist, _ = lc(inv, spectype="beta")
+            expected = [0.0, 2.0*18571.0/10e3, 1.6*45213.2/35e3]
+            self.assertTrue(np.allclose(expected, hist), "Assert zero width bins are empty")
+
+    def test_multitype_repeat(self):
+        # calls must not accumulate the lines of earlier calls
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 2e6, 5))
+        for lc in self.aggregators(ag.MultiTypeLineAggregator, grid):
+            inv = ag.UnstablesInventory(data=[(30080, 3.0)])
+
+            first, _ = lc(inv, types=["alpha", "beta"])
+            second, _ = lc(inv, types=["alpha", "beta"])
+            self.assertEqual([3.0, 0.0, 0.0, 3.0], first.tolist(), "Assert alpha + beta hist")
+            self.assertEqual(first.tolist(), second.tolist(), "Assert repeated calls agree")
+
+    def test_map(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        invs = [ag.UnstablesInventory(data=[(10030, float(i)), (30080, 2.0*i)])
+                for i in range(1, 21)]
+        for lc in self.aggregators(ag.LineAggregator, grid):
+            expected = [lc(inv, spectype="beta")[0].tolist() for inv in invs]
+
+            results = lc.map(invs, spectype="beta", workers=4)
+            self.assertEqual(expected, [hist.tolist() for hist, _ in results],
+                             "Assert threaded results match sequential, in order")
+            for _, bounds in results:
+                self.assertEqual(grid.bounds.tolist(), bounds.tolist(), "Assert bounds")
+
+    def test_multitype_weights(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 2e6, 5))
+        for lc in self.aggregators(ag.MultiTypeLineAggregator, grid):
+            inv = ag.UnstablesInventory(data=[(30080, 3.0)])
+
+            hist, _ = lc(inv, types=["alpha", "beta"], weights={"alpha": 0.5})
+            self.assertEqual([3.0, 0.0, 0.0, 1.5], hist.tolist(), "Assert weighted hist")
+
+            stacked, _ = lc(inv, types=["alpha", "beta"], weights={"alpha": 0.5}, stacked=True)
+            self.assertEqual([[0.0, 0.0, 0.0, 1.5], [3.0, 0.0, 0.0, 0.0]], stacked.tolist(),
+                             "Assert stacked (types x bins) hist")
+            self.assertEqual(hist.tolist(), stacked.sum(axis=0).tolist(),
+                             "Assert stacked sums to hist")
+
+            with self.assertRaises(ag.NoDataException):
+                lc(ag.UnstablesInventory(data=[(10030, 1.0)]), types=["alpha", "beta"])
+
+    def test_multitype_merged_cache(self):
+        cache = ag.ResponseCache()
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        lc = ag.MultiTypeLineAggregator(self.db, grid, cache=cache)
+        inv = ag.UnstablesInventory(data=[(10030, 2.0)])
+
+        lc(inv, types=["beta", "gamma"])
+        lc(inv, types=["beta", "gamma"], stacked=True)
+        self.assertEqual((1, 1), (cache.hits, cache.misses), "Assert one merged matrix")
+
+        lc(inv, types=["beta", "gamma"], weights={"gamma": 2.0})
+        self.assertEqual(2, len(cache), "Assert weights are part of the key")
+
+    def test_batch(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        invs = [ag.UnstablesInventory(data=[(10030, float(i)), (30080, 2.0*i)])
+                for i in range(1, 11)]
+        for lc in self.aggregators(ag.LineAverageEnergyAggregator, grid):
+            expected = np.array([lc(inv, spectype="beta")[0] for inv in invs])
+
+            hists = lc.batch(invs, spectype="beta")
+            self.assertEqual((10, 5), hists.shape, "Assert (N x bins)")
+            self.assertTrue(np.allclose(expected, hists), "Assert batch matches calls")
+
+            # chunks of a single inventory, into a given buffer
+            out = np.full((10, 5), np.nan)
+            result = lc.batch(invs, spectype="beta", out=out, maxbytes=1)
+            self.assertIs(out, result, "Assert out is returned")
+            self.assertTrue(np.allclose(expected, out), "Assert chunked batch")
+
+            # an activity matrix in the row order of the response matrix
+            zais = lc.cachedresponse(spectype="beta").zais.tolist()
+            activities = np.zeros((10, len(zais)))
+            for k, inv in enumerate(invs):
+                for zai, activity in inv:
+                    activities[k, zais.index(zai)] = activity
+            self.assertTrue(np.allclose(expected, lc.batch(activities, spectype="beta")),
+                            "Assert activity matrix batch")
+
+            with self.assertRaises(ValueError):
+                lc.batch(invs, spectype="beta", out=np.zeros((9, 5)))
+            with self.assertRaises(ValueError):
+                lc.batch(np.zeros((10, len(zais) + 1)), spectype="beta")
+            with self.assertRaises(ag.UnknownOrUnstableNuclideException):
+                lc.batch([ag.UnstablesInventory(data=[(922350, 1.0)])], spectype="beta")
+
+    def test_batch_multitype(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 2e6, 5))
+        invs = [ag.UnstablesInventory(data=[(30080, float(i))]) for i in range(1, 4)]
+        for lc in self.aggregators(ag.MultiTypeLineAggregator, grid):
+            kwargs = dict(types=["alpha", "beta"], weights={"beta": 2.0}, stacked=True)
+            expected = np.array([lc(inv, **kwargs)[0] for inv in invs])
+
+            hists = lc.batch(invs, **kwargs)
+            self.assertEqual((3, 2, 4), hists.shape, "Assert (N x types x bins)")
+            self.assertTrue(np.allclose(expected, hists), "Assert stacked batch")
+
+            summed = lc.batch(invs, types=["alpha", "beta"], weights={"beta": 2.0})
+            self.assertTrue(np.allclose(expected.sum(axis=1), summed), "Assert summed batch")
+
+            with self.assertRaises(ag.NoDataException):
+                lc.batch([ag.UnstablesInventory(data=[(10030, 1.0)])], types=["alpha", "beta"])
+
+    def test_stream(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        invs = [ag.UnstablesInventory(data=[(10030, float(i)), (30080, 2.0*i)])
+                for i in range(1, 11)]
+        for lc in self.aggregators(ag.LineAggregator, grid):
+            expected = lc.batch(invs, spectype="beta")
+
+            hists = list(lc.stream(iter(invs), spectype="beta"))
+            self.assertEqual(10, len(hists), "Assert one histogram per inventory")
+            self.assertTrue(np.allclose(expected, hists), "Assert streamed histograms")
+
+            for prefetch in [0, 2]:
+                blocks = list(lc.stream(iter(invs), spectype="beta", blocksize=4,
+                                        prefetch=prefetch))
+                self.assertEqual([(4, 5), (4, 5), (2, 5)], [b.shape for b in blocks],
+                                 "Assert blocks")
+                self.assertTrue(np.allclose(expected, np.concatenate(blocks)),
+                                "Assert blocks in order")
+
+    def test_stream_lazy(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        read = []
+
+        def inventories():
+            for i in range(1000):
+                read.append(i)
+                yield ag.UnstablesInventory(data=[(10030, 1.0)])
+
+        lc = ag.LineAggregator(self.db, grid, cache=ag.ResponseCache())
+        stream = lc.stream(inventories(), spectype="beta", blocksize=10)
+        next(stream)
+        self.assertEqual(10, len(read), "Assert only one block is read")
+        stream.close()
+
+        stream = lc.stream(inventories(), spectype="beta", blocksize=10, prefetch=1)
+        next(stream)
+        stream.close()
+        self.assertTrue(len(read) < 100, "Assert prefetching stops on close")
+
+    def test_stream_error(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        lc = ag.LineAggregator(self.db, grid, cache=ag.ResponseCache())
+
+        def inventories():
+            yield ag.UnstablesInventory(data=[(10030, 1.0)])
+            raise IOError("unreadable")
+
+        with self.assertRaises(IOError):
+            list(lc.stream(inventories(), spectype="beta", blocksize=1, prefetch=2))
+
+    def test_overridden_hooks(self):
+        # the response matrix cache must not bypass overridden hooks
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        invs = [ag.UnstablesInventory(data=[(10030, 2.0), (30080, 3.0)])]
+        for lc in self.aggregators(CountingLineAggregator, grid):
+            hist, _ = lc(invs[0], spectype="beta")
+            self.assertEqual([0.0, 1.0, 1.0, 0.0, 1.0], hist.tolist(), "Assert lines counted")
+            self.assertEqual([hist.tolist()], lc.batch(invs, spectype="beta").tolist(),
+                             "Assert batch counts lines")
+            self.assertEqual([hist.tolist()], [h.tolist() for h in lc.stream(invs, spectype="beta")],
+                             "Assert stream counts lines")
+
+            zais = lc.response(spectype="beta").zais.tolist()
+            activities = np.array([[2.0 if zai == 10030 else 3.0 for zai in zais]])
+            self.assertEqual([hist.tolist()], lc.batch(activities, spectype="beta").tolist(),
+                             "Assert activity matrix batch counts lines")
+
+        for lc in self.aggregators(HalvingMultiTypeLineAggregator, grid):
+            hist, _ = lc(invs[0], types=["beta"])
+            self.assertEqual([0.0, 1.0, 1.5, 0.0, 0.8], hist.tolist(), "Assert lines halved")
+
+    def test_multitype_notypes(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        inv = ag.UnstablesInventory(data=[(10030, 2.0)])
+        for lc in self.aggregators(ag.MultiTypeLineAggregator, grid):
+            hist, _ = lc(inv, types=[])
+            self.assertEqual([0.0] * 5, hist.tolist(), "Assert empty hist")
+            stacked, _ = lc(inv, types=[], stacked=True)
+            self.assertEqual((0, 5), stacked.shape, "Assert no stacked types")
+            self.assertEqual([[0.0] * 5], lc.batch([inv], types=[]).tolist(),
+                             "Assert empty batch hist")
@@ -1,4 +1,9 @@
 import unittest
+import os
+import json
+import tempfile
+from unittest import mock
+import numpy as np
 import actigamma as ag
 
 
@@ -126,6 +131,27 @@ class DatabaseInventoryUnitTest(unittest.TestCase):
             sorted(["gamma", "beta", "SF"]), self.db.gettypes("H3"), "Assert all types"
         )
 
+    def test_membership(self):
+        self.assertEqual(
+            [[True, False, True, True], [False, True, True, False]],
+            self.db.membership.tolist(),
+            "Assert nuclide x type membership (SF, alpha, beta, gamma)",
+        )
+        self.assertEqual(True, self.db.hastype("H3", spectype="SF"), "Assert H3 has SF")
+        self.assertEqual(False, self.db.hastype("H3", spectype="alpha"), "Assert H3 no alpha")
+        self.assertEqual(False, self.db.hastype("H3", spectype="dsad"), "Assert unknown type")
+        self.assertEqual([], self.db.allnuclidesoftype(spectype="dsad"), "Assert unknown type")
+
+        # returned lists are copies, safe to modify
+        self.db.gettypes("H3").append("dsad")
+        self.db.allnuclidesoftype(spectype="gamma").append("Li8")
+        self.db.alltypes.append("dsad")
+        self.assertEqual(["SF", "beta", "gamma"], self.db.gettypes("H3"), "Assert unchanged")
+        self.assertEqual(["H3"], self.db.allnuclidesoftype(spectype="gamma"), "Assert unchanged")
+        self.assertEqual(4, len(self.db.alltypes), "Assert unchanged")
+        with self.assertRaises(KeyError):
+            self.db.gettypes("U235")
+
     def test_zai(self):
         self.assertEqual(10030, self.db.getzai("H3"), "Assert ZAI H3")
         self.assertEqual(30080, self.db.getzai("Li8"), "Assert ZAI Li8")
@@ -194,3 +220,318 @@ class DatabaseInventoryUnitTest(unittest.TestCase):
 
         self.assertEqual(inv[0], (10030, h3_activity))
         self.assertEqual(inv[1], (30080, li8_activity))
+
+    def test_bulk_names(self):
+        self.assertEqual(
+            ["Li8", None, "H3", "H3"],
+            self.db.getnames([30080, 922350, 10030, 10030]).tolist(),
+            "Assert bulk names",
+        )
+        self.assertEqual([], self.db.getnames([]).tolist(), "Assert no names")
+        self.assertEqual(None, self.db.getname(922350), "Assert unknown name")
+
+    def test_bulk_zais(self):
+        self.assertEqual(
+            [30080, 10030], self.db.getzais(["Li8", "H3"]).tolist(), "Assert bulk zais"
+        )
+        with self.assertRaises(KeyError):
+            self.db.getzais(["Li8", "U235"])
+
+    def test_bulk_lines(self):
+        energies, offsets = self.db.getmanyenergies(["Li8", "H3", "Li8"], spectype="beta")
+        self.assertEqual([28571.0, 18571.0, 45213.2, 28571.0], energies.tolist(),
+                         "Assert bulk energies")
+        self.assertEqual([0, 1, 3, 4], offsets.tolist(), "Assert bulk offsets")
+
+        intensities, offsets = self.db.getmanyintensities([10030, 30080], spectype="beta")
+        self.assertEqual([1.0, 0.8, 1.0], intensities.tolist(), "Assert bulk intensities by ZAI")
+        self.assertEqual([0, 2, 3], offsets.tolist(), "Assert bulk offsets by ZAI")
+
+        uncs, offsets = self.db.getmanyenergiesunc(["H3"], spectype="beta")
+        self.assertEqual([6.0, 5.0], uncs.tolist(), "Assert bulk uncertainties")
+
+        (energies, intensities), offsets = self.db.getmanylines(["Li8", "H3"], spectype="beta")
+        self.assertEqual([28571.0, 18571.0, 45213.2], energies.tolist(), "Assert lines energies")
+        self.assertEqual([1.0, 1.0, 0.8], intensities.tolist(), "Assert lines intensities")
+        self.assertEqual([0, 1, 3], offsets.tolist(), "Assert lines offsets")
+        (uncs,), offsets = self.db.getmanylines(["H3"], spectype="beta", columns=["energies_unc"])
+        self.assertEqual([6.0, 5.0], uncs.tolist(), "Assert lines uncertainties")
+
+        energies, offsets = self.db.getmanyenergies(["H3"], spectype="SF")
+        self.assertEqual(([], [0, 0]), (energies.tolist(), offsets.tolist()), "Assert no lines")
+        energies, offsets = self.db.getmanyenergies([], spectype="gamma")
+        self.assertEqual(([], [0]), (energies.tolist(), offsets.tolist()), "Assert no nuclides")
+
+        with self.assertRaises(KeyError):
+            self.db.getmanyenergies(["H3", "Li8"], spectype="gamma")
+        with self.assertRaises(KeyError):
+            self.db.getmanyenergies(["H3", "U235"], spectype="beta")
+        with self.assertRaises(KeyError):
+            self.db.getmanyenergies([10030, 922350], spectype="beta")
+
+    def test_fingerprint(self):
+        fingerprint = ag.DefaultDatabase(datasource=MockLoader()).fingerprint
+        self.assertEqual(fingerprint, self.db.fingerprint, "Assert same content, same fingerprint")
+        self.assertIs(self.db.fingerprint, self.db.fingerprint, "Assert computed once")
+        self.assertEqual(fingerprint, ag.ReadOnlyDatabase._contenthash(self.db),
+                         "Assert tables hash same as one nuclide at a time")
+
+        data = MockLoader().__enter__()
+        data["H3"]["beta"]["lines"]["energies"][1] = 45213.3
+
+        class ChangedLoader(object):
+            def __enter__(self):
+                return data
+
+            def __exit__(self, *args):
+                pass
+
+        self.assertNotEqual(fingerprint, ag.DefaultDatabase(datasource=ChangedLoader()).fingerprint,
+                            "Assert different content, different fingerprint")
+
+    def test_raw(self):
+        self.assertEqual(MockLoader().__enter__(), self.db.raw, "Assert raw rebuilt")
+
+    def test_readonly_views(self):
+        energies = self.db.getenergies("H3", spectype="beta")
+        with self.assertRaises(ValueError):
+            energies[0] = 1.0
+        self.assertEqual(
+            [6.0, 5.0],
+            self.db.getenergiesunc("H3", spectype="beta").tolist(),
+            "Assert beta energy uncertainties H3",
+        )
+        self.assertEqual([], self.db.getenergies("H3", spectype="SF").tolist(),
+                         "Assert no lines")
+        self.assertEqual(False, self.db.haslines("H3", spectype="SF"), "Assert no lines")
+        with self.assertRaises(KeyError):
+            self.db.getenergies("H3", spectype="alpha")
+        with self.assertRaises(KeyError):
+            self.db.getenergies("U235")
+
+    def test_tables(self):
+        tables = self.db.tables
+        self.assertEqual(["H3", "Li8"], tables.names, "Assert names")
+        self.assertEqual([0, 2, 3], tables.spectra["beta"].offsets.tolist(), "Assert offsets")
+        self.assertEqual(
+            [18571.0, 45213.2, 28571.0],
+            tables.spectra["beta"].energies.tolist(),
+            "Assert contiguous energies",
+        )
+
+        # tables can be used directly as the data source
+        class TablesLoader(object):
+            def __enter__(self):
+                return ag.DecayTables(tables.arrays())
+
+            def __exit__(self, *args):
+                pass
+
+        db = ag.DefaultDatabase(datasource=TablesLoader())
+        self.assertEqual(self.db.raw, db.raw, "Assert same data")
+
+    def test_binary(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            directory = os.path.join(tmpdir, "lines")
+            ag.savetables(self.db.tables, directory)
+
+            db = ag.DefaultDatabase(datasource=ag.DatabaseBinaryLoader(directory))
+            self.assertEqual(self.db.raw, db.raw, "Assert same data")
+            self.assertTrue(
+                isinstance(db.tables.spectra["beta"].energies, np.memmap),
+                "Assert memory mapped",
+            )
+            self.assertEqual(
+                [18571.0, 45213.2],
+                db.getenergies("H3", spectype="beta").tolist(),
+                "Assert beta energies H3",
+            )
+
+            db = ag.DefaultDatabase(datasource=ag.DatabaseBinaryLoader(directory, mmap=False))
+            self.assertEqual(self.db.raw, db.raw, "Assert same data in memory")
+
+            # overwriting replaces the whole directory, the mapped
+            # arrays of the old one stay readable
+            mapped = ag.DefaultDatabase(datasource=ag.DatabaseBinaryLoader(directory))
+            ag.savetables(self.db.tables, directory)
+            self.assertEqual(["lines"], os.listdir(tmpdir), "Assert old directory removed")
+            self.assertEqual(ag.umasked(0o755), os.stat(directory).st_mode & 0o777,
+                             "Assert permissions")
+            self.assertEqual([18571.0, 45213.2],
+                             mapped.getenergies("H3", spectype="beta").tolist(),
+                             "Assert old mapped data")
+
+            with open(os.path.join(directory, ag.TABLES_MANIFEST), "wt") as fmanifest:
+                fmanifest.write('{"version": -1, "arrays": []}')
+            with self.assertRaises(ag.DatabaseFormatException):
+                ag.DefaultDatabase(datasource=ag.DatabaseBinaryLoader(directory))
+            with self.assertRaises(ag.DatabaseFormatException):
+                ag.DefaultDatabase(datasource=ag.DatabaseBinaryLoader(tmpdir))
+
+
+class Decay2012DatabaseUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.datafile = os.path.join(self.tmpdir.name, "lines.json")
+        with open(self.datafile, "wt") as fjson:
+            fjson.write(json.dumps(MockLoader().__enter__()))
+
+        self.patches = [
+            mock.patch.object(ag.database, "__RAW_DATABASE_DECAY_2012_FILE__", self.datafile),
+            mock.patch.object(ag.database, "__BINARY_DATABASE_DECAY_2012_DIR__",
+                              os.path.join(self.tmpdir.name, "nobinary")),
+        ]
+        for patch in self.patches:
+            patch.start()
+        ag.Decay2012Database.clear_cache()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        ag.Decay2012Database.clear_cache()
+        self.tmpdir.cleanup()
+
+    def test_shared(self):
+        db = ag.Decay2012Database()
+        self.assertIs(db, ag.Decay2012Database(), "Assert same instance")
+        self.assertIsNot(db, ag.Decay2012Database(fresh=True), "Assert fresh instance")
+        self.assertEqual(db.raw, ag.Decay2012Database(fresh=True).raw, "Assert same data")
+
+        ag.Decay2012Database.clear_cache()
+        self.assertIsNot(db, ag.Decay2012Database(), "Assert cleared")
+
+    def test_changed(self):
+        db = ag.Decay2012Database()
+        data = MockLoader().__enter__()
+        data["H3"]["halflife"] = 1.0
+        with open(self.datafile, "wt") as fjson:
+            fjson.write(json.dumps(data))
+        os.utime(self.datafile, ns=(0, 0))
+
+        changed = ag.Decay2012Database()
+        self.assertIsNot(db, changed, "Assert file read again")
+        self.assertEqual(1.0, changed.gethalflife("H3"), "Assert new data")
+
+
+    def test_binary(self):
+        binarydir = os.path.join(self.tmpdir.name, "binary")
+        db = ag.DefaultDatabase(datasource=ag.DatabaseJSONFileLoader(self.datafile))
+        with mock.patch.object(ag.database, "__BINARY_DATABASE_DECAY_2012_DIR__", binarydir):
+            # without the stamp of its source it is not trusted
+            ag.savetables(db.tables, binarydir)
+            self.assertFalse(isinstance(ag.Decay2012Database().tables.halflives, np.memmap),
+                             "Assert JSON used")
+
+            ag.savetables(db.tables, binarydir, source=self.datafile)
+            self.assertTrue(isinstance(ag.Decay2012Database().tables.halflives, np.memmap),
+                            "Assert binary used")
+
+            data = MockLoader().__enter__()
+            data["H3"]["halflife"] = 1.0
+            with open(self.datafile, "wt") as fjson:
+                fjson.write(json.dumps(data))
+            changed = ag.Decay2012Database()
+            self.assertFalse(isinstance(changed.tables.halflives, np.memmap),
+                             "Assert newer JSON used")
+            self.assertEqual(1.0, changed.gethalflife("H3"), "Assert new data")
+
+
+class LineTableUnitTest(unittest.TestCase):
+    def setUp(self):
+        self.db = ag.DefaultDatabase(datasource=MockLoader())
+
+    def test_linetable(self):
+        table = self.db.linetable(spectype="beta")
+        self.assertEqual(
+            [18571.0, 28571.0, 45213.2], table["energy"].tolist(), "Assert sorted energies"
+        )
+        self.assertEqual([1.0, 1.0, 0.8], table["intensity"].tolist(), "Assert intensities")
+        self.assertEqual([6.0, 30000.0, 5.0], table["energy_unc"].tolist(),
+                         "Assert energy uncertainties")
+        self.assertEqual([0, 1, 0], table["nuclide"].tolist(), "Assert nuclide indices")
+        self.assertIs(table, self.db.linetable(spectype="beta"), "Assert built once")
+        self.assertEqual(0, len(self.db.linetable(spectype="dsad")), "Assert no lines")
+        with self.assertRaises(ValueError):
+            table["energy"][0] = 1.0
+
+    def test_sortedlines_byname(self):
+        self.assertEqual(
+            [("H3", 18571.0), ("H3", 45213.2), ("Li8", 28571.0)],
+            ag.sortedlines(self.db, spectype="beta", byenergy=False),
+            "Assert sorted by name",
+        )
+
+    def test_linesinrange(self):
+        lines = self.db.linesinrange(18571.0, 45213.2, spectype="beta")
+        self.assertEqual([18571.0, 28571.0], lines["energy"].tolist(), "Assert half open range")
+        self.assertEqual(["H3", "Li8"], [self.db.allnuclides[i] for i in lines["nuclide"]],
+                         "Assert nuclides")
+        self.assertEqual(
+            [18571.0, 28571.0],
+            self.db.linesinrange(0.0, 1e6, spectype="beta", min_intensity=0.9)["energy"].tolist(),
+            "Assert intensity threshold",
+        )
+        self.assertEqual(0, len(self.db.linesinrange(0.0, 1e6, spectype="beta", min_intensity=2.0)),
+                         "Assert nothing above threshold")
+        self.assertEqual(0, len(self.db.linesinrange(5e3, 1e3, spectype="beta")),
+                         "Assert empty range")
+
+    def test_linesinranges(self):
+        lines, offsets = self.db.linesinranges([0.0, 20e3, 50e3, 0.0], [20e3, 1e6, 60e3, 1e6],
+                                               spectype="beta")
+        self.assertEqual([0, 1, 3, 3, 6], offsets.tolist(), "Assert offsets")
+        self.assertEqual(
+            [18571.0, 28571.0, 45213.2, 18571.0, 28571.0, 45213.2],
+            lines["energy"].tolist(),
+            "Assert lines",
+        )
+
+        lines, offsets = self.db.linesinranges([0.0, 20e3, 50e3], [20e3, 1e6, 60e3],
+                                               spectype="beta", min_intensity=0.9)
+        self.assertEqual([0, 1, 2, 2], offsets.tolist(), "Assert offsets with threshold")
+        self.assertEqual([18571.0, 28571.0], lines["energy"].tolist(), "Assert lines with threshold")
+
+    def test_nuclidetable(self):
+        table = self.db.nuclidetable()
+        self.assertEqual([10030, 30080], table["zai"].tolist(), "Assert ZAIs")
+        self.assertEqual([1, 3], table["z"].tolist(), "Assert Z")
+        self.assertEqual([3, 8], table["a"].tolist(), "Assert A")
+        self.assertEqual([0, 0], table["i"].tolist(), "Assert I")
+        self.assertEqual([389105000.0, 0.838], table["halflife"].tolist(), "Assert halflives")
+        self.assertIs(table, self.db.nuclidetable(), "Assert built once")
+
+    def test_query(self):
+        self.assertEqual(3, len(self.db.query(spectype="beta")), "Assert all lines")
+        self.assertEqual(
+            [18571.0, 45213.2],
+            self.db.query(spectype="beta", halflife=(1.0, None))["energy"].tolist(),
+            "Assert halflife range",
+        )
+        self.assertEqual(
+            [28571.0],
+            self.db.query(spectype="beta", energy=(20e3, None), z=(2, 4),
+                          a=(None, 9))["energy"].tolist(),
+            "Assert combined criteria",
+        )
+        self.assertEqual(
+            [18571.0],
+            self.db.query(spectype="beta", energy=(None, 30e3), min_intensity=0.9,
+                          halflife=(1.0, 1e10))["energy"].tolist(),
+            "Assert combined criteria with threshold",
+        )
+        self.assertEqual(0, len(self.db.query(spectype="beta", z=(4, None))),
+                         "Assert no nuclides")
+        self.assertEqual(0, len(self.db.query(spectype="dsad")), "Assert no lines")
+
+    def test_querynuclides(self):
+        self.assertEqual([0, 1], self.db.querynuclides().tolist(), "Assert all nuclides")
+        self.assertEqual([0], self.db.querynuclides(spectype="gamma").tolist(), "Assert type")
+        self.assertEqual([1], self.db.querynuclides(halflife=(None, 1.0)).tolist(),
+                         "Assert halflife range")
+        self.assertEqual([1], self.db.querynuclides(spectype="beta", energy=(20e3, 30e3)).tolist(),
+                         "Assert energy range")
+        self.assertEqual([], self.db.querynuclides(spectype="beta", energy=(20e3, 30e3),
+                                                   z=(None, 2)).tolist(),
+                         "Assert combined criteria")
+        self.assertEqual([0, 1], self.db.getnuclideindices(["H3", "Li8"]).tolist(),
+                         "Assert indices")
@@ -0,0 +1,27 @@
+import unittest
+import numpy as np
+import actigamma as ag
+
+from .databasetest import MockLoader
+
+
+class BinWiseNuclideIdentifierUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = ag.DefaultDatabase(datasource=MockLoader())
+
+    def test_identify(self):
+        grid = ag.EnergyGrid(bounds=np.array([0.0, 18571.0, 28571.0, 30e3, 50e3]))
+        ider = ag.BinWiseNuclideIdentifier(self.db)
+
+        nuclides = ider(np.array([1.0, 1.0, 1.0, 1.0]), grid, spectype="beta", progress=False)
+        self.assertEqual(
+            [[], [("H3", 18571.0)], [("Li8", 28571.0)], [("H3", 45213.2)]],
+            nuclides,
+            "Assert nuclides per bin",
+        )
+
+        nuclides = ider(np.array([1.0, 0.0, 1.0, 1.0]), grid, spectype="beta",
+                        excludes=["Li8"], progress=False)
+        self.assertEqual([[], [], [], [("H3", 45213.2)]], nuclides,
+                         "Assert empty bins and excludes")
@@ -0,0 +1,152 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+import actigamma as ag
+
+from .databasetest import MockLoader
+
+
+class LazyDatabaseUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.datafile = os.path.join(self.tmpdir.name, "lines.json")
+        with MockLoader() as data:
+            self.raw = data
+        # indented on purpose, the index must cope with whitespace
+        with open(self.datafile, "wt") as fjson:
+            json.dump(self.raw, fjson, indent=2)
+        self.db = ag.DefaultDatabase(datasource=MockLoader())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_index(self):
+        indexfile = ag.writejsonindex(self.datafile)
+        self.assertEqual(self.datafile + ag.LAZY_INDEX_SUFFIX, indexfile, "Assert index path")
+        with open(indexfile, "rt") as findex:
+            index = json.load(findex)
+        self.assertEqual(["H3", "Li8"], [entry[0] for entry in index["nuclides"]],
+                         "Assert nuclides")
+
+        with open(self.datafile, "rb") as fdata:
+            content = fdata.read()
+        for name, _, _, offset, length, types, linetypes in index["nuclides"]:
+            self.assertEqual(self.raw[name], json.loads(content[offset:offset + length]),
+                             "Assert entry of {}".format(name))
+            self.assertEqual(sorted(self.db.gettypes(name)), sorted(types), "Assert types")
+
+    def test_same_as_default(self):
+        ag.writejsonindex(self.datafile)
+        lazy = ag.LazyDatabase(self.datafile)
+        self.assertEqual(0, lazy.ncached, "Assert nothing decoded")
+        self.assertEqual(self.db.allnuclides, lazy.allnuclides, "Assert nuclides")
+        self.assertEqual(self.db.alltypes, lazy.alltypes, "Assert types")
+        self.assertEqual(ag.LazyDatabase(self.datafile).fingerprint, lazy.fingerprint,
+                         "Assert datafile fingerprint")
+        self.assertEqual(0, lazy.ncached, "Assert still nothing decoded")
+
+        for nuclide in self.db.allnuclides:
+            self.assertEqual(self.db.getzai(nuclide), lazy.getzai(nuclide), "Assert ZAI")
+            self.assertEqual(self.db.gethalflife(nuclide), lazy.gethalflife(nuclide),
+                             "Assert halflife")
+            self.assertEqual(self.db.gettypes(nuclide), lazy.gettypes(nuclide), "Assert types")
+            for spectype in self.db.gettypes(nuclide):
+                self.assertEqual(self.db.haslines(nuclide, spectype=spectype),
+                                 lazy.haslines(nuclide, spectype=spectype), "Assert haslines")
+                for method in ["getenergies", "getenergiesunc", "getintensities"]:
+                    self.assertEqual(
+                        getattr(self.db, method)(nuclide, spectype=spectype).tolist(),
+                        getattr(lazy, method)(nuclide, spectype=spectype).tolist(),
+                        "Assert {} {} {}".format(method, nuclide, spectype),
+                    )
+        for spectype in self.db.alltypes:
+            self.assertEqual(self.db.allnuclidesoftype(spectype=spectype),
+                             lazy.allnuclidesoftype(spectype=spectype), "Assert nuclides of type")
+            for field in ["energy", "intensity", "energy_unc", "nuclide"]:
+                self.assertEqual(self.db.linetable(spectype=spectype)[field].tolist(),
+                                 lazy.linetable(spectype=spectype)[field].tolist(),
+                                 "Assert line table")
+        self.assertEqual("H3", lazy.getname(10030), "Assert name")
+        self.assertEqual(self.raw, lazy.raw, "Assert raw")
+
+        with self.assertRaises(KeyError):
+            lazy.getenergies("H3", spectype="alpha")
+        with self.assertRaises(KeyError):
+            lazy.getenergies("U235", spectype="gamma")
+
+    def test_bounded(self):
+        lazy = ag.LazyDatabase(self.datafile, maxentries=1)
+        lazy.getenergies("H3", spectype="beta")
+        lazy.getintensities("H3", spectype="beta")
+        self.assertEqual((1, 1), (lazy.hits, lazy.misses), "Assert decoded once")
+        lazy.getenergies("Li8", spectype="beta")
+        self.assertEqual(1, lazy.ncached, "Assert bounded")
+        lazy.getenergies("H3", spectype="beta")
+        self.assertEqual((1, 3), (lazy.hits, lazy.misses), "Assert decoded again")
+
+    def test_aggregate(self):
+        # aggregating must only decode the nuclides of the inventory, once
+        lazy = ag.LazyDatabase(self.datafile, maxentries=1)
+        grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        inv = ag.UnstablesInventory(data=[(10030, 2.0)])
+        expected, _ = ag.LineAggregator(self.db, grid)(inv, spectype="beta")
+
+        hist, _ = ag.LineAggregator(lazy, grid)(inv, spectype="beta")
+        self.assertEqual(expected.tolist(), hist.tolist(), "Assert same hist")
+        self.assertEqual(1, lazy.misses, "Assert only H3 decoded, once")
+
+        hists = ag.LineAggregator(lazy, grid).batch([inv, inv], spectype="beta")
+        self.assertEqual([expected.tolist()] * 2, hists.tolist(), "Assert same batch")
+        self.assertEqual(1, lazy.misses, "Assert H3 kept")
+
+    def test_threads(self):
+        lazy = ag.LazyDatabase(self.datafile, maxentries=1)
+        results = []
+
+        def work():
+            for _ in range(50):
+                for nuclide in ["H3", "Li8"]:
+                    results.append(lazy.getenergies(nuclide, spectype="beta").tolist())
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(400, len(results), "Assert all done")
+        self.assertTrue(all(r in [[18571.0, 45213.2], [28571.0]] for r in results),
+                        "Assert correct lines")
+
+    def test_stale_index(self):
+        ag.writejsonindex(self.datafile)
+        with open(self.datafile, "wt") as fjson:
+            json.dump(self.raw, fjson)
+        with self.assertRaises(ag.DatabaseFormatException):
+            ag.LazyDatabase(self.datafile)
+
+    def test_stale_index_same_size(self):
+        ag.writejsonindex(self.datafile)
+        with open(self.datafile, "rt") as fjson:
+            content = fjson.read()
+        with open(self.datafile, "wt") as fjson:
+            fjson.write(content.replace("18571", "18572"))
+        with self.assertRaises(ag.DatabaseFormatException):
+            ag.LazyDatabase(self.datafile)
+
+    def test_touched_file(self):
+        ag.writejsonindex(self.datafile)
+        # i.e. a copy, the content has not changed
+        stat = os.stat(self.datafile)
+        os.utime(self.datafile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        lazy = ag.LazyDatabase(self.datafile)
+        self.assertEqual(self.db.getenergies("H3", "beta").tolist(),
+                         lazy.getenergies("H3", "beta").tolist(), "Assert same lines")
+
+    def test_bad_file(self):
+        with open(self.datafile, "wt") as fjson:
+            fjson.write("[1, 2]")
+        with self.assertRaises(ag.DatabaseFormatException):
+            ag.LazyDatabase(self.datafile)
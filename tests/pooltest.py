@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+import actigamma as ag
+
+from .databasetest import MockLoader
+
+
+class AggregatorPoolUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = ag.DefaultDatabase(datasource=MockLoader())
+        self.grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        self.invs = [ag.UnstablesInventory(data=[(10030, float(i)), (30080, 2.0*i)])
+                     for i in range(1, 21)]
+
+    def test_batch(self):
+        lc = ag.LineAverageEnergyAggregator(self.db, self.grid, cache=ag.ResponseCache())
+        expected = lc.batch(self.invs, spectype="beta")
+        with ag.AggregatorPool(lc, workers=2, context="spawn") as pool:
+            hists = pool.batch(self.invs, spectype="beta", chunksize=3)
+            self.assertTrue(np.allclose(expected, hists), "Assert same histograms in order")
+
+            out = np.zeros((20, 5))
+            self.assertIs(out, pool.batch(self.invs, spectype="beta", out=out), "Assert out")
+            self.assertTrue(np.allclose(expected, out), "Assert written to out")
+
+            zais = lc.cachedresponse(spectype="beta").zais.tolist()
+            activities = np.zeros((20, len(zais)))
+            for k, inv in enumerate(self.invs):
+                for zai, activity in inv:
+                    activities[k, zais.index(zai)] = activity
+            self.assertTrue(np.allclose(expected, pool.batch(activities, spectype="beta")),
+                            "Assert activity matrix")
+
+            self.assertEqual((0, 5), pool.batch([], spectype="beta").shape, "Assert empty")
+
+            with self.assertRaises(ValueError):
+                pool.batch(self.invs, spectype="beta", out=np.zeros((19, 5)))
+            with self.assertRaises(ag.NoDataException):
+                pool.batch(self.invs, spectype="alpha")
+
+    def test_multitype(self):
+        lc = ag.MultiTypeLineAggregator(self.db, self.grid)
+        kwargs = dict(types=["beta"], weights={"beta": 2.0}, stacked=True)
+        with ag.AggregatorPool(lc, workers=2, context="spawn") as pool:
+            hists = pool.batch(self.invs, **kwargs)
+        self.assertEqual((20, 1, 5), hists.shape, "Assert stacked shape")
+        self.assertTrue(np.allclose(lc.batch(self.invs, **kwargs), hists), "Assert stacked")
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+import actigamma as ag
+
+from .databasetest import MockLoader
+
+
+class PruneUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = ag.DefaultDatabase(datasource=MockLoader())
+
+    def test_types_and_energies(self):
+        spec = ag.PruneSpec(spectypes=["beta", "gamma"], energy=(10e3, 40e3))
+        pruned = ag.prunedatabase(self.db, spec)
+        self.assertEqual(["H3", "Li8"], pruned.allnuclides, "Assert all nuclides kept")
+        self.assertEqual(["beta", "gamma"], pruned.alltypes, "Assert types")
+        self.assertEqual([18571.0], pruned.getenergies("H3", spectype="beta").tolist(),
+                         "Assert energy window")
+        self.assertEqual([28571.0], pruned.getenergies("Li8", spectype="beta").tolist(),
+                         "Assert energy window")
+        self.assertEqual([], pruned.getenergies("H3", spectype="gamma").tolist(),
+                         "Assert no lines left")
+        self.assertEqual(1, pruned.raw["H3"]["beta"]["number"], "Assert number updated")
+        self.assertEqual(5707.4, pruned.raw["H3"]["beta"]["mean_energy"], "Assert mean kept")
+        self.assertFalse(pruned.hastype("Li8", spectype="alpha"), "Assert alpha removed")
+
+    def test_intensity_and_halflife(self):
+        spec = ag.PruneSpec(min_intensity=0.9, halflife=(1.0, None))
+        pruned = ag.prunedatabase(self.db, spec)
+        self.assertEqual(["H3"], pruned.allnuclides, "Assert halflife range")
+        self.assertEqual([18571.0], pruned.getenergies("H3", spectype="beta").tolist(),
+                         "Assert intensity floor")
+        self.assertEqual(["SF", "beta", "gamma"], pruned.gettypes("H3"), "Assert types kept")
+
+    def test_same_histogram(self):
+        # a grid inside the window gives the same histogram as the full library
+        grid = ag.EnergyGrid(bounds=ag.linspace(10e3, 40e3, 7))
+        inventory = ag.UnstablesInventory(data=[(10030, 2.0), (30080, 3.0)])
+        pruned = ag.prunedatabase(self.db, ag.PruneSpec(spectypes=["beta"], energy=(10e3, 40e3)))
+        for cache in [None, ag.ResponseCache()]:
+            full, _ = ag.LineAggregator(self.db, grid, cache=cache)(inventory, spectype="beta")
+            part, _ = ag.LineAggregator(pruned, grid, cache=cache)(inventory, spectype="beta")
+            self.assertEqual(full.tolist(), part.tolist(), "Assert same histogram")
+
+    def test_provenance(self):
+        spec = ag.PruneSpec(spectypes=["gamma"], energy=(1e3, 3e6), min_intensity=1e-4)
+        pruned = ag.prunedatabase(self.db, spec)
+        provenance = pruned.metadata["pruned"]
+        self.assertEqual(ag.databasehash(self.db), provenance["parent"], "Assert parent")
+        self.assertEqual(spec.todict(), provenance["spec"], "Assert spec")
+        self.assertEqual(spec.todict(), ag.PruneSpec.fromdict(provenance["spec"]).todict(),
+                         "Assert spec round trip")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            directory = os.path.join(tmpdir, "pruned")
+            ag.savetables(pruned.tables, directory)
+            loaded = ag.DefaultDatabase(datasource=ag.DatabaseBinaryLoader(directory))
+            self.assertEqual(pruned.raw, loaded.raw, "Assert same data")
+            self.assertEqual(pruned.metadata, loaded.metadata, "Assert provenance saved")
+
+            filename = os.path.join(tmpdir, "pruned.sqlite")
+            ag.savesqlite(pruned.tables, filename)
+            loaded = ag.DefaultDatabase(datasource=ag.DatabaseSQLiteLoader(filename))
+            self.assertEqual(pruned.metadata, loaded.metadata, "Assert provenance saved")
+
+        self.assertEqual({}, self.db.metadata, "Assert no provenance for the parent")
@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+import actigamma as ag
+
+from .databasetest import MockLoader
+
+
+class ResponseMatrixUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = ag.DefaultDatabase(datasource=MockLoader())
+        self.grid = ag.EnergyGrid(bounds=ag.linspace(0.0, 50e3, 6))
+        self.inv = ag.UnstablesInventory(data=[(10030, 2.0), (30080, 3.0)])
+
+    def test_csr(self):
+        matrix = ag.LineAggregator(self.db, self.grid).response(spectype="beta")
+        self.assertEqual((2, 5), matrix.shape, "Assert shape")
+        self.assertEqual(3, matrix.nnz, "Assert nnz")
+        self.assertEqual(["H3", "Li8"], matrix.nuclides, "Assert rows")
+        self.assertEqual([0, 2, 3], matrix.indptr.tolist(), "Assert indptr")
+        self.assertEqual([1, 4, 2], matrix.indices.tolist(), "Assert indices")
+        self.assertEqual([1.0, 0.8, 1.0], matrix.data.tolist(), "Assert data")
+
+    def test_empty_rows(self):
+        grid = ag.EnergyGrid(bounds=ag.linspace(20e3, 30e3, 3))
+        matrix = ag.LineAggregator(self.db, grid).response(spectype="beta")
+        self.assertEqual((2, 2), matrix.shape, "Assert shape")
+        self.assertEqual([0, 0, 1], matrix.indptr.tolist(), "Assert H3 has no lines in grid")
+        self.assertEqual([0.0, 0.0], matrix.dot([1.0, 0.0]).tolist(), "Assert empty row")
+
+    def test_matches_aggregators(self):
+        for aggregator in [ag.LineAggregator, ag.LineAverageEnergyAggregator]:
+            lc = aggregator(self.db, self.grid)
+            hist, _ = lc(self.inv, spectype="beta")
+
+            matrix = lc.response(spectype="beta")
+            activities = lc._activityvector(matrix, self.inv, "beta")
+            self.assertTrue(np.allclose(hist, matrix.dot(activities)),
+                            "Assert mat-vec matches aggregator")
+
+    def test_batch(self):
+        lc = ag.LineAverageEnergyAggregator(self.db, self.grid)
+        matrix = lc.response(spectype="beta")
+
+        activities = np.array([[2.0, 3.0], [0.0, 1.0], [5.0, 0.0]])
+        hists = matrix.dot(activities)
+        self.assertEqual((3, 5), hists.shape, "Assert batch shape")
+        for i, row in enumerate(activities):
+            self.assertTrue(np.allclose(matrix.dot(row), hists[i]),
+                            "Assert mat-mat matches mat-vec")
+
+    def test_rowsof(self):
+        matrix = ag.LineAggregator(self.db, self.grid).response(spectype="beta")
+        rows = [matrix.rowof(10030), matrix.rowof(30080)]
+        self.assertEqual(rows + [-1], matrix.rowsof([10030, 30080, 922350]).tolist(),
+                         "Assert rows, -1 when missing")
+        self.assertEqual([], matrix.rowsof([]).tolist(), "Assert no rows")
+
+    def test_unknown(self):
+        lc = ag.LineAggregator(self.db, self.grid)
+        matrix = lc.response(spectype="gamma")
+        with self.assertRaises(ag.NoDataException):
+            lc._activityvector(matrix, ag.UnstablesInventory(data=[(30080, 1.0)]), "gamma")
+        with self.assertRaises(ag.UnknownOrUnstableNuclideException):
+            lc._activityvector(matrix, ag.UnstablesInventory(data=[(922350, 1.0)]), "gamma")
+
+    def test_batch_blocks(self):
+        matrix = ag.LineAggregator(self.db, self.grid).response(spectype="beta")
+        activities = np.arange(14.0).reshape(7, 2)
+        expected = matrix.dot(activities)
+
+        blockentries = ag.response.DOT_BLOCK_ENTRIES
+        ag.response.DOT_BLOCK_ENTRIES = 2 * matrix.nnz
+        try:
+            self.assertTrue(np.allclose(expected, matrix.dot(activities)),
+                            "Assert same result in blocks of vectors")
+        finally:
+            ag.response.DOT_BLOCK_ENTRIES = blockentries
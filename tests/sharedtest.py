@@ -0,0 +1,31 @@
+import multiprocessing
+import unittest
+import actigamma as ag
+
+from .databasetest import MockLoader
+
+
+def _worker(handle):
+    db = ag.attachdatabase(handle)
+    return db.getenergies("H3", spectype="beta").tolist(), db.gethalflife("Li8")
+
+
+class SharedDatabaseUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.db = ag.DefaultDatabase(datasource=MockLoader())
+
+    def test_attach(self):
+        with ag.publishdatabase(self.db) as shared:
+            db = ag.attachdatabase(shared.handle)
+            self.assertEqual(self.db.raw, db.raw, "Assert same data")
+            with self.assertRaises(ValueError):
+                db.getenergies("H3", spectype="beta")[0] = 1.0
+
+    def test_pool(self):
+        with ag.publishdatabase(self.db) as shared:
+            with multiprocessing.get_context("spawn").Pool(2) as pool:
+                results = pool.map(_worker, [shared.handle] * 2)
+        for energies, halflife in results:
+            self.assertEqual([18571.0, 45213.2], energies, "Assert beta energies H3")
+            self.assertEqual(0.838, halflife, "Assert halflife Li8")
@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+import actigamma as ag
+
+from . import databasetest
+from .databasetest import MockLoader
+
+
+def _sqlitedatabase(testcase):
+    # write the mock data to an SQLite file, removed after the test
+    tmpdir = tempfile.TemporaryDirectory()
+    testcase.addCleanup(tmpdir.cleanup)
+    filename = os.path.join(tmpdir.name, "lines.sqlite")
+    ag.savesqlite(ag.DefaultDatabase(datasource=MockLoader()).tables, filename)
+    return filename
+
+
+class SQLiteDatabaseUnitTest(databasetest.DatabaseInventoryUnitTest):
+    """
+    The same behaviour as the default database, on an SQLite file
+    """
+
+    def setUp(self):
+        self.filename = _sqlitedatabase(self)
+        self.db = ag.SQLiteDatabase(self.filename)
+
+    def test_loader(self):
+        db = ag.DefaultDatabase(datasource=ag.DatabaseSQLiteLoader(self.filename))
+        self.assertEqual(MockLoader().__enter__(), db.raw, "Assert same data")
+
+    def test_threads(self):
+        results = []
+
+        def work():
+            for _ in range(20):
+                results.append(self.db.getenergies("H3", spectype="beta").tolist())
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([[18571.0, 45213.2]] * 80, results, "Assert same lines")
+
+    def test_readonly_file(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            self.db._connection().execute("DELETE FROM lines")
+
+    def test_save(self):
+        self.assertEqual(ag.umasked(0o644), os.stat(self.filename).st_mode & 0o777,
+                         "Assert permissions")
+
+        # metadata that cannot be written fails mid write
+        tables = ag.DefaultDatabase(datasource=MockLoader()).tables
+        tables = ag.DecayTables(tables.arrays(), metadata={"bad": object()})
+        with self.assertRaises(TypeError):
+            ag.savesqlite(tables, self.filename)
+        self.assertEqual(["lines.sqlite"], os.listdir(os.path.dirname(self.filename)),
+                         "Assert temporary file removed")
+        self.assertEqual([18571.0, 45213.2],
+                         ag.SQLiteDatabase(self.filename).getenergies("H3", "beta").tolist(),
+                         "Assert file kept")
+
+    def test_bad_file(self):
+        with self.assertRaises(ag.DatabaseFormatException):
+            ag.SQLiteDatabase(self.filename + ".missing")
+
+        with sqlite3.connect(self.filename) as connection:
+            connection.execute("UPDATE meta SET value = '-1' WHERE key = 'version'")
+        connection.close()
+        with self.assertRaises(ag.DatabaseFormatException):
+            ag.SQLiteDatabase(self.filename)
+
+        with open(self.filename, "wt") as fbad:
+            fbad.write("not a database")
+        with self.assertRaises(ag.DatabaseFormatException):
+            ag.SQLiteDatabase(self.filename)
+
+
+class SQLiteLineTableUnitTest(databasetest.LineTableUnitTest):
+    """
+    The same line queries as the default database, on an SQLite file
+    """
+
+    def setUp(self):
+        self.db = ag.SQLiteDatabase(_sqlitedatabase(self))
@@ -1,9 +1,18 @@
 import unittest
 import os
 
-from .databasetest import DatabaseInventoryUnitTest
+from .databasetest import DatabaseInventoryUnitTest, Decay2012DatabaseUnitTest, LineTableUnitTest
+from .identifiertest import BinWiseNuclideIdentifierUnitTest
 from .inventorytest import UnstablesInventoryUnitTest
-from .coretest import EnergyGridUnitTest
+from .lazytest import LazyDatabaseUnitTest
+from .pooltest import AggregatorPoolUnitTest
+from .prunetest import PruneUnitTest
+from .coretest import EnergyGridUnitTest, LineAggregatorUnitTest
+from .responsetest import ResponseMatrixUnitTest
+from .cachetest import ResponseCacheUnitTest, DiskCacheUnitTest
+from .sharedtest import SharedDatabaseUnitTest
+from .sqlitetest import SQLiteDatabaseUnitTest, SQLiteLineTableUnitTest
+from .writertest import StreamWriterUnitTest
 
 def main():
     unittest.TextTestRunner(verbosity=3).run(unittest.TestSuite())
@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import unittest
+import actigamma as ag
+
+from .databasetest import MockLoader
+
+
+class StreamWriterUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        with MockLoader() as data:
+            self.raw = data
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def write(self, writer):
+        with writer:
+            for name, entry in self.raw.items():
+                writer.write(name, entry)
+
+    def test_json(self):
+        datafile = self.path("lines.json")
+        indexfile = datafile + ag.LAZY_INDEX_SUFFIX
+        self.write(ag.JSONStreamWriter(datafile, indexfile=indexfile))
+
+        with open(datafile, "rt") as fjson:
+            self.assertEqual(self.raw, json.load(fjson), "Assert same data")
+        with open(indexfile, "rt") as findex:
+            self.assertEqual(ag.indexjson(datafile), json.load(findex), "Assert same index")
+
+        db = ag.LazyDatabase(datafile)
+        self.assertEqual([18571.0, 45213.2], db.getenergies("H3", spectype="beta").tolist(),
+                         "Assert lazy lines")
+        self.assertEqual(["lines.json", "lines.json.index.json"],
+                         sorted(os.listdir(self.tmpdir.name)), "Assert no temporary files")
+        self.assertEqual(ag.umasked(0o644), os.stat(datafile).st_mode & 0o777,
+                         "Assert permissions")
+
+    def test_binary(self):
+        directory = self.path("lines")
+        self.write(ag.BinaryStreamWriter(directory))
+        db = ag.DefaultDatabase(datasource=ag.DatabaseBinaryLoader(directory))
+        self.assertEqual(self.raw, db.raw, "Assert same data")
+
+    def test_buffered(self):
+        filename = self.path("lines.sqlite")
+        with ag.TablesBufferedWriter(filename, ag.savesqlite) as writer:
+            for name, entry in self.raw.items():
+                writer.write(name, entry)
+            self.assertEqual([], os.listdir(self.tmpdir.name), "Assert nothing written yet")
+        self.assertEqual(self.raw, ag.SQLiteDatabase(filename).raw, "Assert same data")
+
+    def test_sqlite(self):
+        filename = self.path("lines.sqlite")
+        self.write(ag.SQLiteStreamWriter(filename))
+        self.assertEqual(self.raw, ag.SQLiteDatabase(filename).raw, "Assert same data")
+
+    def test_failed(self):
+        datafile = self.path("lines.json")
+        with self.assertRaises(RuntimeError):
+            with ag.JSONStreamWriter(datafile) as writer:
+                writer.write("H3", self.raw["H3"])
+                raise RuntimeError("reader failed")
+        self.assertEqual([], os.listdir(self.tmpdir.name), "Assert nothing written")
+
+    def test_builder(self):
+        builder = ag.TablesBuilder()
+        for name, entry in self.raw.items():
+            builder.add(name, entry)
+        self.assertEqual(2, len(builder), "Assert nuclides")
+        self.assertEqual(ag.tablesfromdict(self.raw).todict(), builder.build().todict(),
+                         "Assert same tables")
+        self.assertEqual([False, True], builder.build().spectra["alpha"].present.tolist(),
+                         "Assert type first seen later")